@@ -1,15 +1,241 @@
+import bisect
+import csv
+import functools
+import io
+import itertools
+import json
+import logging
+import os
+import re
 import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
 
-def get_connection(db_name="csiaa.db"):
-    conn = sqlite3.connect(db_name)
+logger = logging.getLogger("BackEnd")
+
+# a student is overloaded once this many major assessments land in one week
+OVERLOAD_THRESHOLD = 4
+
+# SQLite settings per kind of workload, chosen with get_connection(profile=...)
+#   interactive        - the desktop app: WAL so the background worker can read
+#                        while the app writes, fsync only at checkpoints
+#   bulk_load          - imports: WAL with fsync only at checkpoints (a power
+#                        cut can lose the last commits, never corrupt older
+#                        data) and a big cache
+#   readonly_analytics - reports/conflict scans: read-only, large cache and mmap
+CONNECTION_PROFILES = {
+    "interactive": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,        # KiB
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,        # ms
+        "cached_statements": 256,
+    },
+    "bulk_load": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -128000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+        "cached_statements": 64,
+    },
+    "readonly_analytics": {
+        "readonly": True,
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+        "cached_statements": 512,
+    },
+}
+
+_PROFILE_PRAGMAS = ("journal_mode", "synchronous", "cache_size", "mmap_size",
+                    "temp_store", "busy_timeout")
+
+
+def get_connection(db_name="csiaa.db", profile=None, instrument=False, slow_query_ms=100, shared=False):
+    """
+    Opens the database. With instrument=True the connection records timing
+    for every backend call into query_stats and logs calls slower than
+    slow_query_ms together with the query plans of their statements.
+    shared=True lets the connection be handed from thread to thread (used by
+    one thread at a time), as the server's pools do.
+    """
+    settings = CONNECTION_PROFILES[profile] if profile else {}
+    options = {"cached_statements": settings.get("cached_statements", 128)}
+    if shared:
+        options["check_same_thread"] = False
+    if instrument:
+        options["factory"] = InstrumentedConnection
+
+    if settings.get("readonly"):
+        conn = sqlite3.connect(Path(db_name).absolute().as_uri() + "?mode=ro", uri=True, **options)
+    else:
+        conn = sqlite3.connect(db_name, **options)
+    if instrument:
+        conn.slow_query_ms = slow_query_ms
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
+    apply_profile(conn, settings)
     return conn
 
 
-def ensure_schema(conn):
-    conn.executescript("""
+def apply_profile(conn, profile):
+    """
+    Applies a profile's PRAGMAs to an open connection, e.g. to switch to
+    bulk_load for an import. profile is a name or a settings dict.
+    """
+    settings = CONNECTION_PROFILES[profile] if isinstance(profile, str) else profile
+    for pragma in _PROFILE_PRAGMAS:
+        if pragma in settings:
+            conn.execute(f"PRAGMA {pragma} = {settings[pragma]}")
+
+
+# instrumentation
+# Backend functions are wrapped with @instrumented. On a plain connection the
+# wrapper only does an isinstance check; on an InstrumentedConnection it times
+# the call and keeps the SQL it ran so slow calls can be explained.
+
+class QueryStats:
+    """Call count, total time and recent durations per backend function."""
+
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.calls = {}  # name -> [count, total seconds, recent durations]
+
+    def record(self, name, seconds):
+        with self.lock:
+            entry = self.calls.get(name)
+            if entry is None:
+                entry = self.calls[name] = [0, 0.0, deque(maxlen=self.max_samples)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2].append(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+
+    def snapshot(self):
+        """{function name: {count, total_ms, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        with self.lock:
+            calls = {name: (count, total, sorted(samples))
+                     for name, (count, total, samples) in self.calls.items()}
+
+        def percentile(samples, p):
+            return samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000
+
+        return {
+            name: {
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / count * 1000, 3),
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p95_ms": round(percentile(samples, 95), 3),
+                "p99_ms": round(percentile(samples, 99), 3),
+                "max_ms": round(samples[-1] * 1000, 3),
+            }
+            for name, (count, total, samples) in sorted(calls.items())
+        }
+
+    def dump_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+query_stats = QueryStats()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    stats = query_stats
+    slow_query_ms = 100
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.depth = 0
+        self.statements = []
+        self.set_trace_callback(self.trace)
+
+    def trace(self, sql):
+        # lines starting with "--" are statements run inside triggers
+        if self.depth and not sql.startswith("--"):
+            self.statements.append(sql)
+
+    def timed_call(self, name, func, args, kwargs):
+        outermost = self.depth == 0
+        if outermost:
+            self.statements = []
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.depth -= 1
+            self.stats.record(name, elapsed)
+            if outermost and elapsed * 1000 >= self.slow_query_ms:
+                self.log_slow_call(name, elapsed)
+
+    def log_slow_call(self, name, elapsed):
+        lines = [f"slow backend call {name}: {elapsed * 1000:.1f} ms"]
+        for sql in dict.fromkeys(self.statements):
+            lines.append(f"  {' '.join(sql.split())}")
+            if sql.split(None, 1)[0].upper() not in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+                continue
+            try:
+                plan = self.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            except sqlite3.Error:
+                continue
+            for row in plan:
+                lines.append(f"    plan: {row[3]}")
+        logger.warning("\n".join(lines))
+
+
+def instrumented(func):
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        if not isinstance(conn, InstrumentedConnection):
+            return func(conn, *args, **kwargs)
+        return conn.timed_call(name, func, args, kwargs)
+
+    return wrapper
+
+
+# Write functions bump a per-table counter after they commit, so readers in
+# this process (LookupCache) can tell which cached results are stale. Writes
+# from other connections show up through PRAGMA data_version instead.
+_table_versions = {}
+_table_versions_lock = threading.Lock()
+
+
+def _touch(*tables):
+    with _table_versions_lock:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+
+def table_version(table):
+    return _table_versions.get(table, 0)
+
+
+# schema versions
+# PRAGMA user_version records how many of MIGRATIONS a database has had.
+# ensure_schema does nothing else when a database is at SCHEMA_VERSION, so
+# opening a current database runs no DDL. Any change to the tables, indexes
+# or triggers below needs a new migration (it may do nothing but bump the
+# version) or existing databases won't pick it up.
+
+_TABLES_SQL = """
     CREATE TABLE IF NOT EXISTS Teacher (
         TeacherID INTEGER PRIMARY KEY AUTOINCREMENT,
         TeacherName TEXT NOT NULL UNIQUE
@@ -56,40 +282,804 @@ def ensure_schema(conn):
     );
 
     CREATE INDEX IF NOT EXISTS idx_enroll_student ON Enrollments(StudentID);
+    CREATE INDEX IF NOT EXISTS idx_enroll_course ON Enrollments(CourseID);
     CREATE INDEX IF NOT EXISTS idx_target_course ON AssessmentTargets(CourseID);
     CREATE INDEX IF NOT EXISTS idx_assessment_date ON Assessments(DueDate);
+    """
+
+
+def _create_tables(conn):
+    conn.executescript(_TABLES_SQL)
+    _ensure_week_columns(conn)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_assessment_priority_week ON Assessments(Priority, WeekKey)"
+    )
+
+
+def _table_body(sql):
+    # column list and constraints of a CREATE TABLE, whitespace collapsed,
+    # so a table can be compared with its canonical definition whatever it
+    # is called and however it was formatted
+    return " ".join(sql[sql.index("("):].split())
+
+
+@functools.lru_cache(maxsize=None)
+def _canonical_tables():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    _create_tables(conn)
+    tables = {name: _table_body(sql) for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name <> 'sqlite_sequence'"
+    )}
+    conn.close()
+    return tables
+
+
+def _is_header_condition(columns):
+    # a row that repeats the column names, left behind by CSV imports
+    return " AND ".join(f"\"{c}\" IS '{c}'" for c in columns)
+
+
+def _rebuild_table(conn, table, body):
+    """
+    Recreates table with the canonical body and copies its rows over.
+    Header rows are left out, and so are rows the new constraints reject
+    (duplicates, bad levels, missing values). Gaps in NOT NULL columns are
+    filled from the column default first.
+    """
+    old = {r["name"]: r["dflt_value"] for r in conn.execute(f'PRAGMA table_info("{table}")')}
+    conn.execute(f'CREATE TABLE "{table}_new" {body}')
+    new = {r["name"]: r["dflt_value"] for r in conn.execute(f'PRAGMA table_xinfo("{table}_new")')
+           if not r["hidden"]}
+    columns = [c for c in new if c in old]
+    values = [f'COALESCE("{c}", {old[c] or new[c]})' if old[c] or new[c] else f'"{c}"' for c in columns]
+    header = _is_header_condition(old)
+
+    total = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    headers = conn.execute(f'SELECT COUNT(*) FROM "{table}" WHERE {header}').fetchone()[0]
+    copied = conn.execute(f"""
+        INSERT OR IGNORE INTO "{table}_new" ({", ".join(f'"{c}"' for c in columns)})
+        SELECT {", ".join(values)} FROM "{table}" WHERE NOT ({header}) ORDER BY rowid
+    """).rowcount
+    conn.execute(f'DROP TABLE "{table}"')
+    conn.execute(f'ALTER TABLE "{table}_new" RENAME TO "{table}"')
+
+    logger.info("rebuilt %s: %d rows copied, %d header rows and %d duplicate or invalid rows dropped",
+                table, copied, headers, total - headers - copied)
+
+
+def _drop_orphans(conn):
+    # rows whose parent is gone: SET NULL references are cleared, anything
+    # else is deleted, as if the parent had been deleted with the keys on
+    actions = {}
+    for table, rowid, parent, fk in conn.execute("PRAGMA foreign_key_check").fetchall():
+        if table not in actions:
+            actions[table] = {r["id"]: (r["from"], r["on_delete"])
+                              for r in conn.execute(f'PRAGMA foreign_key_list("{table}")')}
+        column, on_delete = actions[table][fk]
+        if on_delete == "SET NULL":
+            conn.execute(f'UPDATE "{table}" SET "{column}" = NULL WHERE rowid = ?', (rowid,))
+        else:
+            conn.execute(f'DELETE FROM "{table}" WHERE rowid = ?', (rowid,))
+        logger.info("%s row %s referred to a missing %s row (%s)", table, rowid, parent, on_delete or "deleted")
+
+
+def _migrate_canonical_tables(conn):
+    """
+    Version 1: the original csiaa.db was made by hand, with NUMERIC keys
+    (so ids are not rowids and joins compare with NUMERIC affinity), no
+    ON DELETE actions, no UNIQUE enrollments, no Audience CHECK and a
+    header row in every table. Tables that don't match their canonical
+    definition are rebuilt. Returns the names of the rebuilt tables.
+    """
+    canonical = _canonical_tables()
+    existing = {name: _table_body(sql) for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table'"
+    )}
+    stale = [name for name, body in canonical.items() if name in existing and existing[name] != body]
+    if not stale:
+        return set()
+
+    # SQLite's recipe for changing a table: keys off, new table, copy,
+    # drop, rename, check the keys, all in one transaction. Triggers go
+    # first (they name the old tables) and come back with the schema.
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        conn.execute("BEGIN")
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            conn.execute(f'DROP TRIGGER "{name}"')
+        if "Teacher" in stale:
+            # a teacher entered twice can't survive the UNIQUE name; their
+            # courses move to the copy that is kept (the first one)
+            conn.execute("""
+                UPDATE Courses SET TeacherID = (
+                    SELECT k.TeacherID
+                    FROM Teacher t JOIN Teacher k ON k.TeacherName = t.TeacherName
+                    WHERE t.TeacherID = Courses.TeacherID
+                    ORDER BY k.rowid LIMIT 1
+                )
+                WHERE TeacherID IN (
+                    SELECT TeacherID FROM Teacher
+                    WHERE TeacherName IN (SELECT TeacherName FROM Teacher GROUP BY TeacherName HAVING COUNT(*) > 1)
+                )
+            """)
+        for table in stale:
+            _rebuild_table(conn, table, canonical[table])
+        _drop_orphans(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+    return set(stale)
+
+
+def _migrate_drop_daynum(conn):
+    """
+    Version 2: drops the DayNum column (julian day of DueDate), which
+    nothing ever read.
+    """
+    columns = {r["name"] for r in conn.execute("PRAGMA table_xinfo(Assessments)")}
+    if "DayNum" in columns:
+        conn.execute("ALTER TABLE Assessments DROP COLUMN DayNum")
+        conn.commit()
+    return set()
+
+
+def _migrate_load_upsert(conn):
+    """
+    Version 3: the load table triggers now upsert (they come back with the
+    schema). Under INSERT OR IGNORE the old ones kept stale counts, so the
+    table is refilled.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'StudentWeekLoad'").fetchone():
+        rebuild_student_week_load(conn)
+    return set()
+
+
+def _migrate_load_edit_triggers(conn):
+    """
+    Version 4: new load table triggers for enrollments and targets edited
+    in place and for a course changing level. Counts left stale by such
+    edits before them are fixed by refilling the table.
+    """
+    return _migrate_load_upsert(conn)
+
+
+MIGRATIONS = [
+    _migrate_canonical_tables,
+    _migrate_drop_daynum,
+    _migrate_load_upsert,
+    _migrate_load_edit_triggers,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+@instrumented
+def ensure_schema(conn, force=False):
+    """
+    Brings the database up to SCHEMA_VERSION: runs the migrations it hasn't
+    had, then creates whatever tables, indexes, triggers and derived tables
+    are missing. A database already at SCHEMA_VERSION is left alone unless
+    force is set (e.g. to put back triggers dropped for a bulk load).
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise sqlite3.DatabaseError(
+            f"database is at schema version {version}, newer than this program's {SCHEMA_VERSION}"
+        )
+    if version == SCHEMA_VERSION and not force:
+        return
+
+    rebuilt = set()
+    for migrate in MIGRATIONS[version:]:
+        rebuilt |= migrate(conn)
+
+    _create_tables(conn)
+
+    load_table_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'StudentWeekLoad'"
+    ).fetchone()
+    conn.executescript(_student_week_load_sql())
+    if not load_table_exists or rebuilt:
+        rebuild_student_week_load(conn)
+
+    conn.executescript(_changelog_sql())
+
+    if _fts5_available():
+        search_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'StudentSearch'"
+        ).fetchone()
+        conn.executescript(_search_index_sql())
+        # search rows are keyed by rowid, which a rebuilt table renumbers
+        if not search_exists or rebuilt:
+            rebuild_search_index(conn)
+
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+
+
+# WeekKey ('%Y-%W') is derived from DueDate so week lookups can use
+# idx_assessment_priority_week instead of running strftime() over every
+# row. It is added with ALTER TABLE so databases created before the column
+# existed pick it up too.
+_WEEK_COLUMNS = {
+    "WeekKey": "TEXT GENERATED ALWAYS AS (strftime('%Y-%W', DueDate)) VIRTUAL",
+}
+
+
+def _ensure_week_columns(conn):
+    existing = {r["name"] for r in conn.execute("PRAGMA table_xinfo(Assessments)")}
+    for column, definition in _WEEK_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE Assessments ADD COLUMN {column} {definition}")
+
+
+# StudentWeekLoad keeps one row per (student, week) with the number of major
+# assessments that student has that week, so conflict detection is a range
+# scan on MajorCount instead of the full five-way join.
+# The triggers recount only the (student, week) keys touched by a write.
+_LOAD_RECOUNT = """
+    (SELECT COUNT(DISTINCT a.AssessmentID)
+       FROM Enrollments e
+       JOIN Courses c ON e.CourseID = c.CourseID
+       JOIN AssessmentTargets at ON c.CourseID = at.CourseID
+       JOIN Assessments a ON at.AssessmentID = a.AssessmentID
+      WHERE e.StudentID = k.StudentID
+        AND a.WeekKey = k.Week
+        AND a.Priority = 1
+        AND (a.Audience = 'Both' OR a.Audience = c.CourseLevel))
+"""
+
+# (student, week) keys each trigger has to recount
+_LOAD_KEYS = {
+    "target_insert": """
+        SELECT e.StudentID, a.WeekKey AS Week
+        FROM Enrollments e, Assessments a
+        WHERE e.CourseID = NEW.CourseID
+          AND a.AssessmentID = NEW.AssessmentID
+          AND a.Priority = 1
+    """,
+    "target_delete": """
+        SELECT e.StudentID, a.WeekKey AS Week
+        FROM Enrollments e, Assessments a
+        WHERE e.CourseID = OLD.CourseID
+          AND a.AssessmentID = OLD.AssessmentID
+          AND a.Priority = 1
+    """,
+    "assessment_update": """
+        SELECT e.StudentID, w.Week
+        FROM AssessmentTargets at
+        JOIN Enrollments e ON e.CourseID = at.CourseID,
+             (SELECT OLD.WeekKey AS Week
+              UNION
+              SELECT NEW.WeekKey) w
+        WHERE at.AssessmentID = NEW.AssessmentID
+    """,
+    "enroll_insert": """
+        SELECT NEW.StudentID AS StudentID, a.WeekKey AS Week
+        FROM AssessmentTargets at
+        JOIN Assessments a ON at.AssessmentID = a.AssessmentID
+        WHERE at.CourseID = NEW.CourseID
+          AND a.Priority = 1
+    """,
+    "enroll_delete": """
+        SELECT OLD.StudentID AS StudentID, a.WeekKey AS Week
+        FROM AssessmentTargets at
+        JOIN Assessments a ON at.AssessmentID = a.AssessmentID
+        WHERE at.CourseID = OLD.CourseID
+          AND a.Priority = 1
+    """,
+    "course_update": """
+        SELECT e.StudentID, a.WeekKey AS Week
+        FROM Enrollments e
+        JOIN AssessmentTargets at ON at.CourseID = e.CourseID
+        JOIN Assessments a ON at.AssessmentID = a.AssessmentID
+        WHERE e.CourseID = NEW.CourseID
+          AND a.Priority = 1
+    """,
+}
+
+
+# an upsert, not INSERT OR REPLACE: a trigger's OR clause gives way to the
+# one on the statement that fired it, so under INSERT OR IGNORE INTO
+# Enrollments a REPLACE here would silently keep the old count
+def _load_refresh_sql(keys):
+    return f"""
+        INSERT INTO StudentWeekLoad (StudentID, Week, MajorCount)
+        SELECT k.StudentID, k.Week, {_LOAD_RECOUNT}
+        FROM ({keys}) k
+        WHERE k.Week IS NOT NULL
+        ON CONFLICT (StudentID, Week) DO UPDATE SET MajorCount = excluded.MajorCount;
+        DELETE FROM StudentWeekLoad WHERE MajorCount <= 0;
+    """
+
+
+def _student_week_load_sql():
+    return f"""
+    CREATE TABLE IF NOT EXISTS StudentWeekLoad (
+        StudentID TEXT NOT NULL,
+        Week TEXT NOT NULL,
+        MajorCount INTEGER NOT NULL,
+        PRIMARY KEY (StudentID, Week)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_load_count ON StudentWeekLoad(MajorCount);
+
+    DROP TRIGGER IF EXISTS trg_load_target_insert;
+    CREATE TRIGGER trg_load_target_insert AFTER INSERT ON AssessmentTargets
+    BEGIN
+        {_load_refresh_sql(_LOAD_KEYS["target_insert"])}
+    END;
+
+    -- when a whole assessment is deleted its row is already gone by the time
+    -- the cascade reaches AssessmentTargets, so trg_load_assessment_delete
+    -- handles that case and this one only matters for single-target removals
+    DROP TRIGGER IF EXISTS trg_load_target_delete;
+    CREATE TRIGGER trg_load_target_delete AFTER DELETE ON AssessmentTargets
+    BEGIN
+        {_load_refresh_sql(_LOAD_KEYS["target_delete"])}
+    END;
+
+    DROP TRIGGER IF EXISTS trg_load_assessment_delete;
+    CREATE TRIGGER trg_load_assessment_delete BEFORE DELETE ON Assessments
+    WHEN OLD.Priority = 1
+    BEGIN
+        UPDATE StudentWeekLoad
+        SET MajorCount = MajorCount - 1
+        WHERE Week = OLD.WeekKey
+          AND StudentID IN (
+                SELECT e.StudentID
+                FROM AssessmentTargets at
+                JOIN Courses c ON at.CourseID = c.CourseID
+                JOIN Enrollments e ON e.CourseID = c.CourseID
+                WHERE at.AssessmentID = OLD.AssessmentID
+                  AND (OLD.Audience = 'Both' OR OLD.Audience = c.CourseLevel)
+          );
+        DELETE FROM StudentWeekLoad WHERE MajorCount <= 0;
+    END;
+
+    DROP TRIGGER IF EXISTS trg_load_assessment_update;
+    CREATE TRIGGER trg_load_assessment_update
+    AFTER UPDATE OF DueDate, Priority, Audience ON Assessments
+    WHEN OLD.Priority = 1 OR NEW.Priority = 1
+    BEGIN
+        {_load_refresh_sql(_LOAD_KEYS["assessment_update"])}
+    END;
+
+    DROP TRIGGER IF EXISTS trg_load_enroll_insert;
+    CREATE TRIGGER trg_load_enroll_insert AFTER INSERT ON Enrollments
+    BEGIN
+        {_load_refresh_sql(_LOAD_KEYS["enroll_insert"])}
+    END;
+
+    DROP TRIGGER IF EXISTS trg_load_enroll_delete;
+    CREATE TRIGGER trg_load_enroll_delete AFTER DELETE ON Enrollments
+    BEGIN
+        {_load_refresh_sql(_LOAD_KEYS["enroll_delete"])}
+    END;
+
+    -- edits in place count as the old row removed and the new one added
+    DROP TRIGGER IF EXISTS trg_load_enroll_update;
+    CREATE TRIGGER trg_load_enroll_update AFTER UPDATE OF StudentID, CourseID ON Enrollments
+    BEGIN
+        {_load_refresh_sql(_LOAD_KEYS["enroll_delete"])}
+        {_load_refresh_sql(_LOAD_KEYS["enroll_insert"])}
+    END;
+
+    DROP TRIGGER IF EXISTS trg_load_target_update;
+    CREATE TRIGGER trg_load_target_update AFTER UPDATE OF AssessmentID, CourseID ON AssessmentTargets
+    BEGIN
+        {_load_refresh_sql(_LOAD_KEYS["target_delete"])}
+        {_load_refresh_sql(_LOAD_KEYS["target_insert"])}
+    END;
+
+    -- the level decides which SL/HL assessments reach the course
+    DROP TRIGGER IF EXISTS trg_load_course_update;
+    CREATE TRIGGER trg_load_course_update AFTER UPDATE OF CourseLevel ON Courses
+    WHEN OLD.CourseLevel IS NOT NEW.CourseLevel
+    BEGIN
+        {_load_refresh_sql(_LOAD_KEYS["course_update"])}
+    END;
+
+    DROP TRIGGER IF EXISTS trg_load_student_delete;
+    CREATE TRIGGER trg_load_student_delete AFTER DELETE ON Students
+    BEGIN
+        DELETE FROM StudentWeekLoad WHERE StudentID = OLD.StudentID;
+    END;
+    """
+
+
+@instrumented
+def rebuild_student_week_load(conn):
+    """
+    Recomputes StudentWeekLoad from scratch.
+    The triggers keep it current on every write, so this is only needed to
+    repair drift (e.g. after the database was edited by hand).
+    """
+    conn.execute("DELETE FROM StudentWeekLoad")
+    conn.execute("""
+        INSERT INTO StudentWeekLoad (StudentID, Week, MajorCount)
+        SELECT e.StudentID,
+               a.WeekKey AS Week,
+               COUNT(DISTINCT a.AssessmentID)
+        FROM Enrollments e
+        JOIN Courses c ON e.CourseID = c.CourseID
+        JOIN AssessmentTargets at ON c.CourseID = at.CourseID
+        JOIN Assessments a ON at.AssessmentID = a.AssessmentID
+        WHERE a.Priority = 1
+          AND (a.Audience = 'Both' OR a.Audience = c.CourseLevel)
+          AND Week IS NOT NULL
+        GROUP BY e.StudentID, Week
     """)
     conn.commit()
+    _touch("StudentWeekLoad")
+
+# change log
+# Every insert, update and delete on the base tables appends a row to
+# ChangeLog, so anything derived from the database (exports, caches,
+# reports, calendar feeds) can pick up where it left off instead of
+# rescanning everything. A consumer does one full pass, remembers
+# get_change_cursor(), and from then on reads get_changes_since(cursor).
+# RowKey is the row's key, "a|b" for the two link tables; a consumer
+# re-reads that row and treats it as deleted if it is gone.
+
+# table -> SQL for the key of a row, with {row} standing for NEW or OLD
+_CHANGELOG_KEYS = {
+    "Teacher": "{row}.TeacherID",
+    "Courses": "{row}.CourseID",
+    "Students": "{row}.StudentID",
+    "Enrollments": "{row}.StudentID || '|' || {row}.CourseID",
+    "Assessments": "{row}.AssessmentID",
+    "AssessmentTargets": "{row}.AssessmentID || '|' || {row}.CourseID",
+}
+
+# most changes handed out by one get_changes_since call
+CHANGELOG_BATCH = 1000
+
+
+def _changelog_sql():
+    parts = ["""
+    CREATE TABLE IF NOT EXISTS ChangeLog (
+        Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        TableName TEXT NOT NULL,
+        Op TEXT NOT NULL CHECK (Op IN ('insert','update','delete')),
+        RowKey TEXT NOT NULL,
+        ChangedAt TEXT NOT NULL DEFAULT (datetime('now','localtime'))
+    );
+    """]
+    for table, key in _CHANGELOG_KEYS.items():
+        new, old = key.format(row="NEW"), key.format(row="OLD")
+        parts.append(f"""
+    DROP TRIGGER IF EXISTS trg_log_{table}_insert;
+    CREATE TRIGGER trg_log_{table}_insert AFTER INSERT ON {table}
+    BEGIN
+        INSERT INTO ChangeLog (TableName, Op, RowKey) VALUES ('{table}', 'insert', {new});
+    END;
+
+    -- a changed key reads as the old key deleted and the new one updated
+    DROP TRIGGER IF EXISTS trg_log_{table}_update;
+    CREATE TRIGGER trg_log_{table}_update AFTER UPDATE ON {table}
+    BEGIN
+        INSERT INTO ChangeLog (TableName, Op, RowKey)
+        SELECT '{table}', 'delete', {old} WHERE {old} IS NOT {new};
+        INSERT INTO ChangeLog (TableName, Op, RowKey) VALUES ('{table}', 'update', {new});
+    END;
+
+    DROP TRIGGER IF EXISTS trg_log_{table}_delete;
+    CREATE TRIGGER trg_log_{table}_delete AFTER DELETE ON {table}
+    BEGIN
+        INSERT INTO ChangeLog (TableName, Op, RowKey) VALUES ('{table}', 'delete', {old});
+    END;
+        """)
+    return "".join(parts)
+
+
+@instrumented
+def get_change_cursor(conn):
+    """Seq of the newest change, 0 if nothing has been logged."""
+    return conn.execute("SELECT COALESCE(MAX(Seq), 0) FROM ChangeLog").fetchone()[0]
+
+
+@instrumented
+def get_changes_since(conn, cursor=0, limit=CHANGELOG_BATCH, tables=None):
+    """
+    Changes after cursor in the order they happened, at most limit of them,
+    optionally only for some tables. The Seq of the last row is the cursor
+    for the next call; fewer than limit rows means the consumer has caught up.
+    """
+    filters = ["Seq > ?"]
+    params = [cursor]
+    if tables:
+        tables = list(tables)
+        filters.append(f"TableName IN ({','.join('?' * len(tables))})")
+        params.extend(tables)
+    page, page_params = _page_clause(limit, 0)
+    return conn.execute(f"""
+        SELECT Seq, TableName, Op, RowKey, ChangedAt
+        FROM ChangeLog
+        WHERE {' AND '.join(filters)}
+        ORDER BY Seq
+        {page}
+    """, (*params, *page_params)).fetchall()
+
+
+@instrumented
+def compact_changelog(conn, upto=None):
+    """
+    Drops every change at or below Seq upto (default: all of them) that is
+    not the newest change to its row. Whatever cursor a consumer holds, the
+    newest change to each row it hasn't seen is kept, so it still finds
+    every row that changed, just once. Returns the number of rows removed.
+    """
+    if upto is None:
+        upto = get_change_cursor(conn)
+    cursor = conn.execute("""
+        DELETE FROM ChangeLog
+        WHERE Seq <= ?
+          AND Seq NOT IN (
+                SELECT MAX(Seq) FROM ChangeLog GROUP BY TableName, RowKey
+          )
+    """, (upto,))
+    conn.commit()
+    return cursor.rowcount
+
+
+# full-text search
+# One FTS5 table per searchable list, keyed on the rowid of the row it
+# indexes and kept in step by triggers. All words typed must match; the
+# last one may be the start of a word, so results narrow while typing.
+# Results are ranked with bm25 unless so many rows match that ranking them
+# would cost more than it tells (a search for "s" say), in which case they
+# come back in table order. Builds of SQLite without FTS5 fall back to LIKE
+# over the same columns.
+# Rowids of tables without an INTEGER PRIMARY KEY can change on VACUUM;
+# rebuild_search_index (also run by rebuild_indexes) re-syncs after one.
+
+# name -> FTS table, base table, FROM clause (base aliased b), indexed columns
+_SEARCH_INDEXES = {
+    "teachers": ("TeacherSearch", "Teacher", "Teacher b", {
+        "TeacherName": "b.TeacherName",
+    }),
+    "courses": ("CourseSearch", "Courses", "Courses b LEFT JOIN Teacher t ON t.TeacherID = b.TeacherID", {
+        "CourseName": "b.CourseName",
+        "CourseLevel": "b.CourseLevel",
+        "TeacherName": "t.TeacherName",
+    }),
+    "students": ("StudentSearch", "Students", "Students b", {
+        "StudentID": "b.StudentID",
+        "Name": "b.Name",
+    }),
+    "assessments": ("AssessmentSearch", "Assessments", "Assessments b", {
+        "AssessmentName": "b.AssessmentName",
+    }),
+}
+
+# rows returned by search(), shaped like get_all_<kind>; {matches} yields (rowid, score)
+_SEARCH_RESULTS = {
+    "teachers": """
+        SELECT b.*
+        FROM {matches} f
+        CROSS JOIN Teacher b ON b.rowid = f.rowid
+        ORDER BY f.score, f.rowid
+    """,
+    "courses": """
+        SELECT b.CourseID, b.CourseName, b.CourseLevel, t.TeacherName
+        FROM {matches} f
+        CROSS JOIN Courses b ON b.rowid = f.rowid
+        LEFT JOIN Teacher t ON b.TeacherID = t.TeacherID
+        ORDER BY f.score, f.rowid
+    """,
+    "students": """
+        SELECT b.*
+        FROM {matches} f
+        CROSS JOIN Students b ON b.rowid = f.rowid
+        ORDER BY f.score, f.rowid
+    """,
+    "assessments": """
+        SELECT a.AssessmentID,
+               a.AssessmentName,
+               a.DueDate,
+               a.Priority,
+               a.Audience,
+               a.CreatedAt,
+               GROUP_CONCAT(at.CourseID) AS TargetCourseIDs
+        FROM {matches} f
+        CROSS JOIN Assessments a ON a.rowid = f.rowid
+        LEFT JOIN AssessmentTargets at ON a.AssessmentID = at.AssessmentID
+        GROUP BY a.AssessmentID
+        ORDER BY f.score, f.rowid
+    """,
+}
+
+# most rows a search returns unless asked for more
+SEARCH_LIMIT = 200
+
+# searches matching more rows than this are not ranked
+SEARCH_RANK_LIMIT = 2000
+
+
+@functools.lru_cache(maxsize=None)
+def _fts5_available():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def _search_fill_sql(kind, where):
+    table, _, source, columns = _SEARCH_INDEXES[kind]
+    return f"""
+        INSERT INTO {table} (rowid, {", ".join(columns)})
+        SELECT b.rowid, {", ".join(columns.values())}
+        FROM {source}
+        WHERE {where};
+    """
+
+
+def _search_index_sql():
+    parts = []
+    for kind, (table, base, _, columns) in _SEARCH_INDEXES.items():
+        parts.append(f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+        {", ".join(columns)},
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    );
+
+    DROP TRIGGER IF EXISTS trg_{table}_insert;
+    CREATE TRIGGER trg_{table}_insert AFTER INSERT ON {base}
+    BEGIN
+        {_search_fill_sql(kind, "b.rowid = NEW.rowid")}
+    END;
+
+    DROP TRIGGER IF EXISTS trg_{table}_update;
+    CREATE TRIGGER trg_{table}_update AFTER UPDATE ON {base}
+    BEGIN
+        DELETE FROM {table} WHERE rowid = OLD.rowid;
+        {_search_fill_sql(kind, "b.rowid = NEW.rowid")}
+    END;
+
+    DROP TRIGGER IF EXISTS trg_{table}_delete;
+    CREATE TRIGGER trg_{table}_delete AFTER DELETE ON {base}
+    BEGIN
+        DELETE FROM {table} WHERE rowid = OLD.rowid;
+    END;
+        """)
+
+    # courses are also found by their teacher's name
+    for event, row in (("UPDATE OF TeacherName", "NEW"), ("DELETE", "OLD")):
+        name = event.split()[0].lower()
+        parts.append(f"""
+    DROP TRIGGER IF EXISTS trg_CourseSearch_teacher_{name};
+    CREATE TRIGGER trg_CourseSearch_teacher_{name} AFTER {event} ON Teacher
+    BEGIN
+        DELETE FROM CourseSearch
+        WHERE rowid IN (SELECT rowid FROM Courses WHERE TeacherID = {row}.TeacherID);
+        {_search_fill_sql("courses", f"b.TeacherID = {row}.TeacherID")}
+    END;
+        """)
+    return "".join(parts)
+
+
+@instrumented
+def rebuild_search_index(conn):
+    """Refills every search table from the base tables."""
+    if not _fts5_available():
+        return
+    for kind, (table, *_) in _SEARCH_INDEXES.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(_search_fill_sql(kind, "1"))
+        conn.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+    conn.commit()
+
+
+def _search_words(text):
+    return re.findall(r"\w+", text or "")
+
+
+def _search_query(words):
+    # only the last word is a prefix: a prefix query reads its whole match
+    # list up front, a whole word is read lazily
+    return " ".join(f'"{w}"' for w in words[:-1]) + f' "{words[-1]}"*'
+
+
+def _search_count(conn, kind, words, cap):
+    """Rows matching every word, counted up to cap + 1."""
+    table, _, source, columns = _SEARCH_INDEXES[kind]
+    if _fts5_available():
+        sql, params = f"SELECT 1 FROM {table} WHERE {table} MATCH ?", (_search_query(words),)
+    else:
+        sql, params = _search_matches(conn, kind, words, ranked=False)
+        sql = f"SELECT 1 FROM {sql}"
+    return conn.execute(f"SELECT COUNT(*) FROM ({sql} LIMIT ?)", (*params, cap + 1)).fetchone()[0]
+
+
+def _search_matches(conn, kind, words, limit=None, offset=0, ranked=True):
+    """
+    FROM-clause source of (rowid, score) for the rows matching every word,
+    best first, with its parameters.
+    """
+    table, _, source, columns = _SEARCH_INDEXES[kind]
+    page, page_params = _page_clause(limit, offset)
+    if _fts5_available():
+        if ranked:
+            ranked = _search_count(conn, kind, words, SEARCH_RANK_LIMIT) <= SEARCH_RANK_LIMIT
+        score = "rank" if ranked else "0"
+        return f"""
+            (SELECT rowid, {score} AS score FROM {table}
+             WHERE {table} MATCH ?
+             ORDER BY {"rank, " if ranked else ""}rowid
+             {page})
+        """, (_search_query(words), *page_params)
+
+    # no FTS5: every word has to appear somewhere in the row
+    any_column = "(" + " OR ".join(f"{c} LIKE ?" for c in columns.values()) + ")"
+    return f"""
+        (SELECT b.rowid AS rowid, 0 AS score FROM {source}
+         WHERE {" AND ".join([any_column] * len(words))}
+         ORDER BY b.rowid
+         {page})
+    """, tuple(f"%{w}%" for w in words for _ in columns)
+
+
+@instrumented
+def search(conn, kind, text, limit=SEARCH_LIMIT, offset=0):
+    """
+    Rows of get_all_<kind> (teachers, courses, students or assessments)
+    matching text, best match first. Every word must match a whole word in
+    the row except the last, which matches any word starting with it, e.g.
+    "student 12" finds "Student 12..." and "S0001" finds StudentIDs starting
+    with it. Blank text returns no rows.
+    """
+    words = _search_words(text)
+    if not words:
+        return []
+    matches, params = _search_matches(conn, kind, words, limit, offset)
+    return conn.execute(_SEARCH_RESULTS[kind].format(matches=matches), params).fetchall()
 
+
+@instrumented
 def add_teacher(conn, teacher_name):
     conn.execute(
         "INSERT INTO Teacher (TeacherName) VALUES (?)",
         (teacher_name,)
     )
     conn.commit()
+    _touch("Teacher")
 
 
+@instrumented
 def get_all_teachers(conn):
     return conn.execute(
         "SELECT * FROM Teacher ORDER BY TeacherName"
     ).fetchall()
 
 
+@instrumented
 def delete_teacher(conn, teacher_id):
     conn.execute(
         "DELETE FROM Teacher WHERE TeacherID = ?",
         (teacher_id,)
     )
     conn.commit()
+    _touch("Teacher", "Courses")
 
+@instrumented
 def add_course(conn, name, level, teacher_id):
     conn.execute(
         "INSERT INTO Courses (CourseName, CourseLevel, TeacherID) VALUES (?,?,?)",
         (name, level, teacher_id)
     )
     conn.commit()
+    _touch("Courses")
 
 
+@instrumented
 def get_all_courses(conn):
     return conn.execute("""
         SELECT c.CourseID, c.CourseName, c.CourseLevel, t.TeacherName
@@ -99,42 +1089,87 @@ def get_all_courses(conn):
     """).fetchall()
 
 
+@instrumented
 def delete_course(conn, course_id):
     conn.execute(
         "DELETE FROM Courses WHERE CourseID = ?",
         (course_id,)
     )
     conn.commit()
+    _touch("Courses", "Enrollments", "AssessmentTargets", "StudentWeekLoad")
 
+@instrumented
 def add_student(conn, student_id, name, grade):
     conn.execute(
         "INSERT INTO Students (StudentID, Name, GradeLevel) VALUES (?,?,?)",
         (student_id, name, grade)
     )
     conn.commit()
+    _touch("Students")
+
 
+def _page_clause(limit, offset):
+    # LIMIT/OFFSET for the paged tables in the GUI; no clause returns everything
+    if limit is None:
+        return "", ()
+    return "LIMIT ? OFFSET ?", (limit, offset)
 
-def get_all_students(conn):
+
+@instrumented
+def get_all_students(conn, limit=None, offset=0):
+    page, page_params = _page_clause(limit, offset)
     return conn.execute(
-        "SELECT * FROM Students ORDER BY StudentID"
+        f"SELECT * FROM Students ORDER BY StudentID {page}",
+        page_params
     ).fetchall()
 
 
+@instrumented
 def delete_student(conn, student_id):
     conn.execute(
         "DELETE FROM Students WHERE StudentID = ?",
         (student_id,)
     )
     conn.commit()
+    _touch("Students", "Enrollments", "StudentWeekLoad")
 
+@instrumented
 def enroll_student(conn, student_id, course_id):
     conn.execute(
         "INSERT INTO Enrollments (StudentID, CourseID) VALUES (?,?)",
         (student_id, course_id)
     )
     conn.commit()
+    _touch("Enrollments", "StudentWeekLoad")
+
+
+@instrumented
+def enroll_students_bulk(conn, pairs, ignore_duplicates=False):
+    """
+    Enrolls many (student_id, course_id) pairs in one transaction.
+    Either every pair is saved or none is. With ignore_duplicates, pairs that
+    are already enrolled are skipped instead of failing the whole batch.
+    Returns {"inserted": n, "skipped": n}.
+    """
+    pairs = list(pairs)
+    verb = "INSERT OR IGNORE" if ignore_duplicates else "INSERT"
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            f"{verb} INTO Enrollments (StudentID, CourseID) VALUES (?,?)",
+            pairs
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    _touch("Enrollments", "StudentWeekLoad")
+
+    inserted = max(cursor.rowcount, 0)
+    return {"inserted": inserted, "skipped": len(pairs) - inserted}
 
 
+@instrumented
 def get_student_courses(conn, student_id):
     return conn.execute("""
         SELECT c.CourseID, c.CourseName, c.CourseLevel
@@ -143,9 +1178,96 @@ def get_student_courses(conn, student_id):
         WHERE e.StudentID = ?
     """, (student_id,)).fetchall()
 
-def add_assessment(conn, name, due_date, priority, audience, target_course_ids):
-    cursor = conn.cursor()
 
+def _search_is_narrow(conn, words):
+    if _search_count(conn, "students", words, 500) > 500:
+        return False
+    if _search_count(conn, "courses", words, 200) > 200:
+        return False
+    courses, params = _search_matches(conn, "courses", words, ranked=False)
+    enrolled = conn.execute(f"""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM Enrollments
+            WHERE CourseID IN (SELECT b.CourseID FROM {courses} f CROSS JOIN Courses b ON b.rowid = f.rowid)
+            LIMIT 5001
+        )
+    """, params).fetchone()[0]
+    return enrolled <= 5000
+
+
+def _enrollment_search(conn, words):
+    # condition on Enrollments e that its student or course matches the search
+    students, student_params = _search_matches(conn, "students", words, ranked=False)
+    courses, course_params = _search_matches(conn, "courses", words, ranked=False)
+    return f"""(
+            e.StudentID IN (SELECT b.StudentID FROM {students} f CROSS JOIN Students b ON b.rowid = f.rowid)
+            OR e.CourseID IN (SELECT b.CourseID FROM {courses} f CROSS JOIN Courses b ON b.rowid = f.rowid)
+        )""", (*student_params, *course_params)
+
+
+@instrumented
+def get_all_enrollments(conn, student_id=None, course_id=None, limit=None, offset=0, search=None):
+    """
+    Every enrollment joined with its student and course in one query,
+    optionally narrowed to one student and/or one course, and with search
+    text to those whose student or course matches it (see search()).
+    """
+    filters = []
+    params = []
+    if student_id is not None:
+        filters.append("e.StudentID = ?")
+        params.append(student_id)
+    if course_id is not None:
+        filters.append("e.CourseID = ?")
+        params.append(course_id)
+    words = _search_words(search)
+    # A search matching a few thousand enrollments at most is answered
+    # straight from the match lists; a broader one walks students in order
+    # (below) and stops once the page is full.
+    narrow = not words or _search_is_narrow(conn, words)
+    if words:
+        condition, search_params = _enrollment_search(conn, words)
+        filters.append(condition)
+        params.extend(search_params)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    page, page_params = _page_clause(limit, offset)
+
+    # Without a course filter the planner starts from Courses and sorts every
+    # enrollment before LIMIT; walking Students in key order instead only
+    # sorts each student's few courses, so a page costs its own rows.
+    # CROSS JOIN pins that order. A course filter or a narrow search is
+    # selective enough that the planner should start from it instead.
+    students_join = "JOIN" if course_id is not None or (words and narrow) else "CROSS JOIN"
+
+    return conn.execute(f"""
+        SELECT e.EnrollmentID,
+               e.StudentID,
+               s.Name,
+               c.CourseID,
+               c.CourseName,
+               c.CourseLevel
+        FROM Students s
+        {students_join} Enrollments e ON e.StudentID = s.StudentID
+        JOIN Courses c ON e.CourseID = c.CourseID
+        {where}
+        ORDER BY s.StudentID, c.CourseName, c.CourseLevel, e.EnrollmentID
+        {page}
+    """, (*params, *page_params)).fetchall()
+
+def iso_date(value):
+    """
+    YYYY-MM-DD, zero-padded, for a date typed as Y-M-D (2026-2-3 becomes
+    2026-02-03). Raises ValueError for anything else. DueDate is always
+    stored this way: WeekKey and every date comparison depend on it.
+    """
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f"bad date {value!r}, expected YYYY-MM-DD") from None
+
+
+def _insert_assessment(cursor, name, due_date, priority, audience, target_course_ids):
+    due_date = iso_date(due_date)
     cursor.execute("""
         INSERT INTO Assessments (AssessmentName, DueDate, Priority, Audience)
         VALUES (?,?,?,?)
@@ -153,17 +1275,27 @@ def add_assessment(conn, name, due_date, priority, audience, target_course_ids):
 
     assessment_id = cursor.lastrowid
 
-    for cid in target_course_ids:
-        cursor.execute("""
-            INSERT INTO AssessmentTargets (AssessmentID, CourseID)
-            VALUES (?,?)
-        """, (assessment_id, cid))
+    cursor.executemany("""
+        INSERT INTO AssessmentTargets (AssessmentID, CourseID)
+        VALUES (?,?)
+    """, [(assessment_id, cid) for cid in target_course_ids])
+
+    return assessment_id
+
 
+@instrumented
+def add_assessment(conn, name, due_date, priority, audience, target_course_ids):
+    cursor = conn.cursor()
+    assessment_id = _insert_assessment(cursor, name, due_date, priority, audience, target_course_ids)
     conn.commit()
+    _touch("Assessments", "AssessmentTargets", "StudentWeekLoad")
+    return assessment_id
 
 
-def get_all_assessments(conn):
-    return conn.execute("""
+@instrumented
+def get_all_assessments(conn, limit=None, offset=0):
+    page, page_params = _page_clause(limit, offset)
+    return conn.execute(f"""
         SELECT a.AssessmentID,
                a.AssessmentName,
                a.DueDate,
@@ -174,52 +1306,298 @@ def get_all_assessments(conn):
         FROM Assessments a
         LEFT JOIN AssessmentTargets at ON a.AssessmentID = at.AssessmentID
         GROUP BY a.AssessmentID
-        ORDER BY a.DueDate
-    """).fetchall()
+        ORDER BY a.DueDate, a.AssessmentID
+        {page}
+    """, page_params).fetchall()
 
 
+@instrumented
 def delete_assessment(conn, assessment_id):
     conn.execute(
         "DELETE FROM Assessments WHERE AssessmentID = ?",
         (assessment_id,)
     )
     conn.commit()
+    _touch("Assessments", "AssessmentTargets", "StudentWeekLoad")
+
+class LookupCache:
+    """
+    Keeps the teacher, course and student lists the pages fill their combos
+    from, so switching pages doesn't re-query them when nothing changed.
+
+    An entry is reused while the tables it reads have the same version and
+    PRAGMA data_version shows no commit from another connection or process
+    (which drops every entry, since we can't tell which tables it touched).
+    While an entry is valid the same list object is returned, so callers can
+    skip rebuilding widgets with an identity check.
+    """
+
+    # name -> (backend function, tables its result depends on)
+    SOURCES = {
+        "teachers": (get_all_teachers, ("Teacher",)),
+        "courses": (get_all_courses, ("Courses", "Teacher")),
+        "students": (get_all_students, ("Students",)),
+    }
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.entries = {}  # name -> (table versions, rows)
+        self.data_version = None
+
+    def _check_data_version(self):
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self.data_version:
+            self.entries.clear()
+            self.data_version = data_version
+
+    def get(self, name):
+        self._check_data_version()
+        fn, tables = self.SOURCES[name]
+        versions = tuple(table_version(t) for t in tables)
+        entry = self.entries.get(name)
+        if entry is not None and entry[0] == versions:
+            return entry[1]
+
+        rows = fn(self.conn)
+        self.entries[name] = (versions, rows)
+        return rows
+
+    def teachers(self):
+        return self.get("teachers")
+
+    def courses(self):
+        return self.get("courses")
+
+    def students(self):
+        return self.get("students")
+
+    def stamp(self, *tables):
+        """A value that changes whenever any of tables may have changed."""
+        self._check_data_version()
+        return (self.data_version, tuple(table_version(t) for t in tables))
+
+    def clear(self):
+        self.entries.clear()
+
+
+@instrumented
+def reschedule_assessments(conn, moves):
+    """
+    Applies date moves ({AssessmentID, From, To} dicts, e.g. a plan from
+    Scheduler.plan_reschedule) in one transaction. The load table triggers
+    follow the new dates. If any assessment no longer has its From date
+    the plan is stale and nothing is changed; so is a bad date.
+    """
+    moves = list(moves)
+    cursor = conn.cursor()
+    try:
+        for m in moves:
+            cursor.execute(
+                "UPDATE Assessments SET DueDate = ? WHERE AssessmentID = ? AND DueDate = ?",
+                (iso_date(m["To"]), m["AssessmentID"], iso_date(m["From"]))
+            )
+            if cursor.rowcount != 1:
+                raise ValueError(f"assessment {m['AssessmentID']} changed since the plan was made")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    _touch("Assessments", "StudentWeekLoad")
+    return len(moves)
+
+
+# conflict rules
+# A rule is "threshold or more majors inside one window", where the window is
+# either the calendar week (%Y-%W, the WeekKey column) or any run of N
+# consecutive days. Detection, details, reports, suggestions and the impact
+# check all take a rule; the calendar week keeps using StudentWeekLoad.
+
+class ConflictRule:
+    """
+    threshold majors within window, window being "week" or a number of days.
+    Overloads are labelled by their week key, or for rolling windows by
+    "first..last" due date of the overloaded stretch.
+    """
+
+    def __init__(self, threshold=OVERLOAD_THRESHOLD, window="week"):
+        if window != "week":
+            try:
+                window = int(window)
+            except (TypeError, ValueError):
+                raise ValueError(f"window must be 'week' or a number of days, not {window!r}") from None
+            if window < 1:
+                raise ValueError("a rolling window must be at least 1 day")
+        if int(threshold) < 1:
+            raise ValueError("threshold must be at least 1")
+        self.threshold = int(threshold)
+        self.window = window
+
+    @property
+    def weekly(self):
+        return self.window == "week"
+
+    def heading(self):
+        if self.weekly:
+            return f"Overloaded Weeks (>={self.threshold} majors)"
+        return f"Overloaded Periods (>={self.threshold} majors in {self.window} days)"
+
+    def __repr__(self):
+        return f"ConflictRule({self.threshold}, {self.window!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, ConflictRule) and (self.threshold, self.window) == (other.threshold, other.window)
+
+    def overloads(self, due_dates):
+        """
+        (label, count) for every overload in one student's major due dates,
+        one date per distinct assessment, sorted. Rolling windows slide over
+        the dates with two pointers; overlapping overloaded windows are merged
+        into one stretch whose count is the busiest window inside it.
+        """
+        if self.weekly:
+            counts = {}
+            for d in due_dates:
+                week = datetime.fromisoformat(d).strftime("%Y-%W")
+                counts[week] = counts.get(week, 0) + 1
+            return [(week, n) for week, n in counts.items() if n >= self.threshold]
+
+        days = [datetime.fromisoformat(d).toordinal() for d in due_dates]
+        found = []
+        first = peak = None
+        i = 0
+        for j, day in enumerate(days):
+            while day - days[i] >= self.window:
+                i += 1
+            if j - i + 1 < self.threshold:
+                continue
+            if first is not None and days[i] <= days[last]:
+                peak = max(peak, j - i + 1)
+            else:
+                if first is not None:
+                    found.append((f"{due_dates[first]}..{due_dates[last]}", peak))
+                first, peak = i, j - i + 1
+            last = j
+        if first is not None:
+            found.append((f"{due_dates[first]}..{due_dates[last]}", peak))
+        return found
 
-def detect_assessment_conflicts(conn):
+    def peak_around(self, days, day):
+        """
+        (count, label) of the busiest window containing ordinal day, given a
+        student's sorted major due dates as ordinals; what one more major on
+        day would join. Sliding the window start from day - window + 1 up to
+        day, the count only drops once the start passes a date, so the best
+        start is one of the dates in that range or day itself.
+        """
+        if self.weekly:
+            week = datetime.fromordinal(day).strftime("%Y-%W")
+            count = sum(1 for d in days if datetime.fromordinal(d).strftime("%Y-%W") == week)
+            return count, week
+        first = day - self.window + 1
+        starts = days[bisect.bisect_left(days, first):bisect.bisect_left(days, day)] + [day]
+        best = max(starts, key=lambda s: bisect.bisect_right(days, s + self.window - 1) - bisect.bisect_left(days, s))
+        count = bisect.bisect_right(days, best + self.window - 1) - bisect.bisect_left(days, best)
+        label = f"{datetime.fromordinal(best).date()}..{datetime.fromordinal(best + self.window - 1).date()}"
+        return count, label
+
+
+DEFAULT_RULE = ConflictRule()
+
+
+def _window_filter(label):
+    # SQL condition on Assessments a for the assessments in an overload label
+    if ".." in label:
+        first, last = label.split("..", 1)
+        return "a.DueDate BETWEEN ? AND ?", (first, last)
+    return "a.WeekKey = ?", (label,)
+
+
+def _majors_by_course(conn):
+    # CourseID -> [(DueDate, AssessmentID)] of the majors that apply to it
+    by_course = {}
+    for r in conn.execute(f"""
+        SELECT at.CourseID, a.DueDate, a.AssessmentID
+        FROM AssessmentTargets at
+        JOIN Assessments a ON a.AssessmentID = at.AssessmentID
+        JOIN Courses c ON c.CourseID = at.CourseID
+        WHERE a.Priority = 1
+          AND (a.Audience = 'Both' OR a.Audience = c.CourseLevel)
+          AND a.DueDate IS NOT NULL
+    """):
+        by_course.setdefault(r["CourseID"], []).append((r["DueDate"], r["AssessmentID"]))
+    return by_course
+
+
+def _student_major_dates(conn, students_sql=None, params=(), first=None, last=None):
+    """
+    (StudentID, Name, sorted due dates) per student, one date per distinct
+    major assessment reaching them, optionally only students_sql and only
+    dates between first and last.
+    """
+    by_course = _majors_by_course(conn)
+    where = f"WHERE s.StudentID IN ({students_sql})" if students_sql else ""
+    rows = conn.execute(f"""
+        SELECT s.StudentID, s.Name, e.CourseID
+        FROM Students s
+        CROSS JOIN Enrollments e ON e.StudentID = s.StudentID
+        {where}
+        ORDER BY s.StudentID
+    """, params)
+    for (student_id, name), group in itertools.groupby(rows, key=lambda r: (r["StudentID"], r["Name"])):
+        majors = set()
+        for r in group:
+            majors.update(by_course.get(r["CourseID"], ()))
+        dates = sorted(d for d, _ in majors
+                       if (first is None or d >= first) and (last is None or d <= last))
+        yield student_id, name, dates
+
+
+@instrumented
+def detect_assessment_conflicts(conn, rule=None):
     """
-    Returns students who have more than 3 major assessments (Priority = 1)
-    in the same ISO week.
+    Returns students overloaded under rule: rule.threshold or more major
+    assessments (Priority = 1) inside one rule.window, either the calendar
+    week (WeekKey) or N consecutive days. rule=None means DEFAULT_RULE,
+    OVERLOAD_THRESHOLD (4) majors in one calendar week.
     Audience rule:
       - Both applies to all
       - SL applies only to SL courses
       - HL applies only to HL courses
       - Core courses are allowed only if Audience == Both (you can change this rule if your IA says otherwise)
+
+    Counts come from StudentWeekLoad, which the triggers in ensure_schema
+    keep up to date, so this is a range scan on MajorCount.
+    A rolling-window rule instead slides over every student's due dates;
+    Week is then the "first..last" stretch that is overloaded.
     """
+    rule = rule or DEFAULT_RULE
+    if not rule.weekly:
+        conflicts = [
+            {"StudentID": student_id, "Name": name, "Week": label, "MajorCount": count}
+            for student_id, name, dates in _student_major_dates(conn)
+            for label, count in rule.overloads(dates)
+        ]
+        conflicts.sort(key=lambda c: c["Week"], reverse=True)
+        return conflicts
 
     return conn.execute("""
-        SELECT 
-            s.StudentID,
+        SELECT
+            l.StudentID,
             s.Name,
-            strftime('%Y-%W', a.DueDate) AS Week,
-            COUNT(DISTINCT a.AssessmentID) AS MajorCount
-        FROM Students s
-        JOIN Enrollments e ON s.StudentID = e.StudentID
-        JOIN Courses c ON e.CourseID = c.CourseID
-        JOIN AssessmentTargets at ON c.CourseID = at.CourseID
-        JOIN Assessments a ON at.AssessmentID = a.AssessmentID
-        WHERE a.Priority = 1
-          AND (
-                a.Audience = 'Both'
-             OR (a.Audience = c.CourseLevel)      -- SL with SL, HL with HL
-          )
-        GROUP BY s.StudentID, Week
-        HAVING COUNT(DISTINCT a.AssessmentID) >= 4
-        ORDER BY Week DESC
-    """).fetchall()
+            l.Week,
+            l.MajorCount
+        FROM StudentWeekLoad l
+        JOIN Students s ON s.StudentID = l.StudentID
+        WHERE l.MajorCount >= ?
+        ORDER BY l.Week DESC
+    """, (rule.threshold,)).fetchall()
 
 
+@instrumented
 def get_student_conflict_details(conn, student_id, week):
-    return conn.execute("""
+    """Major assessments behind one row of detect_assessment_conflicts (a week key or first..last)."""
+    window, params = _window_filter(week)
+    return conn.execute(f"""
         SELECT DISTINCT
             a.AssessmentID,
             a.AssessmentName,
@@ -235,17 +1613,18 @@ def get_student_conflict_details(conn, student_id, week):
         JOIN Assessments a ON at.AssessmentID = a.AssessmentID
         LEFT JOIN Teacher t ON c.TeacherID = t.TeacherID
         WHERE e.StudentID = ?
-          AND strftime('%Y-%W', a.DueDate) = ?
+          AND {window}
           AND a.Priority = 1
           AND (
                 a.Audience = 'Both'
              OR (a.Audience = c.CourseLevel)
           )
         ORDER BY a.DueDate
-    """, (student_id, week)).fetchall()
+    """, (student_id, *params)).fetchall()
 
 # generate report function
-def generate_student_report(conn, student_id):
+@instrumented
+def generate_student_report(conn, student_id, rule=None):
     cursor = conn.cursor()
 
     # Get student name
@@ -264,7 +1643,9 @@ def generate_student_report(conn, student_id):
             a.AssessmentID,
             a.AssessmentName,
             a.DueDate,
+            a.WeekKey,
             a.Priority,
+            a.Audience,
             c.CourseName,
             c.CourseLevel,
             t.TeacherName
@@ -274,21 +1655,25 @@ def generate_student_report(conn, student_id):
         JOIN Enrollments e ON e.CourseID = c.CourseID
         LEFT JOIN Teacher t ON c.TeacherID = t.TeacherID
         WHERE e.StudentID = ?
-        ORDER BY a.DueDate
+        ORDER BY a.DueDate, a.AssessmentID, c.CourseID
     """, (student_id,))
 
-    rows = cursor.fetchall()
+    return _build_report(student_id, student_name, cursor.fetchall(), rule)
+
 
+def _build_report(student_id, student_name, rows, rule=None):
+    rule = rule or DEFAULT_RULE
     report_data = []
-    overload_weeks = {}
+    majors = {}  # AssessmentID -> DueDate of majors counted against the rule
     major_count = 0
 
     for r in rows:
-        week = datetime.strptime(r["DueDate"], "%Y-%m-%d").strftime("%Y-%W")
+        week = r["WeekKey"]
 
         if r["Priority"] == 1:
             major_count += 1
-            overload_weeks[week] = overload_weeks.get(week, 0) + 1
+            if r["Audience"] == "Both" or r["Audience"] == r["CourseLevel"]:
+                majors[r["AssessmentID"]] = r["DueDate"]
 
         report_data.append({
             "Assessment": r["AssessmentName"],
@@ -300,50 +1685,867 @@ def generate_student_report(conn, student_id):
             "Priority": r["Priority"]
         })
 
-    overloaded = [w for w, count in overload_weeks.items() if count >= 4]
+    overloaded = [label for label, _ in rule.overloads(sorted(majors.values()))]
 
     return {
         "StudentID": student_id,
         "Name": student_name,
         "TotalAssessments": len(rows),
         "TotalMajor": major_count,
+        "Rule": rule.heading(),
         "OverloadedWeeks": overloaded,
         "Details": report_data
     }
 
+
+# reports handed to a formatting process at a time
+REPORT_CHUNK_SIZE = 200
+
+REPORT_CSV_COLUMNS = ["StudentID", "Name", "DueDate", "Week", "Assessment",
+                      "Course", "Level", "Teacher", "Priority"]
+
+
+def format_report(report, fmt="txt", header=True):
+    """
+    Renders a report from generate_student_report as text, CSV or JSON.
+    header=False leaves out the CSV header line when reports are combined.
+    """
+    if fmt == "json":
+        return json.dumps(report)
+
+    if fmt == "csv":
+        out = io.StringIO()
+        writer = csv.writer(out)
+        if header:
+            writer.writerow(REPORT_CSV_COLUMNS)
+        for d in report["Details"]:
+            writer.writerow([report["StudentID"], report["Name"], d["DueDate"], d["Week"],
+                             d["Assessment"], d["Course"], d["Level"], d["Teacher"], d["Priority"]])
+        return out.getvalue()
+
+    weeks_text = ", ".join(report["OverloadedWeeks"]) if report["OverloadedWeeks"] else "None"
+    lines = [
+        f"StudentID: {report['StudentID']}",
+        f"Name: {report['Name']}",
+        f"Total Assessments: {report['TotalAssessments']}",
+        f"Major Assessments: {report['TotalMajor']}",
+        f"{report['Rule']}: {weeks_text}",
+        "",
+        "Details:",
+        "-" * 80,
+    ]
+    for d in report["Details"]:
+        lines.append(
+            f"{d['DueDate']} | Week {d['Week']} | "
+            f"{d['Assessment']} | {d['Course']} ({d['Level']}) | "
+            f"Teacher: {d['Teacher']} | Priority: {d['Priority']}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _iter_all_reports(conn, rule=None):
+    # assessments are looked up per course once; students then stream past in
+    # StudentID order and each one only merges the lists of its own courses
+    by_course = {}
+    for r in conn.execute("""
+        SELECT at.CourseID,
+               a.AssessmentID,
+               a.AssessmentName,
+               a.DueDate,
+               a.WeekKey,
+               a.Priority,
+               a.Audience,
+               c.CourseName,
+               c.CourseLevel,
+               t.TeacherName
+        FROM AssessmentTargets at
+        JOIN Assessments a ON a.AssessmentID = at.AssessmentID
+        JOIN Courses c ON c.CourseID = at.CourseID
+        LEFT JOIN Teacher t ON c.TeacherID = t.TeacherID
+    """):
+        by_course.setdefault(r["CourseID"], []).append(r)
+
+    students = conn.execute("""
+        SELECT s.StudentID, s.Name, e.CourseID
+        FROM Students s
+        LEFT JOIN Enrollments e ON e.StudentID = s.StudentID
+        ORDER BY s.StudentID
+    """)
+    for (student_id, name), group in itertools.groupby(students, key=lambda r: (r["StudentID"], r["Name"])):
+        rows = []
+        for r in group:
+            rows.extend(by_course.get(r["CourseID"], ()))
+        rows.sort(key=lambda r: (r["DueDate"], r["AssessmentID"], r["CourseID"]))
+        yield _build_report(student_id, name, rows, rule)
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _format_reports(reports, fmt, header):
+    return [format_report(report, fmt, header) for report in reports]
+
+
+def _safe_filename(student_id):
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in str(student_id))
+
+
+@instrumented
+def generate_all_reports(conn, out_path, fmt="txt", combined=False, workers=None, rule=None):
+    """
+    Writes a report for every student in one ordered query.
+    combined=True writes a single file at out_path (a JSON array for json),
+    otherwise out_path is a directory with one <StudentID>.<fmt> per student.
+    With more than one worker (default: one per CPU) formatting runs in a
+    process pool, REPORT_CHUNK_SIZE reports per task and only a couple of
+    chunks per worker in flight, so memory stays flat however many students
+    there are. Returns the number of reports written.
+    """
+    if fmt not in ("txt", "csv", "json"):
+        raise ValueError(f"unknown report format {fmt!r}")
+    if not combined:
+        os.makedirs(out_path, exist_ok=True)
+
+    written = 0
+    combined_file = open(out_path, "w", newline="") if combined else None
+
+    def write(student_id, text):
+        nonlocal written
+        if combined:
+            if fmt == "json":
+                combined_file.write(",\n" if written else "[\n")
+            combined_file.write(text)
+            if fmt == "txt":
+                combined_file.write("\n")
+        else:
+            path = os.path.join(out_path, f"{_safe_filename(student_id)}.{fmt}")
+            with open(path, "w", newline="") as f:
+                f.write(text)
+        written += 1
+
+    header = not combined
+    try:
+        if combined and fmt == "csv":
+            combined_file.write(format_report({"StudentID": "", "Name": "", "Details": []}, "csv"))
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1:
+            for report in _iter_all_reports(conn, rule):
+                write(report["StudentID"], format_report(report, fmt, header))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = deque()
+                for chunk in _chunks(_iter_all_reports(conn, rule), REPORT_CHUNK_SIZE):
+                    ids = [report["StudentID"] for report in chunk]
+                    in_flight.append((ids, pool.submit(_format_reports, chunk, fmt, header)))
+                    if len(in_flight) >= workers * 2:
+                        ids, future = in_flight.popleft()
+                        for student_id, text in zip(ids, future.result()):
+                            write(student_id, text)
+                while in_flight:
+                    ids, future = in_flight.popleft()
+                    for student_id, text in zip(ids, future.result()):
+                        write(student_id, text)
+
+        if combined and fmt == "json":
+            combined_file.write("\n]\n" if written else "[]\n")
+    finally:
+        if combined_file:
+            combined_file.close()
+    return written
+
 #suggest nearest 3 dates available function
 from datetime import datetime, timedelta
 
-def suggest_alternative_date(conn, student_id, original_date, max_search_days=14):
-    cur = conn.cursor()
-    base_date = datetime.strptime(original_date, "%Y-%m-%d")
+def _week_peaks(conn, students_sql, params, first_week, last_week):
+    """
+    Highest major count of any student from students_sql in each week
+    between first_week and last_week, read from StudentWeekLoad in one query.
+    """
+    rows = conn.execute(f"""
+        SELECT l.Week, MAX(l.MajorCount) AS Peak
+        FROM StudentWeekLoad l
+        WHERE l.StudentID IN ({students_sql})
+          AND l.Week BETWEEN ? AND ?
+        GROUP BY l.Week
+    """, (*params, first_week, last_week)).fetchall()
+    return {r["Week"]: r["Peak"] for r in rows}
 
-    def week_major_count(test_date):
-        week = test_date.strftime("%Y-%W")
-        cur.execute("""
-            SELECT COUNT(DISTINCT a.AssessmentID) AS cnt
-            FROM Enrollments e
-            JOIN Courses c ON e.CourseID = c.CourseID
-            JOIN AssessmentTargets at ON c.CourseID = at.CourseID
-            JOIN Assessments a ON at.AssessmentID = a.AssessmentID
-            WHERE e.StudentID = ?
-              AND a.Priority = 1
-              AND strftime('%Y-%W', a.DueDate) = ?
-              AND (
-                    a.Audience = 'Both'
-                 OR (a.Audience = c.CourseLevel)
-              )
-        """, (student_id, week))
-        return cur.fetchone()["cnt"]
-
-    # Find nearest date where the week is not overloaded
+
+def _nearest_open_date(base_date, max_search_days, is_open):
     for i in range(1, max_search_days + 1):
-        forward = base_date + timedelta(days=i)
-        backward = base_date - timedelta(days=i)
+        for candidate in (base_date + timedelta(days=i), base_date - timedelta(days=i)):
+            if is_open(candidate):
+                return candidate.strftime("%Y-%m-%d")
+    return None
+
+
+def _open_date_check(conn, rule, students_sql, params, base_date, max_search_days):
+    """
+    is_open(date) for the students from students_sql: a date is open if one
+    more major there keeps every one of them below the rule's threshold.
+    Everything the search window can touch is loaded up front in one query.
+    """
+    if rule.weekly:
+        peaks = _week_peaks(
+            conn, students_sql, params,
+            (base_date - timedelta(days=max_search_days)).strftime("%Y-%W"),
+            (base_date + timedelta(days=max_search_days)).strftime("%Y-%W"),
+        )
+        return lambda d: peaks.get(d.strftime("%Y-%W"), 0) + 1 < rule.threshold
+
+    reach = timedelta(days=max_search_days + rule.window)
+    students = [
+        [datetime.fromisoformat(d).toordinal() for d in dates]
+        for _, _, dates in _student_major_dates(
+            conn, students_sql, params,
+            (base_date - reach).strftime("%Y-%m-%d"), (base_date + reach).strftime("%Y-%m-%d"),
+        )
+    ]
+    return lambda d: all(rule.peak_around(days, d.toordinal())[0] + 1 < rule.threshold for days in students)
+
+
+@instrumented
+def suggest_alternative_date(conn, student_id, original_date, max_search_days=14, rule=None):
+    base_date = datetime.strptime(original_date, "%Y-%m-%d")
+    is_open = _open_date_check(conn, rule or DEFAULT_RULE, "?", (student_id,), base_date, max_search_days)
+    return _nearest_open_date(base_date, max_search_days, is_open)
+
+
+def _course_students_sql(target_course_ids, audience):
+    # students an assessment for these courses reaches, given its audience
+    course_ids = list(target_course_ids)
+    marks = ",".join("?" * len(course_ids))
+    sql = f"""
+        SELECT e.StudentID
+        FROM Enrollments e
+        JOIN Courses c ON e.CourseID = c.CourseID
+        WHERE e.CourseID IN ({marks})
+          AND (? = 'Both' OR ? = c.CourseLevel)
+    """
+    return sql, (*course_ids, audience, audience)
+
+
+@instrumented
+def suggest_alternative_date_for_courses(conn, target_course_ids, original_date,
+                                         audience="Both", max_search_days=14, rule=None):
+    """
+    Nearest date to original_date where a new major assessment for
+    target_course_ids keeps every student it reaches below the rule's limit.
+    The loads for the whole window are fetched in a single query.
+    """
+    base_date = datetime.strptime(original_date, "%Y-%m-%d")
+    if not target_course_ids:
+        return _nearest_open_date(base_date, max_search_days, lambda d: True)
+
+    students_sql, params = _course_students_sql(target_course_ids, audience)
+    is_open = _open_date_check(conn, rule or DEFAULT_RULE, students_sql, params, base_date, max_search_days)
+    return _nearest_open_date(base_date, max_search_days, is_open)
+
+
+@instrumented
+def check_assessment_impact(conn, due_date, priority, audience, target_course_ids, rule=None):
+    """
+    What-if check run before add_assessment: returns the students who would
+    reach the rule's limit if this assessment were added, with their projected
+    MajorCount. Only students in the target courses and only the affected
+    week (or the days a rolling window around due_date can cover) are looked
+    at, and nothing is written.
+    """
+    rule = rule or DEFAULT_RULE
+    day = datetime.strptime(due_date, "%Y-%m-%d")
+    week = day.strftime("%Y-%W")
+    if int(priority) != 1 or not target_course_ids:
+        return []
+
+    students_sql, params = _course_students_sql(target_course_ids, audience)
+    if not rule.weekly:
+        reach = timedelta(days=rule.window)
+        impact = []
+        for student_id, name, dates in _student_major_dates(
+            conn, students_sql, params,
+            (day - reach).strftime("%Y-%m-%d"), (day + reach).strftime("%Y-%m-%d"),
+        ):
+            days = [datetime.fromisoformat(d).toordinal() for d in dates]
+            count, label = rule.peak_around(days, day.toordinal())
+            if count + 1 >= rule.threshold:
+                impact.append({"StudentID": student_id, "Name": name, "Week": label, "MajorCount": count + 1})
+        return impact
+
+    return conn.execute(f"""
+        SELECT s.StudentID,
+               s.Name,
+               ? AS Week,
+               COALESCE(l.MajorCount, 0) + 1 AS MajorCount
+        FROM Students s
+        LEFT JOIN StudentWeekLoad l
+               ON l.StudentID = s.StudentID AND l.Week = ?
+        WHERE s.StudentID IN ({students_sql})
+          AND COALESCE(l.MajorCount, 0) + 1 >= ?
+        ORDER BY s.StudentID
+    """, (week, week, *params, rule.threshold)).fetchall()
+
+
+# term load heatmap
+# One row per group (grade, course or student) with the number of major and
+# minor assessments in each week between start and end.
+
+LOAD_GROUPS = ("grade", "course", "student")
+
+# assessment applies to the course given its audience (same rule as conflicts)
+_APPLIES = "(a.Audience = 'Both' OR a.Audience = c.CourseLevel)"
+
+_LOAD_GROUP_QUERIES = {
+    # (groups in display order, counts per group and week)
+    "grade": ("""
+        SELECT GradeLevel AS GroupKey, 'Grade ' || GradeLevel AS Label
+        FROM Students
+        GROUP BY GradeLevel
+        ORDER BY GradeLevel
+        {page}
+    """, f"""
+        WITH course_grades AS (
+            -- walking Students in key order keeps the enrollment lookups
+            -- sequential; starting from Enrollments is several times slower
+            SELECT DISTINCT e.CourseID, s.GradeLevel
+            FROM Students s
+            CROSS JOIN Enrollments e ON e.StudentID = s.StudentID
+        )
+        SELECT g.GradeLevel AS GroupKey,
+               a.WeekKey,
+               COUNT(DISTINCT CASE WHEN a.Priority = 1 THEN a.AssessmentID END) AS Major,
+               COUNT(DISTINCT CASE WHEN a.Priority = 0 THEN a.AssessmentID END) AS Minor
+        FROM Assessments a
+        JOIN AssessmentTargets at ON at.AssessmentID = a.AssessmentID
+        JOIN Courses c ON c.CourseID = at.CourseID
+        JOIN course_grades g ON g.CourseID = c.CourseID
+        WHERE a.DueDate BETWEEN ? AND ?
+          AND {_APPLIES}
+          AND g.GradeLevel IN ({{keys}})
+        GROUP BY g.GradeLevel, a.WeekKey
+    """),
+    "course": ("""
+        SELECT CourseID AS GroupKey, CourseName || ' (' || CourseLevel || ')' AS Label
+        FROM Courses
+        ORDER BY CourseName, CourseLevel, CourseID
+        {page}
+    """, f"""
+        SELECT c.CourseID AS GroupKey,
+               a.WeekKey,
+               COUNT(DISTINCT CASE WHEN a.Priority = 1 THEN a.AssessmentID END) AS Major,
+               COUNT(DISTINCT CASE WHEN a.Priority = 0 THEN a.AssessmentID END) AS Minor
+        FROM Courses c
+        JOIN AssessmentTargets at ON at.CourseID = c.CourseID
+        JOIN Assessments a ON a.AssessmentID = at.AssessmentID
+        WHERE a.DueDate BETWEEN ? AND ?
+          AND {_APPLIES}
+          AND c.CourseID IN ({{keys}})
+        GROUP BY c.CourseID, a.WeekKey
+    """),
+    # majors per student come from StudentWeekLoad; only minors need the join
+    "student": ("""
+        SELECT StudentID AS GroupKey, StudentID || ' - ' || Name AS Label
+        FROM Students
+        ORDER BY StudentID
+        {page}
+    """, f"""
+        SELECT StudentID AS GroupKey, Week AS WeekKey, MajorCount AS Major, 0 AS Minor
+        FROM StudentWeekLoad
+        WHERE Week BETWEEN ? AND ?
+          AND StudentID IN ({{keys}})
+        UNION ALL
+        SELECT e.StudentID,
+               a.WeekKey,
+               0,
+               COUNT(DISTINCT a.AssessmentID)
+        FROM Enrollments e
+        JOIN Courses c ON c.CourseID = e.CourseID
+        JOIN AssessmentTargets at ON at.CourseID = c.CourseID
+        JOIN Assessments a ON a.AssessmentID = at.AssessmentID
+        WHERE a.Priority = 0
+          AND a.DueDate BETWEEN ? AND ?
+          AND {_APPLIES}
+          AND e.StudentID IN ({{keys}})
+        GROUP BY e.StudentID, a.WeekKey
+    """),
+}
+
+
+def _term_weeks(start, end):
+    weeks = []
+    day = datetime.strptime(start, "%Y-%m-%d")
+    last = datetime.strptime(end, "%Y-%m-%d")
+    while day <= last:
+        key = day.strftime("%Y-%W")
+        if not weeks or weeks[-1] != key:
+            weeks.append(key)
+        day += timedelta(days=1)
+    return weeks
+
+
+@instrumented
+def count_load_groups(conn, group_by="grade"):
+    """Number of rows get_load_matrix has for group_by, for scroll bars."""
+    if group_by not in LOAD_GROUPS:
+        raise ValueError(f"unknown group {group_by!r}")
+    groups_sql = _LOAD_GROUP_QUERIES[group_by][0].format(page="")
+    return conn.execute(f"SELECT COUNT(*) FROM ({groups_sql})").fetchone()[0]
+
+
+@instrumented
+def get_load_matrix(conn, start=None, end=None, group_by="grade", limit=None, offset=0):
+    """
+    Major and minor assessment counts per week for each grade, course or
+    student in the weeks from start to end (YYYY-MM-DD, default: the span
+    of all assessments). limit/offset page through the groups, so a view only asks
+    for the rows it shows.
+    Returns {"weeks": [week keys], "rows": [{"Key", "Label", "Major", "Minor"}]}
+    where Major and Minor are lists lined up with weeks.
+    """
+    if group_by not in LOAD_GROUPS:
+        raise ValueError(f"unknown group {group_by!r}")
+    if start is None or end is None:
+        first, last = conn.execute("SELECT MIN(DueDate), MAX(DueDate) FROM Assessments").fetchone()
+        if first is None:
+            return {"weeks": [], "rows": []}
+        start = start or first
+        end = end or last
+
+    # whole weeks, so the edge weeks agree with the weekly load table
+    first_day = datetime.strptime(start, "%Y-%m-%d")
+    last_day = datetime.strptime(end, "%Y-%m-%d")
+    start = (first_day - timedelta(days=first_day.weekday())).strftime("%Y-%m-%d")
+    end = (last_day + timedelta(days=6 - last_day.weekday())).strftime("%Y-%m-%d")
+
+    weeks = _term_weeks(start, end)
+    week_index = {w: i for i, w in enumerate(weeks)}
+
+    groups_sql, counts_sql = _LOAD_GROUP_QUERIES[group_by]
+    page, page_params = _page_clause(limit, offset)
+    groups = conn.execute(groups_sql.format(page=page), page_params).fetchall()
+    rows = [{"Key": g["GroupKey"], "Label": g["Label"],
+             "Major": [0] * len(weeks), "Minor": [0] * len(weeks)} for g in groups]
+    if not rows or not weeks:
+        return {"weeks": weeks, "rows": rows}
+
+    by_key = {r["Key"]: r for r in rows}
+    keys = list(by_key)
+    marks = ",".join("?" * len(keys))
+    if group_by == "student":
+        params = (weeks[0], weeks[-1], *keys, start, end, *keys)
+    else:
+        params = (start, end, *keys)
+
+    for r in conn.execute(counts_sql.format(keys=marks), params):
+        i = week_index.get(r["WeekKey"])
+        if i is None:
+            continue
+        row = by_key[r["GroupKey"]]
+        row["Major"][i] += r["Major"]
+        row["Minor"][i] += r["Minor"]
+
+    return {"weeks": weeks, "rows": rows}
+
+
+# bulk CSV import
+# Each file is streamed row by row, names are resolved to IDs through maps
+# loaded once up front, and all inserts run inside one transaction.
+
+# default column order when a file has no header row
+IMPORT_COLUMNS = {
+    "teachers": ("TeacherName",),
+    "courses": ("CourseName", "CourseLevel", "TeacherName"),
+    "students": ("StudentID", "Name", "GradeLevel"),
+    "enrollments": ("StudentID", "CourseName", "CourseLevel"),
+    "assessments": ("AssessmentName", "DueDate", "Priority", "Audience", "TargetCourses"),
+}
+
+# every column name that may show up in a header row
+_HEADER_NAMES = {
+    "teacherid", "teachername", "courseid", "coursename", "courselevel",
+    "studentid", "name", "gradelevel", "enrollmentid", "assessmentid",
+    "assessmentname", "duedate", "priority", "audience", "targetcourses",
+}
+
+
+def _is_header_row(cells):
+    values = [c.strip().lower() for c in cells if c.strip()]
+    return bool(values) and all(v in _HEADER_NAMES for v in values)
+
+
+def _read_csv_rows(path, kind):
+    """
+    Yields (line number, {column: value}) for each data row.
+    A header row decides the column order if present, and repeated header
+    rows (e.g. from concatenated exports) are dropped.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        columns = None
+        for line_no, cells in enumerate(csv.reader(f), start=1):
+            if not any(c.strip() for c in cells):
+                continue
+            if _is_header_row(cells):
+                if columns is None:
+                    columns = [c.strip().lower() for c in cells]
+                continue
+            if columns is None:
+                columns = [c.lower() for c in IMPORT_COLUMNS[kind]]
+            yield line_no, {col: cell.strip() for col, cell in zip(columns, cells)}
+
+
+def _course_key(name, level):
+    level = level.strip().upper()
+    return (name.strip().lower(), "Core" if level == "CORE" else level)
+
+
+class _ImportMaps:
+    """Name -> ID lookups for the rows that already exist, loaded once per file."""
+
+    def __init__(self, conn):
+        self.teachers = {r["TeacherName"]: r["TeacherID"]
+                         for r in conn.execute("SELECT TeacherID, TeacherName FROM Teacher")}
+        self.course_ids = set()
+        self.courses = {}
+        for r in conn.execute("SELECT CourseID, CourseName, CourseLevel FROM Courses"):
+            self.course_ids.add(str(r["CourseID"]))
+            self.courses[_course_key(str(r["CourseName"]), str(r["CourseLevel"]))] = r["CourseID"]
+        self.students = {r["StudentID"] for r in conn.execute("SELECT StudentID FROM Students")}
+
+    def course_id(self, row):
+        if row.get("courseid"):
+            if row["courseid"] not in self.course_ids:
+                raise ValueError(f"unknown course id {row['courseid']}")
+            return int(row["courseid"])
+        key = _course_key(row.get("coursename", ""), row.get("courselevel", ""))
+        if key not in self.courses:
+            raise ValueError(f"unknown course {row.get('coursename')} ({row.get('courselevel')})")
+        return self.courses[key]
+
+    def target_course_id(self, text):
+        # "12" or "Physics (HL)"
+        text = text.strip()
+        if text.isdigit():
+            return self.course_id({"courseid": text})
+        if text.endswith(")") and "(" in text:
+            name, level = text[:-1].rsplit("(", 1)
+            return self.course_id({"coursename": name.strip(), "courselevel": level})
+        raise ValueError(f"bad target course {text!r}")
+
+
+def _teacher_rows(rows, maps, result):
+    for line_no, row in rows:
+        name = row.get("teachername", "")
+        if not name:
+            result["rejected"].append((line_no, "missing teacher name"))
+        elif name in maps.teachers:
+            result["skipped"] += 1
+        else:
+            maps.teachers[name] = None
+            yield (name,)
+
+
+def _course_rows(rows, maps, result):
+    for line_no, row in rows:
+        name = row.get("coursename", "")
+        level = row.get("courselevel", "")
+        teacher = row.get("teachername", "")
+        if not name:
+            result["rejected"].append((line_no, "missing course name"))
+            continue
+        key = _course_key(name, level)
+        if key[1] not in ("SL", "HL", "Core"):
+            result["rejected"].append((line_no, f"bad course level {level!r}"))
+        elif teacher and teacher not in maps.teachers:
+            result["rejected"].append((line_no, f"unknown teacher {teacher}"))
+        elif key in maps.courses:
+            result["skipped"] += 1
+        else:
+            maps.courses[key] = None
+            yield (name, key[1], maps.teachers.get(teacher))
+
+
+def _student_rows(rows, maps, result):
+    for line_no, row in rows:
+        sid = row.get("studentid", "")
+        name = row.get("name", "")
+        grade = row.get("gradelevel", "")
+        if not sid or not name or not grade.isdigit():
+            result["rejected"].append((line_no, "student id, name and a numeric grade are required"))
+        elif sid in maps.students:
+            result["skipped"] += 1
+        else:
+            maps.students.add(sid)
+            yield (sid, name, int(grade))
+
+
+def _enrollment_rows(rows, maps, result):
+    for line_no, row in rows:
+        sid = row.get("studentid", "")
+        if sid not in maps.students:
+            result["rejected"].append((line_no, f"unknown student {sid}"))
+            continue
+        try:
+            yield (sid, maps.course_id(row))
+        except ValueError as e:
+            result["rejected"].append((line_no, str(e)))
+
+
+def _import_assessments(cursor, rows, maps, result):
+    # each assessment needs its own id for the targets, so no executemany here
+    for line_no, row in rows:
+        try:
+            name = row.get("assessmentname", "")
+            due_date = row.get("duedate", "")
+            due_date = iso_date(due_date)
+            priority = row.get("priority", "")
+            audience = row.get("audience", "") or "Both"
+            if not name:
+                raise ValueError("missing assessment name")
+            if priority not in ("0", "1"):
+                raise ValueError(f"bad priority {priority!r}")
+            if audience not in ("SL", "HL", "Both"):
+                raise ValueError(f"bad audience {audience!r}")
+            targets = [maps.target_course_id(t) for t in row.get("targetcourses", "").split(";") if t.strip()]
+        except ValueError as e:
+            result["rejected"].append((line_no, str(e)))
+            continue
+        _insert_assessment(cursor, name, due_date, int(priority), audience, targets)
+        result["inserted"] += 1
+
+
+# tables each import kind writes to
+_IMPORT_TABLES = {
+    "teachers": ("Teacher",),
+    "courses": ("Courses",),
+    "students": ("Students",),
+    "enrollments": ("Enrollments", "StudentWeekLoad"),
+    "assessments": ("Assessments", "AssessmentTargets", "StudentWeekLoad"),
+}
+
+_IMPORT_INSERTS = {
+    "teachers": (_teacher_rows, "INSERT INTO Teacher (TeacherName) VALUES (?)"),
+    "courses": (_course_rows, "INSERT INTO Courses (CourseName, CourseLevel, TeacherID) VALUES (?,?,?)"),
+    "students": (_student_rows, "INSERT INTO Students (StudentID, Name, GradeLevel) VALUES (?,?,?)"),
+    # not INSERT OR IGNORE: the conflict policy would carry into every
+    # trigger the insert fires
+    "enrollments": (_enrollment_rows, """
+        INSERT INTO Enrollments (StudentID, CourseID)
+        SELECT ?1, ?2
+        WHERE NOT EXISTS (SELECT 1 FROM Enrollments WHERE StudentID = ?1 AND CourseID = ?2)
+    """),
+}
+
+
+@instrumented
+def import_csv(conn, kind, path):
+    """
+    Loads one CSV file of teachers, courses, students, enrollments or
+    assessments in a single transaction.
+    Rows that already exist are skipped; rows that can't be resolved are
+    reported in "rejected" as (line number, reason) and the rest still load.
+    """
+    if kind not in IMPORT_COLUMNS:
+        raise ValueError(f"unknown import kind {kind!r}")
+
+    result = {"inserted": 0, "skipped": 0, "rejected": []}
+    maps = _ImportMaps(conn)
+    rows = _read_csv_rows(path, kind)
+    cursor = conn.cursor()
+    try:
+        if kind == "assessments":
+            _import_assessments(cursor, rows, maps, result)
+        else:
+            parse, sql = _IMPORT_INSERTS[kind]
+            valid = 0
+
+            def counted(params):
+                nonlocal valid
+                for p in params:
+                    valid += 1
+                    yield p
+
+            cursor.executemany(sql, counted(parse(rows, maps, result)))
+            result["inserted"] = max(cursor.rowcount, 0)
+            # rows the insert left out were already there
+            result["skipped"] += valid - result["inserted"]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    _touch(*_IMPORT_TABLES[kind])
+    return result
+
+
+# the same columns import_csv reads, so an export can be loaded back in
+_EXPORT_QUERIES = {
+    "teachers": "SELECT TeacherName FROM Teacher ORDER BY TeacherID",
+    "courses": """
+        SELECT c.CourseName, c.CourseLevel, t.TeacherName
+        FROM Courses c
+        LEFT JOIN Teacher t ON c.TeacherID = t.TeacherID
+        ORDER BY c.CourseID
+    """,
+    "students": "SELECT StudentID, Name, GradeLevel FROM Students ORDER BY StudentID",
+    "enrollments": """
+        SELECT e.StudentID, c.CourseName, c.CourseLevel
+        FROM Enrollments e
+        JOIN Courses c ON e.CourseID = c.CourseID
+        ORDER BY e.EnrollmentID
+    """,
+    "assessments": """
+        SELECT a.AssessmentName, a.DueDate, a.Priority, a.Audience,
+               group_concat(c.CourseName || ' (' || c.CourseLevel || ')', ';')
+        FROM Assessments a
+        LEFT JOIN AssessmentTargets at ON at.AssessmentID = a.AssessmentID
+        LEFT JOIN Courses c ON c.CourseID = at.CourseID
+        GROUP BY a.AssessmentID
+        ORDER BY a.AssessmentID
+    """,
+}
+
+
+@instrumented
+def export_csv(conn, kind, path):
+    """
+    Writes one table as CSV with a header row in the layout import_csv
+    expects. Rows are streamed from the cursor. Returns the row count.
+    """
+    if kind not in _EXPORT_QUERIES:
+        raise ValueError(f"unknown export kind {kind!r}")
+
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(IMPORT_COLUMNS[kind])
+        for row in conn.execute(_EXPORT_QUERIES[kind]):
+            writer.writerow(["" if v is None else v for v in row])
+            count += 1
+    return count
+
+
+@instrumented
+def rebuild_indexes(conn):
+    """
+    Rebuilds every index and derived table from the base tables and
+    refreshes the planner statistics.
+    """
+    conn.execute("REINDEX")
+    rebuild_student_week_load(conn)
+    rebuild_search_index(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+# backups
+# sqlite3's online backup API copies the live database while the app keeps
+# running: each step holds a read lock for BACKUP_PAGES pages only, so
+# nobody waits on a backup for long. A write from another connection makes
+# the copy start over, which for this app's occasional writes is cheap.
+
+BACKUP_PAGES = 256
+
+# timestamped snapshots kept by snapshot_database
+SNAPSHOT_KEEP = 10
+
+
+def verify_backup(path):
+    """PRAGMA integrity_check on a database file. Returns the problems found, [] if it is sound."""
+    copy = sqlite3.connect(Path(path).absolute().as_uri() + "?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in copy.execute("PRAGMA integrity_check")]
+    finally:
+        copy.close()
+    return [] if problems == ["ok"] else problems
+
+
+@instrumented
+def backup_database(conn, target_path, pages=BACKUP_PAGES, progress=None, verify=True):
+    """
+    Copies the database behind conn to target_path, pages at a time.
+    progress(copied, total) is called after every step. The copy is written
+    next to the target and only moved into place once it is complete (and,
+    with verify, has passed an integrity check), so target_path never holds
+    half a backup. The copy uses a rollback journal so it is one
+    self-contained file.
+    Returns {"path", "pages", "bytes", "seconds"}.
+    """
+    if pages < 1:
+        raise ValueError("pages per step must be at least 1")
+    start = time.perf_counter()
+    partial = f"{target_path}.part"
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    def step(status, remaining, total):
+        if progress:
+            progress(total - remaining, total)
+
+    copy = sqlite3.connect(partial)
+    try:
+        conn.backup(copy, pages=pages, progress=step)
+        copy.execute("PRAGMA journal_mode = DELETE")
+        total = copy.execute("PRAGMA page_count").fetchone()[0]
+    except BaseException:
+        copy.close()
+        os.remove(partial)
+        raise
+    copy.close()
+
+    problems = verify_backup(partial) if verify else []
+    if problems:
+        os.remove(partial)
+        raise sqlite3.DatabaseError(f"backup failed its integrity check: {'; '.join(problems[:5])}")
+    os.replace(partial, target_path)
+    return {
+        "path": target_path,
+        "pages": total,
+        "bytes": os.path.getsize(target_path),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def _snapshots(directory, stem):
+    # (timestamp, n, path) of snapshot files of stem in directory, oldest first
+    pattern = re.compile(rf"^{re.escape(stem)}-(\d{{8}}-\d{{6}})(?:-(\d+))?\.db$")
+    found = []
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            found.append((match.group(1), int(match.group(2) or 0), os.path.join(directory, name)))
+    return sorted(found)
+
+
+@instrumented
+def snapshot_database(conn, directory, keep=SNAPSHOT_KEEP, pages=BACKUP_PAGES, progress=None):
+    """
+    Writes a verified backup to directory as <db name>-YYYYMMDD-HHMMSS.db
+    and then deletes the oldest snapshots so only keep remain. A backup
+    that fails verification raises before anything is deleted.
+    Returns backup_database's result plus "removed", the paths deleted.
+    """
+    if keep < 1:
+        raise ValueError("keep at least one snapshot")
+    os.makedirs(directory, exist_ok=True)
+    db_file = conn.execute("PRAGMA database_list").fetchone()["file"]
+    stem = Path(db_file).stem if db_file else "memory"
 
-        if week_major_count(forward) < 4:
-            return forward.strftime("%Y-%m-%d")
-        if week_major_count(backward) < 4:
-            return backward.strftime("%Y-%m-%d")
+    stamp = f"{datetime.now():%Y%m%d-%H%M%S}"
+    # a second snapshot within the same second gets -2, -3, ... after the
+    # highest taken so far, so rotation can't free up a name for reuse
+    taken = [n for s, n, _ in _snapshots(directory, stem) if s == stamp]
+    suffix = f"-{max(max(taken) + 1, 2)}" if taken else ""
+    path = os.path.join(directory, f"{stem}-{stamp}{suffix}.db")
 
-    return None
\ No newline at end of file
+    result = backup_database(conn, path, pages, progress)
+    old = _snapshots(directory, stem)[:-keep]
+    for _, _, old_path in old:
+        os.remove(old_path)
+    result["removed"] = [old_path for _, _, old_path in old]
+    return result
@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from BackEnd import *
+
+# first Monday of the synthetic term and its length
+TERM_START = date(2026, 1, 5)
+TERM_WEEKS = 16
+
+
+def generate_school(conn, students, courses=None, assessments=None, seed=0,
+                    courses_per_student=7, class_size=25):
+    """
+    Fills an empty database with a synthetic school.
+    Every student takes one Core course and a mix of SL/HL courses; courses
+    are sized around class_size; assessments fall on weekdays across the term.
+    The same seed always builds the same school.
+    Returns the row counts that were generated.
+    """
+    rnd = random.Random(seed)
+    if courses is None:
+        courses = max(40, students * courses_per_student // class_size)
+    if assessments is None:
+        assessments = courses * 4
+    teachers = max(10, courses // 2)
+
+    ensure_schema(conn)
+    # the derived tables are rebuilt once at the end instead of row by row
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+
+    conn.executemany(
+        "INSERT INTO Teacher (TeacherID, TeacherName) VALUES (?,?)",
+        ((t, f"Teacher {t}") for t in range(1, teachers + 1))
+    )
+
+    levels = {}
+    for cid in range(1, courses + 1):
+        roll = rnd.random()
+        levels[cid] = "Core" if roll < 0.1 else ("SL" if roll < 0.55 else "HL")
+    conn.executemany(
+        "INSERT INTO Courses (CourseID, CourseName, CourseLevel, TeacherID) VALUES (?,?,?,?)",
+        ((cid, f"Subject {cid}", level, rnd.randint(1, teachers)) for cid, level in levels.items())
+    )
+    core = [cid for cid, level in levels.items() if level == "Core"] or [1]
+    electives = [cid for cid, level in levels.items() if level != "Core"]
+
+    student_ids = [f"S{n:06d}" for n in range(1, students + 1)]
+    conn.executemany(
+        "INSERT INTO Students (StudentID, Name, GradeLevel) VALUES (?,?,?)",
+        ((sid, f"Student {n}", rnd.choice((11, 12))) for n, sid in enumerate(student_ids, start=1))
+    )
+
+    def enrollments():
+        for sid in student_ids:
+            yield (sid, rnd.choice(core))
+            for cid in rnd.sample(electives, min(courses_per_student - 1, len(electives))):
+                yield (sid, cid)
+
+    conn.executemany("INSERT INTO Enrollments (StudentID, CourseID) VALUES (?,?)", enrollments())
+
+    term_days = [TERM_START + timedelta(days=d) for d in range(TERM_WEEKS * 7)
+                 if (TERM_START + timedelta(days=d)).weekday() < 5]
+
+    def assessment_rows():
+        for aid in range(1, assessments + 1):
+            roll = rnd.random()
+            audience = "Both" if roll < 0.6 else ("SL" if roll < 0.8 else "HL")
+            priority = 1 if rnd.random() < 0.35 else 0
+            yield (aid, f"Assessment {aid}", rnd.choice(term_days).isoformat(), priority, audience)
+
+    conn.executemany(
+        "INSERT INTO Assessments (AssessmentID, AssessmentName, DueDate, Priority, Audience) VALUES (?,?,?,?,?)",
+        assessment_rows()
+    )
+
+    def targets():
+        for aid in range(1, assessments + 1):
+            picked = {rnd.randint(1, courses)}
+            if rnd.random() < 0.2:
+                picked.add(rnd.randint(1, courses))
+            for cid in picked:
+                yield (aid, cid)
+
+    conn.executemany("INSERT INTO AssessmentTargets (AssessmentID, CourseID) VALUES (?,?)", targets())
+    conn.commit()
+
+    # puts the triggers back (the schema version is already current, hence
+    # force) and fills the derived tables
+    ensure_schema(conn, force=True)
+    rebuild_student_week_load(conn)
+    rebuild_search_index(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+    return {
+        "teachers": teachers,
+        "courses": courses,
+        "students": students,
+        "enrollments": conn.execute("SELECT COUNT(*) FROM Enrollments").fetchone()[0],
+        "assessments": assessments,
+    }
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def _benchmark_cases(conn, seed):
+    """(name, callable) for every backend call and page query set being timed."""
+    rnd = random.Random(seed)
+    student_ids = [r[0] for r in conn.execute("SELECT StudentID FROM Students")]
+    course_ids = [r[0] for r in conn.execute("SELECT CourseID FROM Courses")]
+    conflict = conn.execute(
+        "SELECT StudentID, Week FROM StudentWeekLoad ORDER BY MajorCount DESC LIMIT 1"
+    ).fetchone()
+    busy_student, busy_week = conflict if conflict else (student_ids[0], TERM_START.strftime("%Y-%W"))
+    some_students = rnd.sample(student_ids, min(20, len(student_ids)))
+    some_courses = rnd.sample(course_ids, min(2, len(course_ids)))
+    mid_term = (TERM_START + timedelta(weeks=TERM_WEEKS // 2)).isoformat()
+
+    return [
+        ("detect_assessment_conflicts", lambda: detect_assessment_conflicts(conn)),
+        ("get_student_conflict_details", lambda: get_student_conflict_details(conn, busy_student, busy_week)),
+        ("generate_student_report x20", lambda: [generate_student_report(conn, s) for s in some_students]),
+        ("suggest_alternative_date", lambda: suggest_alternative_date(conn, busy_student, mid_term)),
+        ("suggest_alternative_date_for_courses",
+         lambda: suggest_alternative_date_for_courses(conn, some_courses, mid_term)),
+        ("check_assessment_impact", lambda: check_assessment_impact(conn, mid_term, 1, "Both", some_courses)),
+        ("get_all_assessments", lambda: get_all_assessments(conn)),
+        # what each page runs when it is opened
+        ("page TeacherPage", lambda: get_all_teachers(conn)),
+        ("page CoursePage", lambda: (get_all_teachers(conn), get_all_courses(conn))),
+        ("page StudentPage", lambda: get_all_students(conn, limit=200)),
+        ("page EnrollmentPage", lambda: (get_all_students(conn), get_all_courses(conn),
+                                         get_all_enrollments(conn, limit=200))),
+        ("page AssessmentPage", lambda: (get_all_courses(conn), get_all_assessments(conn, limit=200))),
+        ("page ConflictPage", lambda: detect_assessment_conflicts(conn)),
+        ("page ReportPage", lambda: get_all_students(conn)),
+    ]
+
+
+def run_benchmarks(sizes=(1000, 10000, 100000), repeat=5, seed=0, out="bench_results.json", keep_dir=None):
+    """
+    Builds a school of each size, times every case and writes the results
+    as JSON to out so runs can be diffed against each other.
+    """
+    results = {
+        "started": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "seed": seed,
+        "repeat": repeat,
+        "sizes": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            db_path = os.path.join(keep_dir or tmp, f"bench_{size}.db")
+            if os.path.exists(db_path):
+                os.remove(db_path)
+
+            conn = get_connection(db_path, profile="bulk_load")
+            start = time.perf_counter()
+            counts = generate_school(conn, size, seed=seed)
+            generate_s = time.perf_counter() - start
+            conn.close()
+
+            conn = get_connection(db_path, profile="interactive")
+            timings = {name: _time(fn, repeat) for name, fn in _benchmark_cases(conn, seed)}
+            conn.close()
+
+            results["sizes"][str(size)] = {
+                "generate_s": round(generate_s, 2),
+                "rows": counts,
+                "timings": timings,
+            }
+            print(f"{size} students: generated in {generate_s:.1f}s")
+            for name, t in timings.items():
+                print(f"  {name:40} {t['median_ms']:10.2f} ms")
+
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the backend against generated schools.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--keep-dir", help="keep the generated databases in this directory")
+    args = parser.parse_args()
+    run_benchmarks(args.sizes, args.repeat, args.seed, args.out, args.keep_dir)
@@ -0,0 +1,191 @@
+from datetime import date
+
+import numpy as np
+from scipy import sparse
+
+from BackEnd import OVERLOAD_THRESHOLD, ConflictRule, detect_assessment_conflicts
+
+
+def week_key(due_date):
+    # same key as the WeekKey column: strftime('%Y-%W', DueDate)
+    return date.fromisoformat(due_date).strftime("%Y-%W")
+
+
+class ConflictEngine:
+    """
+    In-memory copy of who sits which major assessment, for trying out many
+    schedules without going back to SQL.
+
+    Loaded once from the database:
+      E  students x courses       enrollment incidence
+      A  courses x assessments    major assessment targets, audience rule applied
+      R  students x assessments   (E @ A) > 0, so an assessment reached through
+                                  two of a student's courses still counts once
+    A schedule only decides each assessment's week, so the load for any
+    schedule is R @ W where W is the assessments x weeks one-hot matrix.
+
+    Schedules are given as {AssessmentID: "YYYY-MM-DD"} changes on top of the
+    dates in the database.
+    """
+
+    def __init__(self, conn, threshold=OVERLOAD_THRESHOLD):
+        self.threshold = threshold
+
+        students = conn.execute("SELECT StudentID, Name FROM Students ORDER BY StudentID").fetchall()
+        self.student_ids = [s["StudentID"] for s in students]
+        self.student_names = [s["Name"] for s in students]
+        student_index = {sid: i for i, sid in enumerate(self.student_ids)}
+
+        courses = conn.execute("SELECT CourseID, CourseLevel FROM Courses ORDER BY CourseID").fetchall()
+        course_index = {c["CourseID"]: i for i, c in enumerate(courses)}
+        course_levels = [c["CourseLevel"] for c in courses]
+
+        assessments = conn.execute("""
+            SELECT AssessmentID, DueDate, Audience
+            FROM Assessments
+            WHERE Priority = 1
+            ORDER BY AssessmentID
+        """).fetchall()
+        self.assessment_ids = [a["AssessmentID"] for a in assessments]
+        self.assessment_index = {aid: i for i, aid in enumerate(self.assessment_ids)}
+        self.due_dates = [a["DueDate"] for a in assessments]
+        audiences = {a["AssessmentID"]: a["Audience"] for a in assessments}
+
+        rows, cols = [], []
+        for e in conn.execute("SELECT StudentID, CourseID FROM Enrollments"):
+            if e["StudentID"] in student_index and e["CourseID"] in course_index:
+                rows.append(student_index[e["StudentID"]])
+                cols.append(course_index[e["CourseID"]])
+        E = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(self.student_ids), len(courses))
+        )
+
+        rows, cols = [], []
+        for t in conn.execute("SELECT AssessmentID, CourseID FROM AssessmentTargets"):
+            audience = audiences.get(t["AssessmentID"])
+            if audience is None or t["CourseID"] not in course_index:
+                continue
+            c = course_index[t["CourseID"]]
+            # Both applies to every level, SL/HL only to courses of that level
+            if audience == "Both" or audience == course_levels[c]:
+                rows.append(c)
+                cols.append(self.assessment_index[t["AssessmentID"]])
+        A = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(courses), len(self.assessment_ids))
+        )
+
+        R = (E @ A).tocsr()
+        R.data = np.ones_like(R.data)
+        R.eliminate_zeros()
+        self.reach = R
+        self.reach_by_assessment = R.tocsc()
+
+        self.weeks = []
+        self.week_index = {}
+        self.base_weeks = np.array([self.column_for_week(week_key(d)) for d in self.due_dates], dtype=np.int64)
+        self._base = None
+        self._base_stats = None
+
+    def column_for_week(self, key):
+        """Column of week key in the load matrices, adding the week if it is new."""
+        index = self.week_index.get(key)
+        if index is None:
+            index = self.week_index[key] = len(self.weeks)
+            self.weeks.append(key)
+        return index
+
+    def week_columns(self, changes=None):
+        """Week column of every major assessment under the current dates plus changes."""
+        weeks = self.base_weeks
+        if changes:
+            weeks = weeks.copy()
+            for aid, due_date in changes.items():
+                i = self.assessment_index.get(aid)
+                if i is not None:
+                    weeks[i] = self.column_for_week(week_key(due_date))
+        return weeks
+
+    def load(self, changes=None):
+        """students x weeks sparse matrix of major assessment counts."""
+        weeks = self.week_columns(changes)
+        W = sparse.csr_matrix(
+            (np.ones(len(weeks), dtype=np.int32), (np.arange(len(weeks)), weeks)),
+            shape=(len(weeks), len(self.weeks))
+        )
+        return (self.reach @ W).tocoo()
+
+    def overloads(self, changes=None):
+        """
+        (StudentID, Name, Week, MajorCount) for every overloaded student week,
+        in the same order as detect_assessment_conflicts (Week descending).
+        """
+        L = self.load(changes)
+        hit = L.data >= self.threshold
+        rows = [
+            (self.student_ids[s], self.student_names[s], self.weeks[w], int(n))
+            for s, w, n in zip(L.row[hit], L.col[hit], L.data[hit])
+        ]
+        rows.sort(key=lambda r: (r[2], r[0]), reverse=True)
+        return rows
+
+    def _row_stats(self, load):
+        # per student: overloaded weeks, worst week, majors above the limit
+        over = load >= self.threshold
+        excess = np.where(over, load - (self.threshold - 1), 0)
+        return over.sum(axis=1), load.max(axis=1, initial=0), excess.sum(axis=1)
+
+    def _base_load(self):
+        # dense students x weeks load for the dates in the database, widened
+        # when a schedule moves something into a week not seen before
+        if self._base is None or self._base.shape[1] < len(self.weeks):
+            self._base = self.load().toarray()
+            if self._base.shape[1] < len(self.weeks):
+                self._base = np.pad(self._base, ((0, 0), (0, len(self.weeks) - self._base.shape[1])))
+            self._base_stats = self._row_stats(self._base)
+        return self._base
+
+    def evaluate(self, changes=None):
+        """
+        Summary of one schedule: overloaded student weeks, distinct students
+        affected, worst week load and excess (majors above what is allowed,
+        summed over overloaded weeks).
+        Only the students reached by a moved assessment are recounted; every
+        other row comes from the load for the dates in the database.
+        """
+        weeks = self.week_columns(changes)
+        base = self._base_load()
+        hits, worst, excess = self._base_stats
+
+        moved = np.nonzero(weeks != self.base_weeks)[0]
+        sub = self.reach_by_assessment[:, moved].tocoo()
+        students = np.unique(sub.row)
+        block = base[students]
+        local = np.searchsorted(students, sub.row)
+        np.subtract.at(block, (local, self.base_weeks[moved][sub.col]), 1)
+        np.add.at(block, (local, weeks[moved][sub.col]), 1)
+        block_hits, block_worst, block_excess = self._row_stats(block)
+
+        untouched = np.ones(len(self.student_ids), dtype=bool)
+        untouched[students] = False
+        return {
+            "overloaded_weeks": int(hits[untouched].sum() + block_hits.sum()),
+            "students": int((hits[untouched] > 0).sum() + (block_hits > 0).sum()),
+            "max_load": int(max(worst[untouched].max(initial=0), block_worst.max(initial=0))),
+            "excess": int(excess[untouched].sum() + block_excess.sum()),
+        }
+
+    def evaluate_many(self, schedules):
+        return [self.evaluate(changes) for changes in schedules]
+
+    def verify_against_sql(self, conn):
+        """
+        Checks the engine's overloads against detect_assessment_conflicts.
+        Returns (missing from engine, extra in engine); both empty when they agree.
+        """
+        sql = {(r["StudentID"], r["Week"], r["MajorCount"])
+               for r in detect_assessment_conflicts(conn, ConflictRule(self.threshold))}
+        engine = {(sid, week, count) for sid, _, week, count in self.overloads()}
+        return sorted(sql - engine), sorted(engine - sql)
+
@@ -1,6 +1,9 @@
+import functools
 import tkinter as tk
-from tkinter import ttk, messagebox
+from datetime import datetime
+from tkinter import ttk, messagebox, filedialog
 from BackEnd import *
+from Worker import DatabaseWorker
 
 def is_header_junk(value):
     if value is None:
@@ -27,6 +30,56 @@ def labeled_combo(parent, label_text, values=None, state="readonly"):
     combo.pack(side="left", fill="x", expand=True)
     return combo
 
+def set_filter_values(combo, values):
+    # keep the current choice if it is still valid, otherwise fall back to the first ("All ...")
+    current = combo.get()
+    combo["values"] = values
+    if current in values:
+        combo.set(current)
+    else:
+        combo.current(0)
+
+#search entry that calls on_search(text) once typing pauses
+def make_search_box(parent, on_search, delay=250):
+    row = tk.Frame(parent)
+    row.pack(fill="x", padx=20, pady=(8, 0))
+    tk.Label(row, text="Search:").pack(side="left")
+    entry = tk.Entry(row)
+    entry.pack(side="left", fill="x", expand=True, padx=4)
+    after_id = None
+
+    def fire():
+        nonlocal after_id
+        after_id = None
+        on_search(entry.get().strip())
+
+    def changed(event):
+        nonlocal after_id
+        if after_id is not None:
+            entry.after_cancel(after_id)
+        after_id = entry.after(delay, fire)
+
+    entry.bind("<KeyRelease>", changed)
+    return entry
+
+def make_scrollable_listbox(parent, height=8):
+    lb_frame = tk.Frame(parent)
+    lb_frame.pack(pady=4)
+
+    scrollbar = ttk.Scrollbar(lb_frame, orient="vertical")
+    scrollbar.pack(side="right", fill="y")
+
+    listbox = tk.Listbox(
+        lb_frame,
+        selectmode="multiple",
+        height=height,
+        yscrollcommand=scrollbar.set
+    )
+    listbox.pack(side="left")
+
+    scrollbar.config(command=listbox.yview)
+    return listbox
+
 def make_scrollable_tree(parent, columns, headings=None):
     wrapper = tk.Frame(parent)
     wrapper.pack(fill="both", expand=True, padx=20, pady=10)
@@ -36,6 +89,7 @@ def make_scrollable_tree(parent, columns, headings=None):
 
     tree = ttk.Treeview(wrapper, columns=columns, show="headings", yscrollcommand=yscroll.set)
     yscroll.config(command=tree.yview)
+    tree.scrollbar = yscroll
     tree.pack(side="left", fill="both", expand=True)
 
     if headings is None:
@@ -47,11 +101,175 @@ def make_scrollable_tree(parent, columns, headings=None):
     return tree
 
 
+def sync_tree(tree, rows):
+    """
+    Makes tree show rows, a list of (iid, values) in display order, by
+    inserting, updating, moving or deleting only the items that differ.
+    iids are the entity keys, so selection and scroll position survive a
+    refresh. tree.shown_values remembers what each item currently shows.
+    """
+    shown = getattr(tree, "shown_values", None)
+    if shown is None:
+        shown = tree.shown_values = {}
+    rows = [(str(iid), tuple(values)) for iid, values in rows]
+    wanted = {iid for iid, _ in rows}
+
+    current = list(tree.get_children())
+    stale = [iid for iid in current if iid not in wanted]
+    if stale:
+        tree.delete(*stale)
+        current = [iid for iid in current if iid in wanted]
+    existing = set(current)
+
+    for index, (iid, values) in enumerate(rows):
+        if iid not in existing:
+            tree.insert("", index, iid=iid, values=values)
+            current.insert(index, iid)
+        else:
+            if index >= len(current) or current[index] != iid:
+                tree.move(iid, "", index)
+                current.remove(iid)
+                current.insert(index, iid)
+            if shown.get(iid) != values:
+                tree.item(iid, values=values)
+
+    tree.shown_values = dict(rows)
+
+
+# runs on the background worker: impact of a new assessment plus a date to offer instead
+def impact_with_suggestion(conn, date, priority, audience, course_ids, rule=None):
+    impact = check_assessment_impact(conn, date, priority, audience, course_ids, rule)
+    suggestion = None
+    if impact:
+        try:
+            suggestion = suggest_alternative_date_for_courses(conn, course_ids, date, audience, rule=rule)
+        except Exception:
+            suggestion = None
+    return impact, suggestion
+
+
+class PagedTree:
+    """
+    Fills a Treeview a page at a time as the user scrolls instead of inserting
+    every row up front. At most max_pages pages are kept as items; pages that
+    scroll far out of view are dropped and fetched again when scrolled back to.
+
+    fetch_page(limit, offset) returns backend rows, row_values(row) turns one
+    into the tuple shown in the tree (or None to hide it) and row_key(row)
+    gives the entity key used as the item iid.
+    """
+
+    def __init__(self, tree, fetch_page, row_values, row_key, page_size=200, max_pages=3):
+        self.tree = tree
+        self.fetch_page = fetch_page
+        self.row_values = row_values
+        self.row_key = row_key
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.pages = []  # [offset, item ids] for each loaded page, in order
+        self.at_end = False
+        self.loading = False
+        tree.configure(yscrollcommand=self.on_scroll)
+
+    def reset(self):
+        self.tree.delete(*self.tree.get_children())
+        self.tree.shown_values = {}
+        self.pages = []
+        self.at_end = False
+        self.load_next()
+
+    #re-read the pages that are loaded and only touch the rows that changed
+    def refresh(self):
+        if not self.pages:
+            self.reset()
+            return
+        first = self.pages[0][0]
+        count = len(self.pages) * self.page_size
+        rows = self.fetch_page(count, first)
+        if not rows and first > 0:
+            self.reset()
+            return
+
+        self.pages = []
+        visible = []
+        for start in range(0, len(rows), self.page_size):
+            items = []
+            for row in rows[start:start + self.page_size]:
+                values = self.row_values(row)
+                if values is None:
+                    continue
+                key = str(self.row_key(row))
+                items.append(key)
+                visible.append((key, values))
+            self.pages.append([first + start, items])
+        self.at_end = len(rows) < count
+        sync_tree(self.tree, visible)
+
+    def on_scroll(self, first, last):
+        self.tree.scrollbar.set(first, last)
+        if self.loading:
+            return
+        if float(last) >= 0.98 and not self.at_end:
+            self.loading = True
+            self.tree.after_idle(self.load_next)
+        elif float(first) <= 0.02 and self.pages and self.pages[0][0] > 0:
+            self.loading = True
+            self.tree.after_idle(self.load_previous)
+
+    def insert_page(self, offset, rows, index):
+        items = []
+        shown = self.tree.shown_values
+        for row in rows:
+            values = self.row_values(row)
+            if values is None:
+                continue
+            key = str(self.row_key(row))
+            if self.tree.exists(key):
+                continue  # shifted in from a neighbouring page after a write
+            self.tree.insert("", index, iid=key, values=values)
+            shown[key] = tuple(values)
+            items.append(key)
+            if index != "end":
+                index += 1
+        return [offset, items]
+
+    def load_next(self):
+        offset = self.pages[-1][0] + self.page_size if self.pages else 0
+        rows = self.fetch_page(self.page_size, offset)
+        self.at_end = len(rows) < self.page_size
+        if rows:
+            self.pages.append(self.insert_page(offset, rows, "end"))
+
+        if len(self.pages) > self.max_pages:
+            _, items = self.pages.pop(0)
+            self.tree.delete(*items)
+            # keep the rows the user is looking at in place
+            self.tree.yview_scroll(-len(items), "units")
+        self.loading = False
+
+    def load_previous(self):
+        if not self.pages or self.pages[0][0] == 0:
+            self.loading = False
+            return
+        offset = max(self.pages[0][0] - self.page_size, 0)
+        rows = self.fetch_page(self.page_size, offset)
+        page = self.insert_page(offset, rows, 0)
+        self.pages.insert(0, page)
+        self.tree.yview_scroll(len(page[1]), "units")
+
+        if len(self.pages) > self.max_pages:
+            _, items = self.pages.pop()
+            self.tree.delete(*items)
+            self.at_end = False
+        self.loading = False
+
+
 class PageBase(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
         self.conn = controller.conn
+        self.lookups = controller.lookups
 
         # Two rows: content expands, bottom bar fixed
         self.grid_rowconfigure(0, weight=1)
@@ -75,14 +293,72 @@ class PageBase(tk.Frame):
             command=lambda: controller.show_frame(HomePage)
         ).pack(side="right")
 
+        # shows while this page has queries running in the background
+        self.busy_label = tk.Label(self.bottom_bar, text="", fg="gray")
+        self.busy_label.pack(side="right", padx=12)
+
     def add_bottom_left_button(self, text, command):
         tk.Button(self.bottom_left, text=text, command=command).pack(side="left", padx=6)
 
+    #run fn(conn, *args) on the background worker and call on_done(result) here when it finishes
+    def run_async(self, fn, *args, on_done):
+        worker = self.controller.worker
+        self.busy_label.config(text="Working...")
+
+        def finished(result):
+            if not worker.busy(self):
+                self.busy_label.config(text="")
+            on_done(result)
+
+        def failed(error):
+            if not worker.busy(self):
+                self.busy_label.config(text="")
+            messagebox.showerror("Error", str(error))
+
+        worker.submit(fn, *args, on_done=finished, on_error=failed, owner=self)
+
+    #drop background work nobody is waiting for any more
+    def cancel_pending(self):
+        self.controller.worker.cancel(self)
+        self.busy_label.config(text="")
+
+    #bulk import of a CSV file (kind is one of the IMPORT_COLUMNS keys)
+    def import_csv_file(self, kind):
+        path = filedialog.askopenfilename(
+            title=f"Import {kind}",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            result = import_csv(self.conn, kind, path)
+        except Exception as e:
+            messagebox.showerror("Import Failed", str(e))
+            return
+
+        summary = (
+            f"Inserted: {result['inserted']}\n"
+            f"Skipped (already present): {result['skipped']}\n"
+            f"Rejected: {len(result['rejected'])}"
+        )
+        for line_no, reason in result["rejected"][:10]:
+            summary += f"\n  line {line_no}: {reason}"
+        if len(result["rejected"]) > 10:
+            summary += "\n  ..."
+        messagebox.showinfo("Import Finished", summary)
+
+        if hasattr(self, "refresh"):
+            self.refresh()
+
 
 class SchoolApp(tk.Tk):
     def __init__(self, conn):
         super().__init__()
         self.conn = conn
+        #teacher/course/student lists shared by every page
+        self.lookups = LookupCache(conn)
+        #overload rule used by every page, changed on the Conflicts page
+        self.rule = DEFAULT_RULE
 
         self.title("School Assessment Manager")
         self.geometry("1100x650")
@@ -104,15 +380,37 @@ class SchoolApp(tk.Tk):
             AssessmentPage,
             ConflictPage,
             ReportPage,
+            HeatmapPage,
+            DiagnosticsPage,
         ):
             frame = F(container, self)
             self.frames[F] = frame
             frame.grid(row=0, column=0, sticky="nsew")
 
+        # background thread with its own connection for slow queries
+        db_path = conn.execute("PRAGMA database_list").fetchone()["file"]
+        self.worker = DatabaseWorker(
+            db_path, instrument=isinstance(conn, InstrumentedConnection)
+        )
+        self.poll_worker()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.current_frame = None
         self.show_frame(HomePage)
 
+    def poll_worker(self):
+        self.worker.poll()
+        self.after(50, self.poll_worker)
+
+    def close(self):
+        self.worker.close()
+        self.destroy()
+
     def show_frame(self, page):
         frame = self.frames[page]
+        if self.current_frame is not None and hasattr(self.current_frame, "cancel_pending"):
+            self.current_frame.cancel_pending()
+        self.current_frame = frame
         if hasattr(frame, "refresh"):
             frame.refresh()
         frame.tkraise()
@@ -133,6 +431,8 @@ class HomePage(tk.Frame):
             ("Assessments", AssessmentPage),
             ("Conflicts", ConflictPage),
             ("Reports", ReportPage),
+            ("Load Heatmap", HeatmapPage),
+            ("Diagnostics", DiagnosticsPage),
         ]
 
         for text, page in pages:
@@ -159,14 +459,32 @@ class TeacherPage(PageBase):
         tk.Button(self.content, text="Add Teacher", command=self.add_teacher).pack(pady=6)
         tk.Button(self.content, text="Delete Selected", command=self.delete_teacher).pack(pady=5)
 
+        make_search_box(self.content, self.search_changed)
+        self.search_text = ""
         self.tree = make_scrollable_tree(self.content, columns=("ID", "Name"), headings=("ID", "Name"))
+        self.shown_teachers = None
+
+        self.add_bottom_left_button("Import CSV", lambda: self.import_csv_file("teachers"))
+
+    def search_changed(self, text):
+        self.search_text = text
+        self.shown_teachers = None
+        self.refresh()
 
     def refresh(self):
-        self.tree.delete(*self.tree.get_children())
-        for t in get_all_teachers(self.conn):
-            if is_header_junk(t["TeacherName"]) or is_header_junk(t["TeacherID"]):
-                continue
-            self.tree.insert("", "end", values=(t["TeacherID"], t["TeacherName"]))
+        if self.search_text:
+            teachers = search(self.conn, "teachers", self.search_text, limit=SEARCH_LIMIT)
+        else:
+            teachers = self.lookups.teachers()
+            if teachers is self.shown_teachers:
+                return
+        self.shown_teachers = teachers
+
+        sync_tree(self.tree, [
+            (t["TeacherID"], (t["TeacherID"], t["TeacherName"]))
+            for t in teachers
+            if not is_header_junk(t["TeacherName"]) and not is_header_junk(t["TeacherID"])
+        ])
 
     #add new teacher feature with validation
     def add_teacher(self):
@@ -186,7 +504,7 @@ class TeacherPage(PageBase):
         sel = self.tree.selection()
         if not sel:
             return
-        teacher_id = self.tree.item(sel[0])["values"][0]
+        teacher_id = int(sel[0])
         delete_teacher(self.conn, teacher_id)
         self.refresh()
 
@@ -209,28 +527,48 @@ class CoursePage(PageBase):
         tk.Button(self.content, text="Add Course", command=self.add_course).pack(pady=6)
         tk.Button(self.content, text="Delete Selected", command=self.delete_course).pack(pady=5)
 
+        make_search_box(self.content, self.search_changed)
+        self.search_text = ""
         self.tree = make_scrollable_tree(
             self.content,
             columns=("ID", "Name", "Level", "Teacher"),
             headings=("ID", "Name", "Level", "Teacher")
         )
+        self.shown_teachers = None
+        self.shown_courses = None
 
-    def refresh(self):
-        teachers = [t for t in get_all_teachers(self.conn)
-                    if not is_header_junk(t["TeacherName"]) and not is_header_junk(t["TeacherID"])]
+        self.add_bottom_left_button("Import CSV", lambda: self.import_csv_file("courses"))
 
-        self.teacher_map = {t["TeacherName"]: t["TeacherID"] for t in teachers}
-        self.teacher_combo["values"] = list(self.teacher_map.keys())
-        if self.teacher_combo["values"]:
-            self.teacher_combo.current(0)
+    def search_changed(self, text):
+        self.search_text = text
+        self.shown_courses = None
+        self.refresh()
 
-        self.tree.delete(*self.tree.get_children())
-        for c in get_all_courses(self.conn):
-            if is_header_junk(c["CourseName"]) or is_header_junk(c["CourseID"]):
-                continue
-            self.tree.insert("", "end", values=(
-                c["CourseID"], c["CourseName"], c["CourseLevel"], c["TeacherName"]
-            ))
+    def refresh(self):
+        teachers = self.lookups.teachers()
+        if teachers is not self.shown_teachers:
+            self.shown_teachers = teachers
+            teachers = [t for t in teachers
+                        if not is_header_junk(t["TeacherName"]) and not is_header_junk(t["TeacherID"])]
+
+            self.teacher_map = {t["TeacherName"]: t["TeacherID"] for t in teachers}
+            self.teacher_combo["values"] = list(self.teacher_map.keys())
+            if self.teacher_combo["values"]:
+                self.teacher_combo.current(0)
+
+        if self.search_text:
+            courses = search(self.conn, "courses", self.search_text, limit=SEARCH_LIMIT)
+        else:
+            courses = self.lookups.courses()
+            if courses is self.shown_courses:
+                return
+        self.shown_courses = courses
+
+        sync_tree(self.tree, [
+            (c["CourseID"], (c["CourseID"], c["CourseName"], c["CourseLevel"], c["TeacherName"]))
+            for c in courses
+            if not is_header_junk(c["CourseName"]) and not is_header_junk(c["CourseID"])
+        ])
 
     def add_course(self):
         name = self.name_entry.get().strip()
@@ -251,7 +589,7 @@ class CoursePage(PageBase):
         sel = self.tree.selection()
         if not sel:
             return
-        course_id = self.tree.item(sel[0])["values"][0]
+        course_id = int(sel[0])
         delete_course(self.conn, course_id)
         self.refresh()
 
@@ -273,20 +611,47 @@ class StudentPage(PageBase):
         tk.Button(self.content, text="Add Student", command=self.add_student).pack(pady=6)
         tk.Button(self.content, text="Delete Selected", command=self.delete_student).pack(pady=5)
 
+        make_search_box(self.content, self.search_changed)
+        self.search_text = ""
+
         #display for data in student table
         self.tree = make_scrollable_tree(
             self.content,
             columns=("ID", "Name", "Grade"),
             headings=("StudentID", "Name", "Grade")
         )
+        self.pager = PagedTree(
+            self.tree,
+            self.fetch_students,
+            self.student_values,
+            lambda s: s["StudentID"]
+        )
+        self.shown_stamp = None
 
-    #
+        self.add_bottom_left_button("Import CSV", lambda: self.import_csv_file("students"))
+
+    #keeps the loaded pages (and scroll position) when the table hasn't changed
     def refresh(self):
-        self.tree.delete(*self.tree.get_children())
-        for s in get_all_students(self.conn):
-            if is_header_junk(s["StudentID"]) or is_header_junk(s["Name"]):
-                continue
-            self.tree.insert("", "end", values=(s["StudentID"], s["Name"], s["GradeLevel"]))
+        stamp = self.lookups.stamp("Students")
+        if stamp == self.shown_stamp:
+            return
+        self.shown_stamp = stamp
+        self.pager.refresh()
+
+    def search_changed(self, text):
+        self.search_text = text
+        self.pager.reset()
+
+    #best matches first while searching, otherwise everyone by StudentID
+    def fetch_students(self, limit, offset):
+        if self.search_text:
+            return search(self.conn, "students", self.search_text, limit=limit, offset=offset)
+        return get_all_students(self.conn, limit=limit, offset=offset)
+
+    def student_values(self, s):
+        if is_header_junk(s["StudentID"]) or is_header_junk(s["Name"]):
+            return None
+        return (s["StudentID"], s["Name"], s["GradeLevel"])
 
     #add student feature with validation
     def add_student(self):
@@ -312,7 +677,7 @@ class StudentPage(PageBase):
         sel = self.tree.selection()
         if not sel:
             return
-        sid = self.tree.item(sel[0])["values"][0]
+        sid = sel[0]
         delete_student(self.conn, sid)
         self.refresh()
 
@@ -323,35 +688,52 @@ class EnrollmentPage(PageBase):
         
         #Page design + layout
         self.student_map = {}
+        self.student_ids = []
         self.course_ids = []
+        self.course_map = {}
 
         #heading
         tk.Label(self.content, text="Enrollments", font=("Arial", 18)).pack(pady=10)
 
-        form = tk.Frame(self.content)
-        form.pack(fill="x", padx=20)
+        columns = tk.Frame(self.content)
+        columns.pack(fill="x", padx=20)
 
-        self.student_combo = labeled_combo(form, "Student:", values=[])
+        #left: one student into many courses
+        by_student = tk.LabelFrame(columns, text="Enroll a Student")
+        by_student.pack(side="left", fill="both", expand=True, padx=(0, 10))
 
-        tk.Label(self.content, text="Select Courses").pack(pady=(8, 0))
+        self.student_combo = labeled_combo(by_student, "Student:", values=[])
 
-        lb_frame = tk.Frame(self.content)
-        lb_frame.pack(pady=4)
+        tk.Label(by_student, text="Select Courses").pack(pady=(8, 0))
+        self.course_listbox = make_scrollable_listbox(by_student)
 
-        scrollbar = ttk.Scrollbar(lb_frame, orient="vertical")
-        scrollbar.pack(side="right", fill="y")
+        tk.Button(by_student, text="Enroll Selected Courses", command=self.enroll).pack(pady=6)
 
-        self.course_listbox = tk.Listbox(
-            lb_frame,
-            selectmode="multiple",
-            height=8,
-            yscrollcommand=scrollbar.set
-        )
-        self.course_listbox.pack(side="left")
+        #right: many students into one course (cohort setup)
+        by_course = tk.LabelFrame(columns, text="Enroll a Cohort")
+        by_course.pack(side="left", fill="both", expand=True)
 
-        scrollbar.config(command=self.course_listbox.yview)
+        self.cohort_course_combo = labeled_combo(by_course, "Course:", values=[])
 
-        tk.Button(self.content, text="Enroll Selected Courses", command=self.enroll).pack(pady=6)
+        tk.Label(by_course, text="Select Students").pack(pady=(8, 0))
+        self.student_listbox = make_scrollable_listbox(by_course)
+
+        tk.Button(by_course, text="Enroll Selected Students", command=self.enroll_cohort).pack(pady=6)
+
+        #filters for the enrollment table
+        filters = tk.Frame(self.content)
+        filters.pack(fill="x", padx=20, pady=(8, 0))
+        tk.Label(filters, text="Show student:").pack(side="left")
+        self.filter_student_combo = ttk.Combobox(filters, state="readonly", width=30)
+        self.filter_student_combo.pack(side="left", padx=(4, 16))
+        tk.Label(filters, text="Show course:").pack(side="left")
+        self.filter_course_combo = ttk.Combobox(filters, state="readonly", width=30)
+        self.filter_course_combo.pack(side="left", padx=4)
+        for combo in (self.filter_student_combo, self.filter_course_combo):
+            combo.bind("<<ComboboxSelected>>", lambda e: self.load_enrollments())
+
+        make_search_box(self.content, self.search_changed)
+        self.search_text = ""
 
         #display for data in enrollment table
         self.tree = make_scrollable_tree(
@@ -359,26 +741,76 @@ class EnrollmentPage(PageBase):
             columns=("StudentID", "Course", "Level"),
             headings=("StudentID", "Course", "Level")
         )
+        self.pager = PagedTree(
+            self.tree, self.fetch_enrollments, self.enrollment_values, lambda e: e["EnrollmentID"]
+        )
+        self.shown_students = None
+        self.shown_courses = None
+        self.shown_stamp = None
 
-    def refresh(self):
-        students = [s for s in get_all_students(self.conn) if not is_header_junk(s["StudentID"])]
-        self.student_map = {f"{s['StudentID']} - {s['Name']}": s["StudentID"] for s in students}
-        self.student_combo["values"] = list(self.student_map.keys())
-        if self.student_combo["values"]:
-            self.student_combo.current(0)
+        self.add_bottom_left_button("Import CSV", lambda: self.import_csv_file("enrollments"))
 
-        courses = [c for c in get_all_courses(self.conn) if not is_header_junk(c["CourseName"])]
-        self.course_ids = []
-        self.course_listbox.delete(0, tk.END)
-        for c in courses:
-            self.course_listbox.insert(tk.END, f"{c['CourseName']} ({c['CourseLevel']})")
-            self.course_ids.append(c["CourseID"])
+    def refresh(self):
+        students = self.lookups.students()
+        if students is not self.shown_students:
+            self.shown_students = students
+            students = [s for s in students if not is_header_junk(s["StudentID"])]
+            self.student_map = {f"{s['StudentID']} - {s['Name']}": s["StudentID"] for s in students}
+            self.student_combo["values"] = list(self.student_map.keys())
+            if self.student_combo["values"]:
+                self.student_combo.current(0)
+
+            self.student_ids = list(self.student_map.values())
+            self.student_listbox.delete(0, tk.END)
+            for display in self.student_map:
+                self.student_listbox.insert(tk.END, display)
+
+            set_filter_values(self.filter_student_combo, ["All students"] + list(self.student_map.keys()))
+
+        courses = self.lookups.courses()
+        if courses is not self.shown_courses:
+            self.shown_courses = courses
+            courses = [c for c in courses if not is_header_junk(c["CourseName"])]
+            self.course_ids = []
+            self.course_listbox.delete(0, tk.END)
+            for c in courses:
+                self.course_listbox.insert(tk.END, f"{c['CourseName']} ({c['CourseLevel']})")
+                self.course_ids.append(c["CourseID"])
+
+            self.course_map = {f"{c['CourseName']} ({c['CourseLevel']})": c["CourseID"] for c in courses}
+            self.cohort_course_combo["values"] = list(self.course_map.keys())
+            if self.cohort_course_combo["values"]:
+                self.cohort_course_combo.current(0)
+
+            set_filter_values(self.filter_course_combo, ["All courses"] + list(self.course_map.keys()))
+
+        stamp = self.lookups.stamp("Enrollments", "Students", "Courses")
+        if stamp != self.shown_stamp:
+            self.shown_stamp = stamp
+            self.pager.refresh()
+
+    def load_enrollments(self):
+        self.pager.reset()
+
+    def search_changed(self, text):
+        self.search_text = text
+        self.load_enrollments()
+
+    #one query per page, whatever the number of students
+    def fetch_enrollments(self, limit, offset):
+        return get_all_enrollments(
+            self.conn,
+            student_id=self.student_map.get(self.filter_student_combo.get()),
+            course_id=self.course_map.get(self.filter_course_combo.get()),
+            limit=limit,
+            offset=offset,
+            search=self.search_text
+        )
 
-        self.tree.delete(*self.tree.get_children())
-        for s in students:
-            sc = get_student_courses(self.conn, s["StudentID"])
-            for c in sc:
-                self.tree.insert("", "end", values=(s["StudentID"], c["CourseName"], c["CourseLevel"]))
+    def enrollment_values(self, e):
+        if is_header_junk(e["StudentID"]) or is_header_junk(e["CourseName"]):
+            return None
+        return (e["StudentID"], e["CourseName"], e["CourseLevel"])
 
     #add enrollment feature to a student
     def enroll(self):
@@ -393,14 +825,36 @@ class EnrollmentPage(PageBase):
             return
 
         student_id = self.student_map[student_display]
+        self.enroll_pairs([(student_id, self.course_ids[i]) for i in selected])
 
-        for i in selected:
-            try:
-                enroll_student(self.conn, student_id, self.course_ids[i])
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
-                return
+    #enroll many students into one course at once
+    def enroll_cohort(self):
+        course_display = self.cohort_course_combo.get()
+        if not course_display:
+            messagebox.showerror("Error", "Select a course")
+            return
+
+        selected = self.student_listbox.curselection()
+        if not selected:
+            messagebox.showerror("Error", "Select at least one student")
+            return
+
+        course_id = self.course_map[course_display]
+        self.enroll_pairs([(self.student_ids[i], course_id) for i in selected])
 
+    #all or nothing: one transaction, students already enrolled are skipped
+    def enroll_pairs(self, pairs):
+        try:
+            result = enroll_students_bulk(self.conn, pairs, ignore_duplicates=True)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        if result["skipped"]:
+            messagebox.showinfo(
+                "Enrollment",
+                f"Enrolled: {result['inserted']}\nAlready enrolled (skipped): {result['skipped']}"
+            )
         self.refresh()
 
 # Assessments page
@@ -444,29 +898,53 @@ class AssessmentPage(PageBase):
         tk.Button(self.content, text="Add Assessment", command=self.add_assessment_gui).pack(pady=6)
         tk.Button(self.content, text="Delete Selected", command=self.delete_assessment_gui).pack(pady=5)
 
+        make_search_box(self.content, self.search_changed)
+        self.search_text = ""
+
         #display for data in assessment table
         self.tree = make_scrollable_tree(
             self.content,
             columns=("ID", "Name", "Date", "Priority", "Audience"),
             headings=("ID", "Name", "DueDate", "Priority", "Audience")
         )
+        self.pager = PagedTree(
+            self.tree,
+            self.fetch_assessments,
+            lambda a: (a["AssessmentID"], a["AssessmentName"], a["DueDate"], a["Priority"], a["Audience"]),
+            lambda a: a["AssessmentID"]
+        )
+        self.shown_courses = None
+        self.shown_stamp = None
 
-    def refresh(self):
-        courses = [c for c in get_all_courses(self.conn) if not is_header_junk(c["CourseName"])]
-        self.course_ids = []
-        self.course_display = []
-        self.course_listbox.delete(0, tk.END)
-        for c in courses:
-            disp = f"{c['CourseName']} ({c['CourseLevel']})"
-            self.course_listbox.insert(tk.END, disp)
-            self.course_ids.append(c["CourseID"])
-            self.course_display.append(disp)
+        self.add_bottom_left_button("Import CSV", lambda: self.import_csv_file("assessments"))
 
-        self.tree.delete(*self.tree.get_children())
-        for a in get_all_assessments(self.conn):
-            self.tree.insert("", "end", values=(
-                a["AssessmentID"], a["AssessmentName"], a["DueDate"], a["Priority"], a["Audience"]
-            ))
+    def refresh(self):
+        courses = self.lookups.courses()
+        if courses is not self.shown_courses:
+            self.shown_courses = courses
+            courses = [c for c in courses if not is_header_junk(c["CourseName"])]
+            self.course_ids = []
+            self.course_display = []
+            self.course_listbox.delete(0, tk.END)
+            for c in courses:
+                disp = f"{c['CourseName']} ({c['CourseLevel']})"
+                self.course_listbox.insert(tk.END, disp)
+                self.course_ids.append(c["CourseID"])
+                self.course_display.append(disp)
+
+        stamp = self.lookups.stamp("Assessments", "AssessmentTargets")
+        if stamp != self.shown_stamp:
+            self.shown_stamp = stamp
+            self.pager.refresh()
+
+    def search_changed(self, text):
+        self.search_text = text
+        self.pager.reset()
+
+    def fetch_assessments(self, limit, offset):
+        if self.search_text:
+            return search(self.conn, "assessments", self.search_text, limit=limit, offset=offset)
+        return get_all_assessments(self.conn, limit=limit, offset=offset)
 
     #add assessment feature with validation
     def add_assessment_gui(self):
@@ -486,31 +964,45 @@ class AssessmentPage(PageBase):
 
         selected_ids = [self.course_ids[i] for i in selected]
 
-        # Add assessment
+        #stored zero-padded (2026-2-3 -> 2026-02-03) so week keys and date comparisons work
         try:
-            add_assessment(self.conn, name, date, int(priority), audience, selected_ids)
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+            date = iso_date(date)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Due date: {e}")
             return
 
-        # alternative date suggestion
-        # logic: when reach max cap for assessments, a closest available date will be suggested to add the assessment without any conflicts
-        if int(priority) == 1:
-            conflicts = detect_assessment_conflicts(self.conn)
-            if conflicts:
-                student_id = conflicts[0]["StudentID"]
-                try:
-                    suggestion = suggest_alternative_date(self.conn, student_id, date)
-                except Exception:
-                    suggestion = None
+        # check the impact in the background before saving
+        self.run_async(
+            impact_with_suggestion, date, int(priority), audience, selected_ids, self.controller.rule,
+            on_done=lambda result: self.save_assessment(
+                name, date, int(priority), audience, selected_ids, *result
+            )
+        )
 
+    # logic: if the new assessment would push students to the max cap, a closest available date is suggested so it can be added without any conflicts
+    def save_assessment(self, name, date, priority, audience, selected_ids, impact, suggestion):
+        if impact:
+            rule = self.controller.rule
+            message = (
+                f"{len(impact)} student(s) would have {rule.threshold} or more major "
+                f"assessments in {'week' if rule.weekly else 'the days'} {impact[0]['Week']}.\n"
+            )
+            if suggestion:
+                message += f"Suggested alternative date: {suggestion}\n"
+            message += f"\nAdd it on {date} anyway?"
+
+            if not messagebox.askyesno("Conflict Detected", message):
                 if suggestion:
-                    messagebox.showwarning(
-                        "Conflict Detected",
-                        f"A student is overloaded with more than three assessments in a week).\n"
-                        f"Suggested alternative date: {suggestion}\n\n"
-                        f"Current date: {date}"
-                    )
+                    self.date_entry.delete(0, tk.END)
+                    self.date_entry.insert(0, suggestion)
+                return
+
+        # Add assessment
+        try:
+            add_assessment(self.conn, name, date, priority, audience, selected_ids)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
 
         self.refresh()
 
@@ -519,18 +1011,35 @@ class AssessmentPage(PageBase):
         sel = self.tree.selection()
         if not sel:
             return
-        assessment_id = self.tree.item(sel[0])["values"][0]
+        assessment_id = int(sel[0])
         delete_assessment(self.conn, assessment_id)
         self.refresh()
 
 
 # Conflict Page
 class ConflictPage(PageBase):
+    WINDOW_DAYS = (3, 5, 7, 10, 14)
+
     def __init__(self, parent, controller):
         super().__init__(parent, controller)
 
         tk.Label(self.content, text="Assessment Conflicts", font=("Arial", 18)).pack(pady=10)
 
+        #overload rule: how many majors, within a calendar week or any run of N days
+        rule_bar = tk.Frame(self.content)
+        rule_bar.pack(pady=(0, 6))
+        tk.Label(rule_bar, text="Overloaded at").pack(side="left")
+        self.threshold_combo = ttk.Combobox(rule_bar, values=[str(n) for n in range(2, 9)], state="readonly", width=4)
+        self.threshold_combo.set(str(DEFAULT_RULE.threshold))
+        self.threshold_combo.pack(side="left", padx=5)
+        tk.Label(rule_bar, text="majors in").pack(side="left")
+        self.window_combo = ttk.Combobox(
+            rule_bar, values=["a week"] + [f"{n} days" for n in self.WINDOW_DAYS], state="readonly", width=8
+        )
+        self.window_combo.set("a week")
+        self.window_combo.pack(side="left", padx=5)
+        tk.Button(rule_bar, text="Apply", command=self.apply_rule).pack(side="left", padx=5)
+
         self.tree = make_scrollable_tree(
             self.content,
             columns=("StudentID", "Name", "Week", "MajorCount"),
@@ -539,24 +1048,46 @@ class ConflictPage(PageBase):
         self.tree.bind("<Double-1>", self.show_details)
 
         self.add_bottom_left_button("Refresh", self.load_conflicts)
+        self.add_bottom_left_button("Rebuild Load Table", self.rebuild_load)
+        self.add_bottom_left_button("Resolve Overloads", self.plan_fixes)
 
     #Refresh feature to update conflicts
     def refresh(self):
         self.load_conflicts()
 
+    def apply_rule(self):
+        window = self.window_combo.get()
+        self.controller.rule = ConflictRule(
+            int(self.threshold_combo.get()), "week" if window == "a week" else int(window.split()[0])
+        )
+        self.load_conflicts()
+
     #
     def load_conflicts(self):
-        self.tree.delete(*self.tree.get_children())
-        for c in detect_assessment_conflicts(self.conn):
-            self.tree.insert("", "end", values=(c["StudentID"], c["Name"], c["Week"], c["MajorCount"]))
+        self.run_async(detect_assessment_conflicts, self.controller.rule, on_done=self.show_conflicts)
+
+    def show_conflicts(self, conflicts):
+        sync_tree(self.tree, [
+            (f"{c['StudentID']}|{c['Week']}", (c["StudentID"], c["Name"], c["Week"], c["MajorCount"]))
+            for c in conflicts
+        ])
+
+    #repair the precomputed weekly load table if it ever drifts
+    def rebuild_load(self):
+        rebuild_student_week_load(self.conn)
+        self.load_conflicts()
 
     def show_details(self, event):
         sel = self.tree.selection()
         if not sel:
             return
-        student_id, name, week, _ = self.tree.item(sel[0])["values"]
-        details = get_student_conflict_details(self.conn, student_id, week)
+        student_id, week = sel[0].rsplit("|", 1)
+        self.run_async(
+            get_student_conflict_details, student_id, week,
+            on_done=lambda details: self.show_details_popup(student_id, details)
+        )
 
+    def show_details_popup(self, student_id, details):
         popup = tk.Toplevel(self)
         popup.title(f"Conflict Details - {student_id}")
         popup.geometry("900x400")
@@ -572,11 +1103,51 @@ class ConflictPage(PageBase):
                 d["AssessmentName"], d["CourseName"], d["CourseLevel"], d["DueDate"], d["TeacherName"]
             ))
 
+    #work out date moves that clear every overload, shown as a dry run first
+    def plan_fixes(self):
+        # numpy/scipy are only needed here, so they are imported on demand
+        from Scheduler import plan_reschedule
+        rule = self.controller.rule
+        if not rule.weekly:
+            messagebox.showinfo("Resolve Overloads", "Rescheduling works on calendar weeks; switch the rule to a week.")
+            return
+        self.run_async(functools.partial(plan_reschedule, threshold=rule.threshold), on_done=self.show_plan)
+
+    def show_plan(self, plan):
+        from Scheduler import format_plan
+        if not plan["moves"]:
+            messagebox.showinfo("Resolve Overloads", "No moves needed or possible.\n\n" + format_plan(plan))
+            return
+
+        popup = tk.Toplevel(self)
+        popup.title("Proposed Date Changes")
+        popup.geometry("900x500")
+
+        text = tk.Text(popup, wrap="none")
+        text.insert("end", format_plan(plan))
+        text.config(state="disabled")
+        text.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def apply():
+            try:
+                reschedule_assessments(self.conn, plan["moves"])
+            except Exception as e:
+                messagebox.showerror("Error", str(e))
+                return
+            popup.destroy()
+            self.load_conflicts()
+
+        buttons = tk.Frame(popup)
+        buttons.pack(fill="x", padx=10, pady=(0, 10))
+        tk.Button(buttons, text="Close", command=popup.destroy).pack(side="right")
+        tk.Button(buttons, text=f"Apply {len(plan['moves'])} Moves", command=apply).pack(side="right", padx=6)
+
 # Reports Page
 class ReportPage(PageBase):
     def __init__(self, parent, controller):
         super().__init__(parent, controller)
         self.student_map = {}
+        self.shown_students = None
 
         tk.Label(self.content, text="Reports", font=("Arial", 18)).pack(pady=10)
 
@@ -587,15 +1158,29 @@ class ReportPage(PageBase):
 
         tk.Button(self.content, text="Generate Report", command=self.generate_report).pack(pady=8)
 
+        #school-wide export
+        export = tk.Frame(self.content)
+        export.pack(pady=4)
+        tk.Label(export, text="Format:").pack(side="left")
+        self.format_combo = ttk.Combobox(export, values=["txt", "csv", "json"], state="readonly", width=6)
+        self.format_combo.current(0)
+        self.format_combo.pack(side="left", padx=5)
+        self.combined_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(export, text="Single file", variable=self.combined_var).pack(side="left", padx=5)
+        tk.Button(export, text="Export All Reports", command=self.export_all).pack(side="left", padx=5)
+
         self.output = tk.Text(self.content, wrap="word")
         self.output.pack(fill="both", expand=True, padx=20, pady=10)
 
     def refresh(self):
-        students = [s for s in get_all_students(self.conn) if not is_header_junk(s["StudentID"])]
-        self.student_map = {f"{s['StudentID']} - {s['Name']}": s["StudentID"] for s in students}
-        self.student_combo["values"] = list(self.student_map.keys())
-        if self.student_combo["values"]:
-            self.student_combo.current(0)
+        students = self.lookups.students()
+        if students is not self.shown_students:
+            self.shown_students = students
+            students = [s for s in students if not is_header_junk(s["StudentID"])]
+            self.student_map = {f"{s['StudentID']} - {s['Name']}": s["StudentID"] for s in students}
+            self.student_combo["values"] = list(self.student_map.keys())
+            if self.student_combo["values"]:
+                self.student_combo.current(0)
         self.output.delete("1.0", "end")
 
     def generate_report(self):
@@ -605,29 +1190,326 @@ class ReportPage(PageBase):
             return
 
         student_id = self.student_map[display]
+        self.run_async(generate_student_report, student_id, self.controller.rule, on_done=self.show_report)
 
-        report = generate_student_report(self.conn, student_id)
+    def show_report(self, report):
         if not report:
             messagebox.showerror("Error", "No report data found for this student.")
             return
 
         self.output.delete("1.0", "end")
+        self.output.insert("end", format_report(report, "txt"))
+
+    def export_all(self):
+        fmt = self.format_combo.get()
+        combined = self.combined_var.get()
+        if combined:
+            path = filedialog.asksaveasfilename(
+                title="Export All Reports",
+                defaultextension=f".{fmt}",
+                initialfile=f"reports.{fmt}"
+            )
+        else:
+            path = filedialog.askdirectory(title="Export All Reports")
+        if not path:
+            return
+
+        #owned by the app, not this page, so leaving the page doesn't interrupt it half-written
+        def finished(count):
+            self.busy_label.config(text="")
+            messagebox.showinfo("Export Finished", f"Wrote {count} reports to {path}")
+
+        def failed(error):
+            self.busy_label.config(text="")
+            messagebox.showerror("Export Failed", str(error))
+
+        self.busy_label.config(text="Exporting...")
+        self.controller.worker.submit(
+            functools.partial(generate_all_reports, rule=self.controller.rule), path, fmt, combined,
+            on_done=finished, on_error=failed, owner=self.controller
+        )
+
+# Heatmap Page
+def load_color(value, top):
+    #white for nothing, through yellow and orange, to red at top or more
+    if not value:
+        return "#ffffff"
+    palette = ["#fff3c4", "#ffe08a", "#ffc15e", "#ff9a4d", "#f2653a", "#d9342b"]
+    step = min(len(palette) - 1, int(value / max(top, 1) * (len(palette) - 1)))
+    return palette[step]
+
+
+class HeatmapPage(PageBase):
+    ROW_HEIGHT = 22
+    LABEL_WIDTH = 180
+    BLOCK = 100  # rows fetched per query
+    MAX_BLOCKS = 20  # blocks kept once scrolled past
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, controller)
+
+        tk.Label(self.content, text="Term Load Heatmap", font=("Arial", 18)).pack(pady=10)
+
+        form = tk.Frame(self.content)
+        form.pack(fill="x", padx=20)
+
+        self.group_combo = labeled_combo(form, "Group By:", values=list(LOAD_GROUPS))
+        self.group_combo.current(0)
+        self.start_entry = labeled_entry(form, "From (YYYY-MM-DD):")
+        self.end_entry = labeled_entry(form, "To (YYYY-MM-DD):")
+
+        tk.Button(self.content, text="Show", command=self.show).pack(pady=6)
+        self.status = tk.Label(self.content, text="Blank dates cover every assessment. Cells show majors/minors.")
+        self.status.pack()
+
+        #week headings stay put while the rows scroll under them
+        self.header = tk.Canvas(self.content, height=24, highlightthickness=0)
+        self.header.pack(fill="x", padx=(20, 36))
+
+        wrapper = tk.Frame(self.content)
+        wrapper.pack(fill="both", expand=True, padx=20, pady=(0, 10))
+        self.scrollbar = ttk.Scrollbar(wrapper, orient="vertical")
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas = tk.Canvas(
+            wrapper, bg="white", highlightthickness=0,
+            yscrollincrement=self.ROW_HEIGHT, yscrollcommand=self.on_scroll
+        )
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.config(command=self.canvas.yview)
+
+        self.canvas.bind("<Configure>", lambda e: self.schedule_draw())
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-e.delta // 120, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-3, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(3, "units"))
+
+        self.query = None  # (group_by, start, end) being shown
+        self.generation = 0  # bumped on every new query so late results are dropped
+        self.weeks = []
+        self.total = None
+        self.blocks = {}  # block number -> rows
+        self.requested = set()
+        self.top = 1
+        self.draw_pending = False
+        self.shown_stamp = None
+
+    def refresh(self):
+        stamp = self.lookups.stamp("Assessments", "AssessmentTargets", "Enrollments", "Students", "Courses")
+        if stamp != self.shown_stamp:
+            self.shown_stamp = stamp
+            self.show()
+
+    def cancel_pending(self):
+        super().cancel_pending()
+        #cancelled blocks are asked for again on the next draw, a cancelled count on the next visit
+        self.requested = set(self.blocks)
+        if self.query is not None and self.total is None:
+            self.shown_stamp = None
+
+    def show(self):
+        start = self.start_entry.get().strip() or None
+        end = self.end_entry.get().strip() or None
+        try:
+            start, end = (iso_date(v) if v else None for v in (start, end))
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        self.cancel_pending()
+        self.generation += 1
+        self.query = (self.group_combo.get(), start, end)
+        self.weeks = []
+        self.blocks = {}
+        self.requested = set()
+        self.total = None  # row count, None until counted
+        self.canvas.yview_moveto(0)
+
+        generation = self.generation
+        self.run_async(count_load_groups, self.query[0], on_done=lambda total: self.set_total(generation, total))
 
-        self.output.insert("end", f"StudentID: {report['StudentID']}\n")
-        self.output.insert("end", f"Name: {report['Name']}\n")
-        self.output.insert("end", f"Total Assessments: {report['TotalAssessments']}\n")
-        self.output.insert("end", f"Major Assessments: {report['TotalMajor']}\n")
+    def set_total(self, generation, total):
+        if generation != self.generation:
+            return
+        self.total = total
+        self.canvas.config(scrollregion=(0, 0, 1, total * self.ROW_HEIGHT))
+        self.schedule_draw()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.schedule_draw()
+
+    #coalesce scroll/resize events into one redraw
+    def schedule_draw(self):
+        if not self.draw_pending:
+            self.draw_pending = True
+            self.after_idle(self.draw)
+
+    def visible_rows(self):
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // self.ROW_HEIGHT))
+        last = min(self.total, int((top + self.canvas.winfo_height()) // self.ROW_HEIGHT) + 1)
+        return first, last
+
+    def request_block(self, block):
+        group_by, start, end = self.query
+        generation = self.generation
+        self.requested.add(block)
+        self.run_async(
+            get_load_matrix, start, end, group_by, self.BLOCK, block * self.BLOCK,
+            on_done=lambda matrix: self.block_loaded(generation, block, matrix)
+        )
+
+    def block_loaded(self, generation, block, matrix):
+        if generation != self.generation:
+            return
+        self.weeks = matrix["weeks"]
+        self.blocks[block] = matrix["rows"]
+        if self.query[0] != "student":
+            # grades and courses have no fixed limit, so shade relative to the busiest cell
+            self.top = max([self.top] + [max(r["Major"], default=0) for r in matrix["rows"]])
+        self.schedule_draw()
+
+    def draw(self):
+        self.draw_pending = False
+        if self.query is None or self.total is None:
+            return
+        first, last = self.visible_rows()
+
+        #fetch what is on screen, forget blocks far away from it
+        wanted = range(first // self.BLOCK, max(first, last - 1) // self.BLOCK + 1)
+        for block in wanted:
+            if block not in self.requested and block * self.BLOCK < self.total:
+                self.request_block(block)
+        if len(self.blocks) > self.MAX_BLOCKS:
+            for block in sorted(self.blocks, key=lambda b: abs(b - first // self.BLOCK))[self.MAX_BLOCKS:]:
+                del self.blocks[block]
+                self.requested.discard(block)
+
+        top = self.controller.rule.threshold if self.query[0] == "student" else self.top
+        width = max(self.canvas.winfo_width(), self.LABEL_WIDTH + 1)
+        cell = max(14, (width - self.LABEL_WIDTH) / max(len(self.weeks), 1))
+        h = self.ROW_HEIGHT
+
+        self.header.delete("all")
+        for i, week in enumerate(self.weeks):
+            x = self.LABEL_WIDTH + i * cell
+            self.header.create_text(x + cell / 2, 12, text=week[-2:], font=("Arial", 8))
+
+        self.canvas.delete("cell")
+        for index in range(first, last):
+            rows = self.blocks.get(index // self.BLOCK)
+            y = index * h
+            if rows is None or index % self.BLOCK >= len(rows):
+                self.canvas.create_text(4, y + h / 2, text="...", anchor="w", tags="cell", fill="gray")
+                continue
+            row = rows[index % self.BLOCK]
+            self.canvas.create_text(4, y + h / 2, text=row["Label"], anchor="w", tags="cell")
+            for i, (major, minor) in enumerate(zip(row["Major"], row["Minor"])):
+                x = self.LABEL_WIDTH + i * cell
+                self.canvas.create_rectangle(
+                    x, y, x + cell, y + h, fill=load_color(major, top), outline="#dddddd", tags="cell"
+                )
+                if major or minor:
+                    text = f"{major}/{minor}" if cell >= 34 else str(major)
+                    self.canvas.create_text(x + cell / 2, y + h / 2, text=text, font=("Arial", 8), tags="cell")
+
+
+# Diagnostics Page
+class DiagnosticsPage(PageBase):
+    def __init__(self, parent, controller):
+        super().__init__(parent, controller)
+
+        tk.Label(self.content, text="Query Timings", font=("Arial", 18)).pack(pady=10)
+
+        self.status = tk.Label(self.content, text="")
+        self.status.pack()
+
+        columns = ("Function", "Calls", "Total ms", "Mean ms", "p50 ms", "p95 ms", "p99 ms", "Max ms")
+        self.tree = make_scrollable_tree(self.content, columns=columns, headings=columns)
+
+        self.add_bottom_left_button("Refresh", self.refresh)
+        self.add_bottom_left_button("Reset", self.reset_stats)
+        self.add_bottom_left_button("Save JSON", self.save_json)
+        self.add_bottom_left_button("Back Up...", self.backup)
+        self.add_bottom_left_button("Snapshot...", self.snapshot)
 
-        weeks_text = ", ".join(report["OverloadedWeeks"]) if report["OverloadedWeeks"] else "None"
-        self.output.insert("end", f"Overloaded Weeks (>=4 majors): {weeks_text}\n\n")
+        #(pages copied, total) written by the worker thread while a backup runs
+        self.backup_progress = None
 
-        self.output.insert("end", "Details:\n")
-        self.output.insert("end", "-" * 80 + "\n")
+    def refresh(self):
+        if isinstance(self.conn, InstrumentedConnection):
+            self.status.config(text=f"Calls slower than {self.conn.slow_query_ms} ms are logged with their query plans.")
+        else:
+            self.status.config(text="Instrumentation is off. Start the app with instrument=True to collect timings.")
+
+        sync_tree(self.tree, [
+            (name, (name, s["count"], s["total_ms"], s["mean_ms"], s["p50_ms"], s["p95_ms"], s["p99_ms"], s["max_ms"]))
+            for name, s in query_stats.snapshot().items()
+        ])
+
+    def reset_stats(self):
+        query_stats.reset()
+        self.refresh()
+
+    def save_json(self):
+        path = filedialog.asksaveasfilename(
+            title="Save query timings",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")]
+        )
+        if path:
+            query_stats.dump_json(path)
+
+    def backup(self):
+        path = filedialog.asksaveasfilename(
+            title="Back up database",
+            defaultextension=".db",
+            initialfile=f"backup-{datetime.now():%Y%m%d-%H%M%S}.db",
+            filetypes=[("SQLite databases", "*.db")]
+        )
+        if path:
+            self.start_backup(backup_database, path, lambda r: f"Backed up {r['pages']} pages to {r['path']}")
+
+    def snapshot(self):
+        directory = filedialog.askdirectory(title="Snapshot folder")
+        if directory:
+            self.start_backup(
+                functools.partial(snapshot_database, keep=SNAPSHOT_KEEP), directory,
+                lambda r: f"Snapshot written to {r['path']}" + (f"\nRemoved {len(r['removed'])} old snapshots" if r["removed"] else "")
+            )
+
+    #backups copy a few pages per step on the worker thread, so the app keeps working meanwhile.
+    #they belong to the app rather than this page so leaving the page doesn't cancel them
+    def start_backup(self, fn, target, message):
+        if self.backup_progress is not None:
+            messagebox.showinfo("Backup", "A backup is already running")
+            return
+        self.backup_progress = (0, 0)
 
-        for d in report["Details"]:
-            self.output.insert(
-                "end",
-                f"{d['DueDate']} | Week {d['Week']} | "
-                f"{d['Assessment']} | {d['Course']} ({d['Level']}) | "
-                f"Teacher: {d['Teacher']} | Priority: {d['Priority']}\n"
-            )
\ No newline at end of file
+        def progress(copied, total):
+            self.backup_progress = (copied, total)
+
+        def finished(result):
+            self.backup_progress = None
+            self.busy_label.config(text="")
+            messagebox.showinfo("Backup Finished", message(result))
+
+        def failed(error):
+            self.backup_progress = None
+            self.busy_label.config(text="")
+            messagebox.showerror("Backup Failed", str(error))
+
+        self.controller.worker.submit(
+            fn, target, progress=progress, on_done=finished, on_error=failed, owner=self.controller
+        )
+        self.show_backup_progress()
+
+    def show_backup_progress(self):
+        if self.backup_progress is None:
+            return
+        copied, total = self.backup_progress
+        if total and copied == total:
+            text = "Verifying backup..."
+        else:
+            text = f"Backing up {copied}/{total} pages..." if total else "Backing up..."
+        self.busy_label.config(text=text)
+        self.after(200, self.show_backup_progress)
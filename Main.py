@@ -1,15 +1,273 @@
+import argparse
+import json
 import os
-from BackEnd import get_connection, ensure_schema
-from GUI import SchoolApp
+import sys
 
-def main():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    db_path = os.path.join(base_dir, "csiaa.db") 
-    conn = get_connection(db_path)
-    ensure_schema(conn)
+from BackEnd import *
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(BASE_DIR, "csiaa.db")
+
+# profile used when --profile isn't given
+DEFAULT_PROFILES = {
+    "gui": "interactive",
+    "import": "bulk_load",
+    "rebuild-indexes": "bulk_load",
+    "backup": "readonly_analytics",
+    "snapshot": "readonly_analytics",
+}
+
+
+def print_rows(rows, columns, as_json=False, file=None):
+    rows = [dict(zip(columns, row)) if not isinstance(row, dict) else row for row in rows]
+    if as_json:
+        print(json.dumps(rows, indent=2), file=file)
+        return
+    if not rows:
+        print("(no rows)", file=file)
+        return
+    widths = [max(len(str(c)), *(len(str(r[c])) for r in rows)) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)), file=file)
+    print("  ".join("-" * w for w in widths), file=file)
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(w) for c, w in zip(columns, widths)), file=file)
+
+
+def cmd_gui(conn, args):
+    # tkinter is only loaded when a window is actually wanted
+    from GUI import SchoolApp
     app = SchoolApp(conn)
     app.mainloop()
 
+
+def cmd_conflicts(conn, args):
+    rows = detect_assessment_conflicts(conn, args.rule)
+    print_rows(rows, ["StudentID", "Name", "Week", "MajorCount"], args.json)
+
+
+def cmd_report(conn, args):
+    if args.all:
+        count = generate_all_reports(conn, args.all, args.format, args.combined, args.workers, args.rule)
+        print(f"Wrote {count} reports to {args.all}")
+        return
+    if not args.student_id:
+        sys.exit("report: give a student ID or --all PATH")
+
+    report = generate_student_report(conn, args.student_id, args.rule)
+    if not report:
+        sys.exit(f"No student {args.student_id}")
+    print(format_report(report, "json" if args.json else args.format), end="")
+
+
+def cmd_suggest(conn, args):
+    if args.student:
+        date = suggest_alternative_date(conn, args.student, args.date, args.days, args.rule)
+    else:
+        date = suggest_alternative_date_for_courses(conn, args.courses, args.date, args.audience, args.days, args.rule)
+    if args.json:
+        print(json.dumps({"original": args.date, "suggested": date}))
+    else:
+        print(date or f"No open date within {args.days} days")
+
+
+def cmd_import(conn, args):
+    result = import_csv(conn, args.kind, args.path)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"Inserted: {result['inserted']}")
+    print(f"Skipped (already present): {result['skipped']}")
+    print(f"Rejected: {len(result['rejected'])}")
+    for line_no, reason in result["rejected"]:
+        print(f"  line {line_no}: {reason}")
+
+
+def cmd_export(conn, args):
+    count = export_csv(conn, args.kind, args.path)
+    print(f"Wrote {count} {args.kind} to {args.path}")
+
+
+def cmd_changes(conn, args):
+    if args.compact:
+        removed = compact_changelog(conn)
+        print(f"Removed {removed} superseded changes", file=sys.stderr if args.json else sys.stdout)
+        return
+    rows = get_changes_since(conn, args.since, args.limit, args.table)
+    print_rows(rows, ["Seq", "TableName", "Op", "RowKey", "ChangedAt"], args.json)
+
+
+def cmd_serve(conn, args):
+    # the server opens its own connections; this one isn't used
+    from Server import make_server
+    server = make_server(args.db, args.host, args.port, args.threads, args.readers, args.instrument)
+    host, port = server.server_address
+    print(f"Serving {args.db} on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _backup_progress(copied, total):
+    print(f"\r{copied}/{total} pages", end="", file=sys.stderr, flush=True)
+
+
+def cmd_backup(conn, args):
+    result = backup_database(conn, args.path, args.pages, _backup_progress, not args.no_verify)
+    print(file=sys.stderr)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Backed up {result['pages']} pages to {result['path']} in {result['seconds']}s")
+
+
+def cmd_snapshot(conn, args):
+    result = snapshot_database(conn, args.directory, args.keep, args.pages, _backup_progress)
+    print(file=sys.stderr)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"Snapshot written to {result['path']} in {result['seconds']}s")
+    for path in result["removed"]:
+        print(f"Removed old snapshot {path}")
+
+
+def cmd_rebuild_indexes(conn, args):
+    rebuild_indexes(conn)
+    print("Indexes, load table and search index rebuilt")
+
+
+def cmd_reschedule(conn, args):
+    # numpy/scipy are only needed for this command
+    from Scheduler import plan_reschedule, format_plan
+    if not args.rule.weekly:
+        sys.exit("reschedule: only works with --window week")
+    plan = plan_reschedule(conn, frozen=args.freeze, max_search_days=args.days,
+                           weekdays_only=not args.weekends, threshold=args.rule.threshold)
+    if args.json:
+        print(json.dumps(plan, indent=2))
+    else:
+        print(format_plan(plan))
+    if args.apply and plan["moves"]:
+        reschedule_assessments(conn, plan["moves"])
+        print(f"Applied {len(plan['moves'])} moves", file=sys.stderr if args.json else sys.stdout)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Assessment planner. Starts the GUI when no command is given.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="database file (default: csiaa.db next to this script)")
+    parser.add_argument("--profile", choices=sorted(CONNECTION_PROFILES), help="connection profile")
+    parser.add_argument("--instrument", action="store_true", help="time backend calls and print a summary at exit")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    parser.add_argument("--threshold", type=int, default=OVERLOAD_THRESHOLD,
+                        help=f"majors that make an overload (default: {OVERLOAD_THRESHOLD})")
+    parser.add_argument("--window", default="week",
+                        help="'week' for calendar weeks or a number of days for a rolling window")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("gui", help="start the desktop app")
+
+    commands.add_parser("conflicts", help="list students with an overloaded week")
+
+    p = commands.add_parser("report", help="print one student's report or export them all")
+    p.add_argument("student_id", nargs="?")
+    p.add_argument("--all", metavar="PATH", help="write every student's report to this directory (or file with --combined)")
+    p.add_argument("--format", choices=["txt", "csv", "json"], default="txt")
+    p.add_argument("--combined", action="store_true", help="write all reports into one file")
+    p.add_argument("--workers", type=int, help="formatting processes (default: one per CPU, 0 = none)")
+
+    p = commands.add_parser("suggest", help="nearest date that doesn't overload anyone")
+    p.add_argument("date", help="YYYY-MM-DD")
+    who = p.add_mutually_exclusive_group(required=True)
+    who.add_argument("--student")
+    who.add_argument("--courses", type=int, nargs="+", metavar="COURSE_ID")
+    p.add_argument("--audience", choices=["SL", "HL", "Both"], default="Both")
+    p.add_argument("--days", type=int, default=14, help="how far to search either side")
+
+    p = commands.add_parser("import", help="load a CSV file")
+    p.add_argument("kind", choices=sorted(IMPORT_COLUMNS))
+    p.add_argument("path")
+
+    p = commands.add_parser("export", help="write a table as CSV that import can read back")
+    p.add_argument("kind", choices=sorted(IMPORT_COLUMNS))
+    p.add_argument("path")
+
+    p = commands.add_parser("reschedule", help="plan date moves that clear every overload (dry run unless --apply)")
+    p.add_argument("--apply", action="store_true", help="write the moves to the database")
+    p.add_argument("--days", type=int, default=14, help="how far an assessment may move either side")
+    p.add_argument("--freeze", type=int, nargs="+", default=[], metavar="ASSESSMENT_ID",
+                   help="assessments that must keep their date")
+    p.add_argument("--weekends", action="store_true", help="allow moves onto Saturdays and Sundays")
+
+    p = commands.add_parser("changes", help="list logged changes after a cursor")
+    p.add_argument("--since", type=int, default=0, metavar="SEQ", help="last Seq already processed")
+    p.add_argument("--limit", type=int, default=CHANGELOG_BATCH)
+    p.add_argument("--table", nargs="+", help="only these tables")
+    p.add_argument("--compact", action="store_true", help="drop changes superseded by a newer one to the same row")
+
+    p = commands.add_parser("serve", help="run the JSON API for several coordinators at once")
+    p.add_argument("--host", default="127.0.0.1", help="address to listen on (default: this machine only)")
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--threads", type=int, default=8, help="requests handled at once")
+    p.add_argument("--readers", type=int, default=4, help="pooled read-only connections")
+
+    p = commands.add_parser("backup", help="copy the database while it is in use, then verify the copy")
+    p.add_argument("path", help="file to write")
+    p.add_argument("--pages", type=int, default=BACKUP_PAGES, help="pages copied per step")
+    p.add_argument("--no-verify", action="store_true", help="skip the integrity check of the copy")
+
+    p = commands.add_parser("snapshot", help="write a timestamped, verified backup and rotate old ones")
+    p.add_argument("directory")
+    p.add_argument("--keep", type=int, default=SNAPSHOT_KEEP, help="snapshots to keep")
+    p.add_argument("--pages", type=int, default=BACKUP_PAGES, help="pages copied per step")
+
+    commands.add_parser("rebuild-indexes", help="REINDEX, rebuild the load table and search index, and ANALYZE")
+
+    return parser
+
+
+COMMANDS = {
+    "gui": cmd_gui,
+    "conflicts": cmd_conflicts,
+    "report": cmd_report,
+    "suggest": cmd_suggest,
+    "import": cmd_import,
+    "export": cmd_export,
+    "reschedule": cmd_reschedule,
+    "changes": cmd_changes,
+    "serve": cmd_serve,
+    "backup": cmd_backup,
+    "snapshot": cmd_snapshot,
+    "rebuild-indexes": cmd_rebuild_indexes,
+}
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    command = args.command or "gui"
+    try:
+        args.rule = ConflictRule(args.threshold, args.window)
+    except ValueError as e:
+        parser.error(f"bad --threshold/--window: {e}")
+    profile = args.profile or DEFAULT_PROFILES.get(command, "interactive")
+
+    conn = get_connection(args.db, profile=profile, instrument=args.instrument)
+    if not CONNECTION_PROFILES[profile].get("readonly"):
+        ensure_schema(conn)
+    try:
+        COMMANDS[command](conn, args)
+    finally:
+        conn.close()
+        if args.instrument and command != "gui":
+            stats = query_stats.snapshot()
+            columns = ["Function", "count", "total_ms", "mean_ms", "p95_ms", "max_ms"]
+            rows = [{"Function": name, **s} for name, s in stats.items()]
+            print(file=sys.stderr)
+            print_rows(rows, columns, file=sys.stderr)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,160 @@
+import heapq
+from datetime import date, timedelta
+
+from BackEnd import OVERLOAD_THRESHOLD
+from ConflictEngine import ConflictEngine, week_key
+
+
+def _candidate_dates(due_date, first, last, weekdays_only):
+    # (date, week key) inside [first, last], nearest to the current date first
+    base = date.fromisoformat(due_date)
+    dates = []
+    for i in range(1, max(abs((base - first).days), abs((last - base).days)) + 1):
+        for d in (base + timedelta(days=i), base - timedelta(days=i)):
+            if first <= d <= last and not (weekdays_only and d.weekday() >= 5):
+                dates.append((d.isoformat(), d.strftime("%Y-%W")))
+    return dates
+
+
+def plan_reschedule(conn, windows=None, frozen=(), max_search_days=14, weekdays_only=True, engine=None,
+                    threshold=OVERLOAD_THRESHOLD):
+    """
+    Works out a set of date moves that clears every overloaded student week
+    while moving as few major assessments as possible. Nothing is written;
+    pass the result to format_plan for a dry-run diff and its "moves" to
+    reschedule_assessments to apply it.
+
+    windows maps AssessmentID -> (earliest, latest) allowed dates; other
+    assessments may move max_search_days either way. Frozen assessments
+    never move. A move is only made if it creates no new overload.
+    Overloads are calendar weeks with threshold or more majors.
+
+    Greedy: the assessment whose move clears the most overloaded student
+    weeks goes first, to the nearest date where it fits. A move only lowers
+    other candidates' gains, so stale gains sit in a heap and are recounted
+    when they reach the top. Candidates with nowhere to go are retried once
+    other moves have freed up room, until a pass makes no progress.
+
+    Returns {"moves": [...], "before": summary, "after": summary,
+    "remaining": overloads left}, summaries as in ConflictEngine.evaluate.
+    """
+    if engine is None:
+        engine = ConflictEngine(conn, threshold)
+    windows = windows or {}
+    frozen = set(frozen)
+    threshold = engine.threshold
+    reach = engine.reach_by_assessment
+
+    # allowed range per movable assessment; every week any of them touches
+    # gets a column up front so the dense load below covers all targets
+    ranges = {}
+    for j, aid in enumerate(engine.assessment_ids):
+        if aid in frozen:
+            continue
+        if aid in windows:
+            first, last = (date.fromisoformat(d) for d in windows[aid])
+        else:
+            base = date.fromisoformat(engine.due_dates[j])
+            first, last = base - timedelta(days=max_search_days), base + timedelta(days=max_search_days)
+        ranges[j] = (first, last)
+    if ranges:
+        day = min(first for first, _ in ranges.values())
+        end = max(last for _, last in ranges.values())
+        while day <= end:
+            engine.column_for_week(day.strftime("%Y-%W"))
+            day += timedelta(days=1)
+    targets = {}
+
+    load = engine.load().toarray()
+    weeks = engine.base_weeks.copy()
+
+    def students_of(j):
+        return reach.indices[reach.indptr[j]:reach.indptr[j + 1]]
+
+    def gain(j):
+        # overloaded cells this assessment sits in right now
+        return int((load[students_of(j), weeks[j]] >= threshold).sum())
+
+    def best_date(j):
+        if j not in targets:
+            targets[j] = [(d, engine.week_index[key])
+                          for d, key in _candidate_dates(engine.due_dates[j], *ranges[j], weekdays_only)]
+        students = students_of(j)
+        for d, w in targets[j]:
+            if w != weeks[j] and (load[students, w] + 1 < threshold).all():
+                return d, w
+        return None
+
+    moves = {}
+    waiting = list(ranges)
+    while True:
+        heap = [(-g, j) for j in waiting if (g := gain(j)) > 0]
+        heapq.heapify(heap)
+        waiting = []
+        moved = False
+        while heap:
+            neg, j = heapq.heappop(heap)
+            g = gain(j)
+            if g == 0:
+                continue
+            if heap and g < -heap[0][0]:
+                heapq.heappush(heap, (-g, j))
+                continue
+            target = best_date(j)
+            if target is None:
+                waiting.append(j)
+                continue
+            new_date, w = target
+            students = students_of(j)
+            load[students, weeks[j]] -= 1
+            load[students, w] += 1
+            weeks[j] = w
+            moves[engine.assessment_ids[j]] = new_date
+            moved = True
+        if not moved or not waiting:
+            break
+
+    names = {r["AssessmentID"]: r["AssessmentName"]
+             for r in conn.execute("SELECT AssessmentID, AssessmentName FROM Assessments WHERE Priority = 1")
+             if r["AssessmentID"] in moves}
+
+    plan_moves = []
+    for aid, new_date in sorted(moves.items(), key=lambda m: (engine.due_dates[engine.assessment_index[m[0]]], m[0])):
+        old = engine.due_dates[engine.assessment_index[aid]]
+        plan_moves.append({
+            "AssessmentID": aid,
+            "AssessmentName": names.get(aid),
+            "From": old,
+            "To": new_date,
+            "FromWeek": week_key(old),
+            "ToWeek": week_key(new_date),
+        })
+
+    return {
+        "moves": plan_moves,
+        "before": engine.evaluate(),
+        "after": engine.evaluate(moves),
+        "remaining": engine.overloads(moves),
+    }
+
+
+def format_plan(plan):
+    """Dry-run diff of a plan from plan_reschedule, one line per move."""
+    before, after = plan["before"], plan["after"]
+    lines = [
+        f"Overloaded student weeks: {before['overloaded_weeks']} -> {after['overloaded_weeks']}",
+        f"Students affected: {before['students']} -> {after['students']}",
+        f"Assessments moved: {len(plan['moves'])}",
+        "",
+    ]
+    for m in plan["moves"]:
+        lines.append(
+            f"- {m['AssessmentID']} {m['AssessmentName']}: {m['From']} (week {m['FromWeek']})"
+            f" -> {m['To']} (week {m['ToWeek']})"
+        )
+    if plan["remaining"]:
+        lines.append("")
+        lines.append("Still overloaded (no allowed date fits):")
+        for student_id, name, week, count in plan["remaining"]:
+            lines.append(f"  {student_id} {name} week {week}: {count} majors")
+    return "\n".join(lines)
@@ -0,0 +1,414 @@
+import json
+import queue
+import random
+import re
+import sqlite3
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from BackEnd import *
+
+
+class NotFound(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Fixed set of read-only connections handed out one request at a time.
+    The database is in WAL mode, so readers never wait for the writer.
+    """
+
+    def __init__(self, db_path, size=4, profile="readonly_analytics", instrument=False):
+        self.connections = queue.Queue()
+        self.all = []
+        for _ in range(size):
+            conn = get_connection(db_path, profile=profile, instrument=instrument, shared=True)
+            self.all.append(conn)
+            self.connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.connections.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self.connections.put(conn)
+
+    def close(self):
+        for conn in self.all:
+            conn.close()
+
+
+class Api:
+    """
+    Maps requests onto BackEnd functions. Reads run on a pooled read-only
+    connection; writes all go through one connection, one at a time, so
+    coordinators never hit "database is locked" between themselves.
+    """
+
+    def __init__(self, db_path, readers=4, instrument=False):
+        # the writer opens first: it owns WAL mode, which the read-only
+        # connections can't switch on themselves
+        self.writer = get_connection(db_path, profile="interactive", instrument=instrument, shared=True)
+        ensure_schema(self.writer)
+        self.write_lock = threading.Lock()
+        self.readers = ConnectionPool(db_path, readers, instrument=instrument)
+        self.routes = [(method, re.compile(f"^{pattern}$"), handler, writes)
+                       for method, pattern, handler, writes in ROUTES]
+
+    def handle(self, method, path, query, body):
+        """(status, JSON-able result) for one request."""
+        for route_method, pattern, handler, writes in self.routes:
+            match = pattern.match(path)
+            if not match or route_method != method:
+                continue
+            try:
+                if writes:
+                    # the connection's context manager rolls back whatever a
+                    # failed write left behind, before the next write could
+                    # commit it
+                    with self.write_lock, self.writer:
+                        return 200, handler(self.writer, query, body, *match.groups())
+                with self.readers.connection() as conn:
+                    return 200, handler(conn, query, body, *match.groups())
+            except NotFound as e:
+                return 404, {"error": str(e)}
+            except KeyError as e:
+                return 400, {"error": f"missing field {e}"}
+            except (ValueError, TypeError) as e:
+                return 400, {"error": str(e)}
+            except sqlite3.IntegrityError as e:
+                return 409, {"error": str(e)}
+        if any(pattern.match(path) for _, pattern, _, _ in self.routes):
+            return 405, {"error": f"{method} not allowed on {path}"}
+        return 404, {"error": f"no such endpoint {path}"}
+
+    def close(self):
+        self.readers.close()
+        self.writer.close()
+
+
+# query string helpers; every parameter is optional unless it says required
+
+def _arg(query, name, default=None, kind=str, required=False):
+    values = query.get(name)
+    if not values or values[0] == "":
+        if required:
+            raise ValueError(f"missing parameter {name!r}")
+        return default
+    try:
+        return kind(values[0])
+    except ValueError:
+        raise ValueError(f"bad value for {name!r}: {values[0]!r}") from None
+
+
+def _ids(query, name):
+    return [int(v) for v in (_arg(query, name, "") or "").split(",") if v]
+
+
+def _rule(query):
+    # ?threshold=N&window=week|days picks the overload rule, default otherwise
+    threshold = _arg(query, "threshold", kind=int)
+    window = _arg(query, "window")
+    if threshold is None and window is None:
+        return None
+    return ConflictRule(OVERLOAD_THRESHOLD if threshold is None else threshold, window or "week")
+
+
+def _page(query):
+    return _arg(query, "limit", SEARCH_LIMIT, int), _arg(query, "offset", 0, int)
+
+
+def _listing(kind, get_all, paged=True):
+    # ?q= searches, otherwise the plain list (paged where the list is)
+    def handler(conn, query, body):
+        limit, offset = _page(query)
+        if _arg(query, "q"):
+            return search(conn, kind, _arg(query, "q"), limit, offset)
+        return get_all(conn, limit=limit, offset=offset) if paged else get_all(conn)
+    return handler
+
+
+def _student_report(conn, query, body, student_id):
+    report = generate_student_report(conn, student_id, _rule(query))
+    if report is None:
+        raise NotFound(f"no student {student_id}")
+    return report
+
+
+def _suggest(conn, query, body):
+    date = _arg(query, "date", required=True)
+    days = _arg(query, "days", 14, int)
+    if _arg(query, "student"):
+        suggested = suggest_alternative_date(conn, _arg(query, "student"), date, days, _rule(query))
+    else:
+        suggested = suggest_alternative_date_for_courses(
+            conn, _ids(query, "courses"), date, _arg(query, "audience", "Both"), days, _rule(query)
+        )
+    return {"original": date, "suggested": suggested}
+
+
+def _enroll(conn, query, body):
+    pairs = body.get("pairs") or [(body["student_id"], body["course_id"])]
+    return enroll_students_bulk(conn, [tuple(p) for p in pairs], body.get("ignore_duplicates", True))
+
+
+def _deleted(fn, convert=int):
+    def handler(conn, query, body, key):
+        fn(conn, convert(key))
+        return {"deleted": key}
+    return handler
+
+
+# (method, path pattern, handler(conn, query, body, *groups), writes)
+ROUTES = [
+    ("GET", r"/health", lambda conn, q, b: {"ok": True, "cursor": get_change_cursor(conn)}, False),
+    ("GET", r"/stats", lambda conn, q, b: query_stats.snapshot(), False),
+
+    ("GET", r"/teachers", _listing("teachers", get_all_teachers, paged=False), False),
+    ("POST", r"/teachers", lambda conn, q, b: add_teacher(conn, b["name"]) or {"added": b["name"]}, True),
+    ("DELETE", r"/teachers/(\d+)", _deleted(delete_teacher), True),
+
+    ("GET", r"/courses", _listing("courses", get_all_courses, paged=False), False),
+    ("POST", r"/courses", lambda conn, q, b: add_course(conn, b["name"], b["level"], b["teacher_id"])
+        or {"added": b["name"]}, True),
+    ("DELETE", r"/courses/(\d+)", _deleted(delete_course), True),
+
+    ("GET", r"/students", _listing("students", get_all_students), False),
+    ("GET", r"/students/([^/]+)/courses", lambda conn, q, b, sid: get_student_courses(conn, sid), False),
+    ("GET", r"/students/([^/]+)/report", _student_report, False),
+    ("POST", r"/students", lambda conn, q, b: add_student(conn, b["student_id"], b["name"], int(b["grade"]))
+        or {"added": b["student_id"]}, True),
+    ("DELETE", r"/students/([^/]+)", _deleted(delete_student, str), True),
+
+    ("GET", r"/enrollments", lambda conn, q, b: get_all_enrollments(
+        conn, _arg(q, "student_id"), _arg(q, "course_id", kind=int), *_page(q), search=_arg(q, "q")), False),
+    ("POST", r"/enrollments", _enroll, True),
+
+    ("GET", r"/assessments", _listing("assessments", get_all_assessments), False),
+    ("POST", r"/assessments", lambda conn, q, b: {"AssessmentID": add_assessment(
+        conn, b["name"], b["due_date"], int(b["priority"]), b.get("audience", "Both"), b["courses"])}, True),
+    ("DELETE", r"/assessments/(\d+)", _deleted(delete_assessment), True),
+    ("POST", r"/assessments/reschedule", lambda conn, q, b: {"moved": reschedule_assessments(conn, b["moves"])},
+        True),
+
+    ("GET", r"/conflicts", lambda conn, q, b: detect_assessment_conflicts(conn, _rule(q)), False),
+    ("GET", r"/conflicts/([^/]+)/([^/]+)",
+        lambda conn, q, b, sid, week: get_student_conflict_details(conn, sid, week), False),
+    ("GET", r"/impact", lambda conn, q, b: check_assessment_impact(
+        conn, _arg(q, "date", required=True), _arg(q, "priority", 1, int), _arg(q, "audience", "Both"),
+        _ids(q, "courses"), _rule(q)), False),
+    ("GET", r"/suggest", _suggest, False),
+    ("GET", r"/load", lambda conn, q, b: get_load_matrix(
+        conn, _arg(q, "start"), _arg(q, "end"), _arg(q, "group", "grade"), *_page(q)), False),
+
+    ("GET", r"/changes", lambda conn, q, b: get_changes_since(
+        conn, _arg(q, "since", 0, int), _arg(q, "limit", CHANGELOG_BATCH, int),
+        [t for t in (_arg(q, "table", "") or "").split(",") if t] or None), False),
+]
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = "CSIAA/1.0"
+
+    def _respond(self):
+        url = urlsplit(self.path)
+        body = {}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                self._send(400, {"error": "body is not valid JSON"})
+                return
+        try:
+            status, result = self.server.api.handle(self.command, url.path.rstrip("/") or "/",
+                                                    parse_qs(url.query), body)
+        except Exception as e:
+            logger.exception("request failed: %s %s", self.command, self.path)
+            status, result = 500, {"error": str(e)}
+        self._send(status, result)
+
+    def _send(self, status, result):
+        # rows come back as sqlite3.Row
+        data = json.dumps(result, default=dict).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that answers requests on a fixed pool of threads."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, api, threads=8):
+        super().__init__(address, RequestHandler)
+        self.api = api
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+        self.api.close()
+
+
+def make_server(db_path, host="127.0.0.1", port=8080, threads=8, readers=4, instrument=False):
+    """Server for db_path; call serve_forever() on it, server_close() when done."""
+    return PooledHTTPServer((host, port), Api(db_path, readers, instrument), threads)
+
+
+def load_test(base_url, clients=8, seconds=10, write_ratio=0.05, seed=0):
+    """
+    Hammers a running server from clients threads for seconds, mixing page
+    reads, searches, conflict checks and reports with a write_ratio share
+    of adds and deletes. Returns per-endpoint request counts, errors and
+    latency percentiles in ms.
+    """
+    def get(path):
+        with urllib.request.urlopen(base_url + path, timeout=30) as r:
+            return json.loads(r.read())
+
+    students = [s["StudentID"] for s in get("/students?limit=1000")]
+    courses = [c["CourseID"] for c in get("/courses")][:500]
+    stop = time.perf_counter() + seconds
+    lock = threading.Lock()
+    samples = {}
+    errors = {}
+
+    def client(n):
+        rnd = random.Random(seed * 1000 + n)
+        while time.perf_counter() < stop:
+            if rnd.random() < write_ratio:
+                name = "POST /assessments + DELETE"
+                body = json.dumps({"name": f"Load test {n}", "due_date": f"2026-02-{rnd.randint(2, 27):02d}",
+                                   "priority": rnd.randint(0, 1), "courses": rnd.sample(courses, 2)}).encode()
+                request = urllib.request.Request(base_url + "/assessments", data=body, method="POST",
+                                                 headers={"Content-Type": "application/json"})
+                requests = [request]
+            else:
+                name, path = rnd.choice([
+                    ("GET /students", f"/students?limit=200&offset={rnd.randrange(0, 800, 200)}"),
+                    ("GET /students?q", f"/students?q=student+{rnd.randint(1, 999)}"),
+                    ("GET /enrollments", f"/enrollments?student_id={rnd.choice(students)}"),
+                    ("GET /assessments", "/assessments?limit=200"),
+                    ("GET /students/report", f"/students/{rnd.choice(students)}/report"),
+                    ("GET /suggest", f"/suggest?date=2026-02-10&courses={rnd.choice(courses)}"),
+                    ("GET /impact", f"/impact?date=2026-02-10&courses={rnd.choice(courses)}"),
+                    ("GET /conflicts", "/conflicts"),
+                ])
+                requests = [urllib.request.Request(base_url + path)]
+
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(requests[0], timeout=30) as r:
+                    result = json.loads(r.read())
+                if "AssessmentID" in result:
+                    delete = urllib.request.Request(f"{base_url}/assessments/{result['AssessmentID']}",
+                                                    method="DELETE")
+                    urllib.request.urlopen(delete, timeout=30).read()
+                ok = True
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                ok = False
+                error = str(e)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                samples.setdefault(name, []).append(elapsed)
+                if not ok:
+                    errors.setdefault(name, []).append(error)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    def percentile(values, p):
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 2)
+
+    results = {}
+    for name, values in sorted(samples.items()):
+        values.sort()
+        results[name] = {
+            "count": len(values),
+            "errors": len(errors.get(name, ())),
+            "mean_ms": round(statistics.mean(values), 2),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "max_ms": round(values[-1], 2),
+        }
+    total = sum(r["count"] for r in results.values())
+    return {
+        "clients": clients,
+        "seconds": seconds,
+        "requests": total,
+        "requests_per_s": round(total / seconds, 1),
+        "errors": sum(r["errors"] for r in results.values()),
+        "endpoints": results,
+        "sample_errors": [e for es in errors.values() for e in es[:3]],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+
+    from Benchmark import generate_school
+
+    parser = argparse.ArgumentParser(description="Load-test the API server against a generated school.")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=8, help="server request threads")
+    parser.add_argument("--readers", type=int, default=4, help="pooled read connections")
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--db", help="use this database instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if not db_path:
+            db_path = os.path.join(tmp, "load.db")
+            conn = get_connection(db_path, profile="bulk_load")
+            generate_school(conn, args.students)
+            conn.close()
+
+        server = make_server(db_path, port=0, threads=args.threads, readers=args.readers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        try:
+            print(json.dumps(load_test(f"http://{host}:{port}", args.clients, args.seconds,
+                                       args.write_ratio), indent=2))
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,107 @@
+import itertools
+import queue
+import threading
+
+from BackEnd import get_connection
+
+
+class DatabaseWorker:
+    """
+    Runs backend calls on background threads, each with its own connection,
+    so slow queries never block the Tk mainloop.
+
+    submit(fn, *args) queues fn(conn, *args) and returns a ticket. The GUI
+    calls poll() from the Tk thread (through after()) and finished calls are
+    handed to their on_done / on_error callbacks there. Calls tagged with an
+    owner can be cancelled together, e.g. when the user leaves a page.
+    """
+
+    def __init__(self, db_path, workers=1, profile="readonly_analytics", instrument=False):
+        self.db_path = db_path
+        self.profile = profile
+        self.instrument = instrument
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = {}  # ticket -> (owner, on_done, on_error)
+        self.running = {}  # thread index -> (ticket, conn)
+        self.tickets = itertools.count(1)
+
+        self.threads = []
+        for index in range(workers):
+            t = threading.Thread(target=self._run, args=(index,), daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def _run(self, index):
+        conn = get_connection(self.db_path, profile=self.profile, instrument=self.instrument)
+        try:
+            while True:
+                request = self.requests.get()
+                if request is None:
+                    break
+                ticket, fn, args, kwargs = request
+
+                with self.lock:
+                    if ticket not in self.pending:
+                        continue  # cancelled before it started
+                    self.running[index] = (ticket, conn)
+                try:
+                    result = fn(conn, *args, **kwargs)
+                    self.results.put((ticket, True, result))
+                except Exception as e:
+                    self.results.put((ticket, False, e))
+                finally:
+                    with self.lock:
+                        self.running.pop(index, None)
+        finally:
+            conn.close()
+
+    def submit(self, fn, *args, on_done=None, on_error=None, owner=None, **kwargs):
+        ticket = next(self.tickets)
+        with self.lock:
+            self.pending[ticket] = (owner, on_done, on_error)
+        self.requests.put((ticket, fn, args, kwargs))
+        return ticket
+
+    def cancel(self, owner):
+        """Drops every queued or running call submitted by owner."""
+        with self.lock:
+            tickets = [t for t, (o, _, _) in self.pending.items() if o is owner]
+            for t in tickets:
+                del self.pending[t]
+            for ticket, conn in self.running.values():
+                if ticket in tickets:
+                    # makes the running query stop with OperationalError
+                    conn.interrupt()
+
+    def busy(self, owner=None):
+        with self.lock:
+            if owner is None:
+                return bool(self.pending)
+            return any(o is owner for o, _, _ in self.pending.values())
+
+    def poll(self):
+        """Delivers finished results; must be called from the Tk thread."""
+        while True:
+            try:
+                ticket, ok, value = self.results.get_nowait()
+            except queue.Empty:
+                return
+            with self.lock:
+                entry = self.pending.pop(ticket, None)
+            if entry is None:
+                continue  # cancelled while running
+            _, on_done, on_error = entry
+            if ok and on_done:
+                on_done(value)
+            elif not ok and on_error:
+                on_error(value)
+
+    def close(self):
+        with self.lock:
+            self.pending.clear()
+            for _, conn in self.running.values():
+                conn.interrupt()
+        for _ in self.threads:
+            self.requests.put(None)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BackEnd import get_connection
+from Benchmark import generate_school
+
+
+@pytest.fixture
+def school(tmp_path):
+    """A small synthetic school (300 students) in a fresh database."""
+    conn = get_connection(str(tmp_path / "school.db"), profile="interactive")
+    generate_school(conn, 300)
+    yield conn
+    conn.close()
+
+
+def load_table(conn):
+    return sorted(tuple(r) for r in conn.execute("SELECT StudentID, Week, MajorCount FROM StudentWeekLoad"))
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+
+from BackEnd import backup_database, snapshot_database, verify_backup
+
+TABLES = ["Teacher", "Courses", "Students", "Enrollments", "Assessments", "AssessmentTargets", "StudentWeekLoad"]
+
+
+def _contents(conn):
+    return {t: sorted(tuple(r) for r in conn.execute(f"SELECT * FROM {t}")) for t in TABLES}
+
+
+def test_backup_round_trip(school, tmp_path):
+    target = str(tmp_path / "copy.db")
+    steps = []
+    result = backup_database(school, target, pages=8, progress=lambda copied, total: steps.append((copied, total)))
+
+    assert result["path"] == target and result["bytes"] == os.path.getsize(target)
+    assert not os.path.exists(target + ".part")
+    assert len(steps) > 1 and steps[-1][0] == steps[-1][1] == result["pages"]
+    assert verify_backup(target) == []
+
+    copy = sqlite3.connect(target)
+    try:
+        # one self-contained file, not a WAL database missing its -wal
+        assert copy.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        assert _contents(copy) == _contents(school)
+    finally:
+        copy.close()
+
+
+def test_snapshots_rotate(school, tmp_path):
+    directory = str(tmp_path / "snapshots")
+    paths = [snapshot_database(school, directory, keep=2)["path"] for _ in range(3)]
+
+    # distinct names even when taken within the same second
+    assert len(set(paths)) == 3
+    assert sorted(os.listdir(directory)) == sorted(os.path.basename(p) for p in paths[1:])
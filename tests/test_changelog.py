@@ -0,0 +1,49 @@
+from BackEnd import (add_student, compact_changelog, delete_student, enroll_student,
+                     get_change_cursor, get_changes_since)
+
+
+def _changes(conn, cursor, **kwargs):
+    return [(r["TableName"], r["Op"], r["RowKey"]) for r in get_changes_since(conn, cursor, **kwargs)]
+
+
+def test_writes_are_logged_in_order(school):
+    cursor = get_change_cursor(school)
+    course_id = school.execute("SELECT MIN(CourseID) FROM Courses").fetchone()[0]
+
+    add_student(school, "LOG1", "Log Student", 11)
+    school.execute("UPDATE Students SET Name = 'Renamed' WHERE StudentID = 'LOG1'")
+    # a changed key is the old key deleted and the new one updated
+    school.execute("UPDATE Students SET StudentID = 'LOG2' WHERE StudentID = 'LOG1'")
+    school.commit()
+    enroll_student(school, "LOG2", course_id)
+
+    assert _changes(school, cursor, tables=["Students"]) == [
+        ("Students", "insert", "LOG1"),
+        ("Students", "update", "LOG1"),
+        ("Students", "delete", "LOG1"),
+        ("Students", "update", "LOG2"),
+    ]
+    assert ("Enrollments", "insert", f"LOG2|{course_id}") in _changes(school, cursor)
+
+    # paging: the last Seq of one batch is the cursor for the next
+    first = get_changes_since(school, cursor, limit=2)
+    rest = get_changes_since(school, first[-1]["Seq"])
+    assert [r["Seq"] for r in first + rest] == [r["Seq"] for r in get_changes_since(school, cursor)]
+    assert get_changes_since(school, get_change_cursor(school)) == []
+
+
+def test_compaction_keeps_the_newest_change_per_row(school):
+    cursor = get_change_cursor(school)
+    add_student(school, "LOG3", "Log Student", 11)
+    school.execute("UPDATE Students SET Name = 'Renamed' WHERE StudentID = 'LOG3'")
+    school.commit()
+    delete_student(school, "LOG3")
+    add_student(school, "LOG4", "Log Student", 12)
+
+    assert compact_changelog(school) > 0
+    assert _changes(school, cursor, tables=["Students"]) == [
+        ("Students", "delete", "LOG3"),
+        ("Students", "insert", "LOG4"),
+    ]
+    # nothing left to drop
+    assert compact_changelog(school) == 0
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from BackEnd import ConflictRule, detect_assessment_conflicts
+from Main import main
+
+
+@pytest.fixture
+def db(school):
+    return school.execute("PRAGMA database_list").fetchone()["file"]
+
+
+def _json(capsys, *argv):
+    main(list(argv))
+    return json.loads(capsys.readouterr().out)
+
+
+def test_conflicts(db, school, capsys):
+    for threshold in ("3", "4"):
+        rows = _json(capsys, "--db", db, "--json", "--threshold", threshold, "conflicts")
+        expected = detect_assessment_conflicts(school, ConflictRule(int(threshold)))
+        assert rows == [dict(r) for r in expected]
+
+
+def test_report(db, school, capsys):
+    student_id = school.execute("SELECT MIN(StudentID) FROM Students").fetchone()[0]
+    assert _json(capsys, "--db", db, "--json", "report", student_id)["StudentID"] == student_id
+
+    with pytest.raises(SystemExit, match="No student NOBODY"):
+        main(["--db", db, "report", "NOBODY"])
+
+
+def test_export_import_round_trip(db, school, tmp_path, capsys):
+    path = str(tmp_path / "students.csv")
+    main(["--db", db, "export", "students", path])
+    count = school.execute("SELECT COUNT(*) FROM Students").fetchone()[0]
+    assert capsys.readouterr().out.strip() == f"Wrote {count} students to {path}"
+
+    fresh = str(tmp_path / "fresh.db")
+    result = _json(capsys, "--db", fresh, "--json", "import", "students", path)
+    assert result == {"inserted": count, "skipped": 0, "rejected": []}
+    # a second import finds them all present
+    assert _json(capsys, "--db", fresh, "--json", "import", "students", path)["skipped"] == count
+
+
+def test_bad_rule_is_a_usage_error(db, capsys):
+    with pytest.raises(SystemExit) as error:
+        main(["--db", db, "--window", "0", "conflicts"])
+    assert error.value.code == 2
+    assert "bad --threshold/--window" in capsys.readouterr().err
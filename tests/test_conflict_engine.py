@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from BackEnd import ConflictRule, detect_assessment_conflicts, reschedule_assessments
+
+pytest.importorskip("scipy")  # numpy/scipy are optional, see requirements.txt
+from ConflictEngine import ConflictEngine
+
+
+def _sql_overloads(conn, threshold):
+    return sorted((r["StudentID"], r["Week"], r["MajorCount"])
+                  for r in detect_assessment_conflicts(conn, ConflictRule(threshold)))
+
+
+def _engine_overloads(engine, changes=None):
+    return sorted((sid, week, count) for sid, _, week, count in engine.overloads(changes))
+
+
+def test_overloads_match_sql(school):
+    for threshold in (2, 3, 4):
+        engine = ConflictEngine(school, threshold)
+        expected = _sql_overloads(school, threshold)
+        assert expected, "the school should have some overloads to compare"
+        assert _engine_overloads(engine) == expected
+        assert engine.verify_against_sql(school) == ([], [])
+
+
+def test_moved_schedule_matches_sql_after_applying(school):
+    engine = ConflictEngine(school, 3)
+    rnd = random.Random(1)
+    moves = []
+    for aid in rnd.sample(engine.assessment_ids, 40):
+        old = engine.due_dates[engine.assessment_index[aid]]
+        new = f"2026-03-{rnd.randint(2, 27):02d}"
+        if new != old:
+            moves.append({"AssessmentID": aid, "From": old, "To": new})
+    changes = {m["AssessmentID"]: m["To"] for m in moves}
+
+    predicted = _engine_overloads(engine, changes)
+    summary = engine.evaluate(changes)
+
+    reschedule_assessments(school, moves)
+    actual = _sql_overloads(school, 3)
+    assert predicted == actual
+    assert summary["overloaded_weeks"] == len(actual)
+    assert summary["students"] == len({sid for sid, _, _ in actual})
+    assert summary["excess"] == sum(count - 2 for _, _, count in actual)
@@ -0,0 +1,46 @@
+import random
+from datetime import date
+
+from BackEnd import (ConflictRule, add_assessment, add_course, add_student, check_assessment_impact,
+                     detect_assessment_conflicts, enroll_student, suggest_alternative_date_for_courses)
+
+
+def _brute_peak(days, day, window):
+    # busiest window of window days that contains day, trying every start
+    return max(sum(1 for d in days if s <= d < s + window) for s in range(day - window + 1, day + 1))
+
+
+def test_peak_around_matches_brute_force():
+    rnd = random.Random(0)
+    base = date(2026, 3, 1).toordinal()
+    for _ in range(2000):
+        window = rnd.randint(1, 14)
+        days = sorted(base + rnd.randint(0, 40) for _ in range(rnd.randint(0, 12)))
+        day = base + rnd.randint(-5, 45)
+        count, label = ConflictRule(3, window).peak_around(days, day)
+        assert count == _brute_peak(days, day, window), (days, day, window)
+
+        first, last = (date.fromisoformat(d).toordinal() for d in label.split(".."))
+        assert last - first == window - 1 and first <= day <= last
+        assert count == sum(1 for d in days if first <= d <= last)
+
+
+def test_impact_sees_majors_after_the_new_date(school):
+    # majors on 03-03..03-05; one more on 03-02 makes four inside a week
+    rule = ConflictRule(4, 7)
+    add_course(school, "Rolling Test", "SL", 1)
+    course_id = school.execute("SELECT CourseID FROM Courses WHERE CourseName = 'Rolling Test'").fetchone()[0]
+    add_student(school, "RT1", "Rolling Student", 12)
+    enroll_student(school, "RT1", course_id)
+    for day in ("2026-03-03", "2026-03-04", "2026-03-05"):
+        add_assessment(school, f"Major {day}", day, 1, "Both", [course_id])
+
+    impact = check_assessment_impact(school, "2026-03-02", 1, "Both", [course_id], rule)
+    assert [(r["StudentID"], r["MajorCount"]) for r in impact] == [("RT1", 4)]
+
+    suggested = suggest_alternative_date_for_courses(school, [course_id], "2026-03-02", "Both", 14, rule)
+    assert suggested and not check_assessment_impact(school, suggested, 1, "Both", [course_id], rule)
+
+    add_assessment(school, "Major 2026-03-02", "2026-03-02", 1, "Both", [course_id])
+    flagged = [r for r in detect_assessment_conflicts(school, rule) if r["StudentID"] == "RT1"]
+    assert [(r["Week"], r["MajorCount"]) for r in flagged] == [("2026-03-02..2026-03-05", 4)]
@@ -0,0 +1,83 @@
+from BackEnd import (add_assessment, delete_assessment, delete_course, delete_student, enroll_student,
+                     enroll_students_bulk, rebuild_student_week_load)
+from conftest import load_table
+
+
+def _major_enrollments(conn, limit=20):
+    # enrollments in courses that have a major assessment applying to them
+    return [tuple(r) for r in conn.execute("""
+        SELECT DISTINCT e.StudentID, e.CourseID
+        FROM Enrollments e
+        JOIN Courses c ON c.CourseID = e.CourseID
+        JOIN AssessmentTargets at ON at.CourseID = c.CourseID
+        JOIN Assessments a ON a.AssessmentID = at.AssessmentID
+        WHERE a.Priority = 1 AND (a.Audience = 'Both' OR a.Audience = c.CourseLevel)
+        ORDER BY e.StudentID, e.CourseID
+        LIMIT ?
+    """, (limit,))]
+
+
+def _unenroll(conn, pairs):
+    conn.executemany("DELETE FROM Enrollments WHERE StudentID = ? AND CourseID = ?", pairs)
+    conn.commit()
+
+
+def _assert_matches_rebuild(conn):
+    kept = load_table(conn)
+    rebuild_student_week_load(conn)
+    assert kept == load_table(conn)
+
+
+def test_bulk_reenroll_ignoring_duplicates(school):
+    pairs = _major_enrollments(school)
+    _unenroll(school, pairs)
+    _assert_matches_rebuild(school)
+
+    # the first pair is already back, so the batch has a duplicate to skip
+    enroll_student(school, *pairs[0])
+    result = enroll_students_bulk(school, pairs, ignore_duplicates=True)
+    assert result == {"inserted": len(pairs) - 1, "skipped": 1}
+    _assert_matches_rebuild(school)
+
+
+def test_single_reenroll(school):
+    pairs = _major_enrollments(school, 5)
+    _unenroll(school, pairs)
+    for pair in pairs:
+        enroll_student(school, *pair)
+    _assert_matches_rebuild(school)
+
+
+def test_triggers_follow_every_kind_of_write(school):
+    student, course = _major_enrollments(school, 1)[0]
+    hl = [r[0] for r in school.execute("SELECT CourseID FROM Courses WHERE CourseLevel = 'HL' LIMIT 3")]
+    other = school.execute("""
+        SELECT CourseID FROM Enrollments WHERE CourseID NOT IN (?, ?, ?, ?) LIMIT 1
+    """, (course, *hl)).fetchone()[0]
+
+    assessment = add_assessment(school, "Trigger test", "2026-03-04", 1, "Both", [course, *hl])
+    _assert_matches_rebuild(school)
+
+    writes = [
+        "UPDATE Assessments SET DueDate = '2026-03-11' WHERE AssessmentID = {a}",
+        "UPDATE Assessments SET Audience = 'SL' WHERE AssessmentID = {a}",
+        "UPDATE Assessments SET Audience = 'HL' WHERE AssessmentID = {a}",
+        "UPDATE Assessments SET Priority = 0 WHERE AssessmentID = {a}",
+        "UPDATE Assessments SET Priority = 1 WHERE AssessmentID = {a}",
+        "DELETE FROM AssessmentTargets WHERE AssessmentID = {a} AND CourseID = {c}",
+        "INSERT INTO AssessmentTargets (AssessmentID, CourseID) VALUES ({a}, {c})",
+        "UPDATE AssessmentTargets SET CourseID = {o} WHERE AssessmentID = {a} AND CourseID = {h2}",
+        "UPDATE Courses SET CourseLevel = 'SL' WHERE CourseID = {h}",
+        "UPDATE Enrollments SET CourseID = {h} WHERE StudentID = '{s}' AND CourseID = {c}",
+    ]
+    for sql in writes:
+        school.execute(sql.format(a=assessment, c=course, h=hl[0], h2=hl[2], o=other, s=student))
+        school.commit()
+        _assert_matches_rebuild(school)
+
+    delete_course(school, hl[1])
+    _assert_matches_rebuild(school)
+    delete_student(school, student)
+    _assert_matches_rebuild(school)
+    delete_assessment(school, assessment)
+    _assert_matches_rebuild(school)
@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+
+from BackEnd import (SCHEMA_VERSION, ConflictRule, detect_assessment_conflicts, ensure_schema,
+                     get_connection, rebuild_student_week_load, search)
+from conftest import load_table
+
+# the shape of the hand-made csiaa.db: NUMERIC keys, no ON DELETE actions,
+# no UNIQUE enrollments or teacher names, no Audience CHECK
+LEGACY_SQL = """
+    CREATE TABLE "Students" (
+        "StudentID" TEXT NOT NULL, "Name" TEXT NOT NULL, "GradeLevel" INTEGER NOT NULL,
+        PRIMARY KEY("StudentID")
+    );
+    CREATE TABLE "Teacher" (
+        "TeacherID" NUMERIC NOT NULL, "TeacherName" TEXT NOT NULL,
+        PRIMARY KEY("TeacherID")
+    );
+    CREATE TABLE "Enrollments" (
+        "EnrollmentID" NUMERIC NOT NULL, "StudentID" TEXT NOT NULL, "CourseID" NUMERIC NOT NULL,
+        PRIMARY KEY("EnrollmentID"),
+        FOREIGN KEY("CourseID") REFERENCES "Courses"("CourseID"),
+        FOREIGN KEY("StudentID") REFERENCES "Students"("StudentID")
+    );
+    CREATE TABLE "Courses" (
+        "CourseID" NUMERIC NOT NULL, "CourseName" TEXT NOT NULL, "CourseLevel" TEXT NOT NULL,
+        "TeacherID" NUMERIC NOT NULL,
+        PRIMARY KEY("CourseID"),
+        FOREIGN KEY("TeacherID") REFERENCES "Teacher"
+    );
+    CREATE TABLE AssessmentTargets (
+        AssessmentID INTEGER NOT NULL, CourseID NUMERIC NOT NULL,
+        PRIMARY KEY (AssessmentID, CourseID),
+        FOREIGN KEY (AssessmentID) REFERENCES Assessments(AssessmentID) ON DELETE CASCADE,
+        FOREIGN KEY (CourseID) REFERENCES Courses(CourseID) ON DELETE CASCADE
+    );
+    CREATE TABLE Assessments (
+        AssessmentID INTEGER PRIMARY KEY AUTOINCREMENT,
+        AssessmentName TEXT NOT NULL,
+        DueDate TEXT NOT NULL,
+        Priority INTEGER CHECK (Priority IN (0,1)),
+        CreatedAt TEXT DEFAULT (datetime('now','localtime')),
+        Audience TEXT DEFAULT 'Both'
+    );
+
+    -- every table kept the header row of the CSV it came from
+    INSERT INTO Students VALUES ('StudentID', 'Name', 'GradeLevel'), ('S1', 'Ada', 11), ('S2', 'Ben', 12);
+    INSERT INTO Teacher VALUES ('TeacherID', 'TeacherName'), (1, 'Ms Chen'), (2, 'Mr Diaz'), (3, 'Ms Chen');
+    INSERT INTO Courses VALUES ('CourseID', 'CourseName', 'CourseLevel', 'TeacherID'),
+        (10, 'Maths', 'HL', 1), (11, 'Physics', 'SL', 3), (12, 'History', 'HL', 2);
+    INSERT INTO Enrollments VALUES ('EnrollmentID', 'StudentID', 'CourseID'),
+        (1, 'S1', 10), (2, 'S1', 11), (3, 'S1', 12), (4, 'S1', 10), (5, 'S2', 12), (6, 'GONE', 10);
+    INSERT INTO Assessments (AssessmentName, DueDate, Priority, CreatedAt, Audience) VALUES
+        ('Maths test', '2026-03-02', 1, NULL, 'Both'),
+        ('Physics lab', '2026-03-03', 1, NULL, 'Both'),
+        ('History essay', '2026-03-04', 1, NULL, 'HL'),
+        ('Maths quiz', '2026-03-05', 1, NULL, 'Both');
+    INSERT INTO AssessmentTargets VALUES (1, 10), (2, 11), (3, 12), (4, 10);
+"""
+
+
+@pytest.fixture
+def legacy(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    raw = sqlite3.connect(path)
+    raw.executescript(LEGACY_SQL)
+    raw.close()
+    conn = get_connection(path, profile="interactive")
+    yield conn
+    conn.close()
+
+
+def _rows(conn, sql):
+    return [tuple(r) for r in conn.execute(sql)]
+
+
+def test_legacy_database_is_migrated(legacy):
+    ensure_schema(legacy)
+
+    assert legacy.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert _rows(legacy, "PRAGMA integrity_check") == [("ok",)]
+    assert _rows(legacy, "PRAGMA foreign_key_check") == []
+
+    # header rows gone, the duplicate teacher merged into the first copy
+    assert _rows(legacy, "SELECT StudentID FROM Students ORDER BY StudentID") == [("S1",), ("S2",)]
+    assert _rows(legacy, "SELECT TeacherID, TeacherName FROM Teacher ORDER BY TeacherID") == [
+        (1, "Ms Chen"), (2, "Mr Diaz"),
+    ]
+    assert _rows(legacy, "SELECT CourseID, TeacherID FROM Courses ORDER BY CourseID") == [
+        (10, 1), (11, 1), (12, 2),
+    ]
+    # the repeated enrollment and the one for a missing student are dropped
+    assert _rows(legacy, "SELECT StudentID, CourseID FROM Enrollments ORDER BY EnrollmentID") == [
+        ("S1", 10), ("S1", 11), ("S1", 12), ("S2", 12),
+    ]
+    assert legacy.execute("SELECT COUNT(*) FROM Assessments WHERE CreatedAt IS NULL").fetchone()[0] == 0
+
+    # derived tables are filled and the triggers keep them current
+    conflicts = detect_assessment_conflicts(legacy, ConflictRule(4))
+    assert [(r["StudentID"], r["MajorCount"]) for r in conflicts] == [("S1", 4)]
+    legacy.execute("DELETE FROM Enrollments WHERE StudentID = 'S1' AND CourseID = 12")
+    legacy.commit()
+    assert detect_assessment_conflicts(legacy, ConflictRule(4)) == []
+    kept = load_table(legacy)
+    rebuild_student_week_load(legacy)
+    assert kept == load_table(legacy)
+    assert [r["StudentID"] for r in search(legacy, "students", "ad")] == ["S1"]
+
+
+def test_current_database_is_left_alone(legacy):
+    ensure_schema(legacy)
+    schema = _rows(legacy, "SELECT sql FROM sqlite_master ORDER BY name")
+    ensure_schema(legacy)
+    assert _rows(legacy, "SELECT sql FROM sqlite_master ORDER BY name") == schema
+
+
+def test_newer_database_is_refused(legacy):
+    ensure_schema(legacy)
+    legacy.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    with pytest.raises(sqlite3.DatabaseError, match="newer"):
+        ensure_schema(legacy)
@@ -0,0 +1,57 @@
+import pytest
+
+from BackEnd import (_SEARCH_INDEXES, _fts5_available, add_course, add_student, add_teacher,
+                     delete_student, delete_teacher, rebuild_search_index, search)
+
+pytestmark = pytest.mark.skipif(not _fts5_available(), reason="SQLite built without FTS5")
+
+
+def _index(conn):
+    return {table: [tuple(r) for r in conn.execute(f"SELECT rowid, * FROM {table} ORDER BY rowid")]
+            for table, *_ in _SEARCH_INDEXES.values()}
+
+
+def _assert_matches_rebuild(conn):
+    kept = _index(conn)
+    rebuild_search_index(conn)
+    assert kept == _index(conn)
+
+
+def _names(conn, kind, text, column):
+    return [r[column] for r in search(conn, kind, text)]
+
+
+def test_triggers_keep_the_index_current(school):
+    add_student(school, "FTS1", "Zelda Quimby", 11)
+    assert _names(school, "students", "quim", "StudentID") == ["FTS1"]
+    # every word has to match; only the last may be a prefix
+    assert _names(school, "students", "zelda qu", "StudentID") == ["FTS1"]
+    assert _names(school, "students", "zel quimby", "StudentID") == []
+
+    school.execute("UPDATE Students SET Name = 'Zelda Xanthe' WHERE StudentID = 'FTS1'")
+    school.commit()
+    assert _names(school, "students", "quimby", "StudentID") == []
+    assert _names(school, "students", "xanthe", "StudentID") == ["FTS1"]
+    _assert_matches_rebuild(school)
+
+    delete_student(school, "FTS1")
+    assert _names(school, "students", "xanthe", "StudentID") == []
+    _assert_matches_rebuild(school)
+
+
+def test_courses_follow_their_teacher(school):
+    add_teacher(school, "Ms Yarrowby")
+    teacher_id = school.execute("SELECT TeacherID FROM Teacher WHERE TeacherName = 'Ms Yarrowby'").fetchone()[0]
+    add_course(school, "Astronomy", "HL", teacher_id)
+    assert _names(school, "courses", "yarrowby", "CourseName") == ["Astronomy"]
+
+    school.execute("UPDATE Teacher SET TeacherName = 'Ms Wexley' WHERE TeacherID = ?", (teacher_id,))
+    school.commit()
+    assert _names(school, "courses", "yarrowby", "CourseName") == []
+    assert _names(school, "courses", "wexley astro", "CourseName") == ["Astronomy"]
+    _assert_matches_rebuild(school)
+
+    delete_teacher(school, teacher_id)
+    assert _names(school, "courses", "wexley", "CourseName") == []
+    assert _names(school, "courses", "astronomy", "CourseName") == ["Astronomy"]
+    _assert_matches_rebuild(school)
@@ -0,0 +1,56 @@
+import pytest
+
+from BackEnd import rebuild_student_week_load
+from Server import Api
+from conftest import load_table
+
+
+@pytest.fixture
+def api(school):
+    db_path = school.execute("PRAGMA database_list").fetchone()["file"]
+    api = Api(db_path, readers=1)
+    yield api
+    api.close()
+
+
+def test_failed_write_is_rolled_back(api, school):
+    status, _ = api.handle("POST", "/assessments", {}, {
+        "name": "Orphan", "due_date": "2026-03-02", "priority": 1, "courses": [999999],
+    })
+    assert status == 409
+    assert not api.writer.in_transaction
+
+    # a later successful write must not commit the half-added assessment
+    assert api.handle("POST", "/teachers", {}, {"name": "After Orphan"})[0] == 200
+    assert school.execute("SELECT COUNT(*) FROM Assessments WHERE AssessmentName = 'Orphan'").fetchone()[0] == 0
+    assert school.execute("SELECT COUNT(*) FROM Teacher WHERE TeacherName = 'After Orphan'").fetchone()[0] == 1
+
+
+def test_rule_parameters_are_validated(api):
+    assert api.handle("GET", "/conflicts", {"threshold": ["0"]}, {})[0] == 400
+    assert api.handle("GET", "/conflicts", {"window": ["0"]}, {})[0] == 400
+    status, rows = api.handle("GET", "/conflicts", {"threshold": ["3"], "window": ["7"]}, {})
+    assert status == 200 and all(r["MajorCount"] >= 3 for r in rows)
+
+
+def test_reschedule_stores_padded_dates(api, school):
+    first, second = school.execute(
+        "SELECT AssessmentID, DueDate FROM Assessments ORDER BY AssessmentID LIMIT 2").fetchall()
+
+    # one bad date rolls back the whole batch
+    status, _ = api.handle("POST", "/assessments/reschedule", {}, {"moves": [
+        {"AssessmentID": first[0], "From": first[1], "To": "2026-3-4"},
+        {"AssessmentID": second[0], "From": second[1], "To": "garbage"},
+    ]})
+    assert status == 400
+    assert school.execute("SELECT DueDate FROM Assessments WHERE AssessmentID = ?", (first[0],)).fetchone()[0] == first[1]
+
+    status, _ = api.handle("POST", "/assessments/reschedule", {}, {"moves": [
+        {"AssessmentID": first[0], "From": first[1], "To": "2026-3-4"},
+    ]})
+    assert status == 200
+    row = school.execute("SELECT DueDate, WeekKey FROM Assessments WHERE AssessmentID = ?", (first[0],)).fetchone()
+    assert tuple(row) == ("2026-03-04", "2026-09")
+    kept = load_table(school)
+    rebuild_student_week_load(school)
+    assert kept == load_table(school)